@@ -0,0 +1,232 @@
+from itertools import product
+
+import numpy as np
+
+# Defaults of the client (SimulateSection.jsx)
+DEFAULT_BATTERY_COUNTS = (0, 1, 5, 10)
+DEFAULT_OPT_LOWER = (0.05,)
+DEFAULT_OPT_UPPER = (0.001,)
+DEFAULT_VOLUME_LIMIT = 60000
+DEFAULT_MASS_LIMIT = 60000
+
+# Engine slot sequences checked per NumPy pass
+CHUNK_SIZE = 1 << 16
+
+# Fuel parameters of a generator slot: (LHV J/kg, density kg/m3, liquid density kg/m3, carbon content, molar mass)
+FUEL_PARAMETERS = {
+    "Diesel": ("45.9e6", "846", "846", "0.86", "0.223"),
+    "Methanol": ("23e6", "791", "791", "0.34", "0.223"),
+}
+# Placeholder until the hydrogen properties are confirmed
+DEFAULT_FUEL_PARAMETERS = ("45.9e6", "846", "846", "0", "0.223")
+
+
+class CombinationSpace:
+    """
+    Powertrain combinations of a compact search-space spec, enumerated
+    lazily on the server instead of being built and posted by the client.
+
+    Every sequence of 1..number_of_slots engine options (engine, optimal zone
+    lower and upper percentage) is combined with every battery and battery
+    count, in the order of the client's buildCombinations(). Engine
+    sequences are checked in NumPy chunks before any combination is built:
+    sequences whose engines together exceed the volume or mass limit, or do
+    not exceed the peak power, are dropped (markUnrealisticCombos() and
+    filterIncapbleSystem()). Iterating yields the simulate_batch combination
+    format, with the modelica_parameters of modelicaParameterMapping().
+
+    Args:
+        spec: engines and batteries (catalog entries as loaded by the client),
+            optional engine_ids / battery_ids (engine_db_index / battery_db_index
+            to use, default all), battery_counts, opt_lower, opt_upper,
+            volume_limit, mass_limit, peak_power (kW, no power check if missing)
+            and duty_cycle_path (combiTable1Ds.fileName)
+        number_of_slots: Largest number of engines in a combination
+
+    Raises:
+        ValueError: Missing catalog, unknown ids or no slots
+    """
+
+    def __init__(self, spec, number_of_slots, chunk_size=CHUNK_SIZE):
+        self.number_of_slots = int(number_of_slots)
+        if self.number_of_slots < 1:
+            raise ValueError("number_of_slots must be at least 1")
+        engines = _select(spec.get("engines"), spec.get("engine_ids"), "engine")
+        self.batteries = _select(spec.get("batteries"), spec.get("battery_ids"), "battery")
+        self.battery_counts = list(spec.get("battery_counts", DEFAULT_BATTERY_COUNTS))
+        self.options = [(engine, lo, hi)
+                        for engine in engines
+                        for lo in spec.get("opt_lower", DEFAULT_OPT_LOWER)
+                        for hi in spec.get("opt_upper", DEFAULT_OPT_UPPER)]
+        self.volume_limit = float(spec.get("volume_limit") or DEFAULT_VOLUME_LIMIT)
+        self.mass_limit = float(spec.get("mass_limit") or DEFAULT_MASS_LIMIT)
+        peak_power = spec.get("peak_power")
+        self.peak_power = None if peak_power is None else float(peak_power)
+        self.duty_cycle_path = spec.get("duty_cycle_path")
+        self.chunk_size = int(chunk_size)
+
+        # Per engine option; a missing value is NaN, which fails the power check but not the limits
+        self._p_max = _column(self.options, "engine_p_max")
+        self._mass = _column(self.options, "engine_mass")
+        self._volume = _column(self.options, "engine_volume")
+        self._stats = None
+
+    def __len__(self):
+        return self.stats()["feasible"]
+
+    def __iter__(self):
+        """Feasible combinations, built one at a time."""
+        for sequences in self._sequences():
+            for sequence in sequences.tolist():
+                for battery, count in product(self.batteries, self.battery_counts):
+                    yield self.combination(sequence, battery, count)
+
+    def stats(self):
+        """
+        Returns:
+            dict: total combinations, feasible ones, and the pruned ones with
+            over_limits / under_powered engine sets (a set can fail both)
+        """
+        if self._stats is None:
+            per_sequence = len(self.batteries) * len(self.battery_counts)
+            counts = {"total": 0, "feasible": 0, "over_limits": 0, "under_powered": 0}
+            for total, feasible, over_limits, under_powered in self._check_all():
+                counts["total"] += total
+                counts["feasible"] += feasible
+                counts["over_limits"] += over_limits
+                counts["under_powered"] += under_powered
+            self._stats = {key: value * per_sequence for key, value in counts.items()}
+            self._stats["pruned"] = self._stats["total"] - self._stats["feasible"]
+        return dict(self._stats)
+
+    def combination(self, sequence, battery, count):
+        """
+        One combination in the simulate_batch format.
+
+        Args:
+            sequence: Engine option indices of the occupied slots, in slot order
+            battery: Battery catalog entry
+            count: Number of batteries
+        """
+        config = {}
+        for i in range(1, self.number_of_slots + 1):
+            if i <= len(sequence):
+                engine, lo, hi = self.options[sequence[i - 1]]
+                config[f"slot {i}"], config[f"slot {i}_upper"], config[f"slot {i}_lower"] = engine, hi, lo
+            else:
+                config[f"slot {i}"] = config[f"slot {i}_upper"] = config[f"slot {i}_lower"] = None
+        config["battery"] = battery
+        config["battery_count"] = count
+        config["check"] = True
+        return {
+            "instance": {"config": config},
+            "modelica_parameters": modelica_parameters(config, self.number_of_slots, self.duty_cycle_path),
+        }
+
+    def _sequences(self):
+        """Feasible engine sequences as (n, k) option index arrays, shortest first."""
+        for k, start, stop in self._chunks():
+            sequences = self._decode(k, start, stop)
+            yield sequences[self._feasible(sequences)]
+
+    def _check_all(self):
+        for k, start, stop in self._chunks():
+            sequences = self._decode(k, start, stop)
+            over_limits, under_powered = self._infeasible(sequences)
+            yield (len(sequences), int(np.count_nonzero(~(over_limits | under_powered))),
+                   int(np.count_nonzero(over_limits)), int(np.count_nonzero(under_powered)))
+
+    def _chunks(self):
+        n = len(self.options)
+        for k in range(1, self.number_of_slots + 1):
+            for start in range(0, n ** k, self.chunk_size):
+                yield k, start, min(start + self.chunk_size, n ** k)
+
+    def _decode(self, k, start, stop):
+        # Sequence number -> option per slot, first slot most significant (as the client's product)
+        index = np.arange(start, stop, dtype=np.int64)
+        powers = len(self.options) ** np.arange(k - 1, -1, -1, dtype=np.int64)
+        return (index[:, None] // powers[None, :]) % len(self.options)
+
+    def _infeasible(self, sequences):
+        over_limits = ((self._volume[sequences].sum(axis=1) > self.volume_limit)
+                       | (self._mass[sequences].sum(axis=1) > self.mass_limit))
+        if self.peak_power is None:
+            under_powered = np.zeros(len(sequences), dtype=bool)
+        else:
+            under_powered = ~(self._p_max[sequences].sum(axis=1) > self.peak_power)
+        return over_limits, under_powered
+
+    def _feasible(self, sequences):
+        over_limits, under_powered = self._infeasible(sequences)
+        return ~(over_limits | under_powered)
+
+
+def modelica_parameters(config, number_of_slots, duty_cycle_path=None):
+    """
+    Model parameters of one combination (the client's modelicaParameterMapping()).
+
+    Args:
+        config: Combination config ("slot i", "slot i_upper", "slot i_lower", "battery", "battery_count")
+        number_of_slots: Number of generator slots of the model
+        duty_cycle_path: Duty cycle table file for combiTable1Ds.fileName (optional)
+
+    Returns:
+        list: {"param", "value"} dicts, values as strings
+    """
+    parameters = []
+    for i in range(1, number_of_slots + 1):
+        engine = config.get(f"slot {i}")
+        if engine is None:
+            # No engine in this slot: make sure it is turned off
+            parameters.append({"param": f"gen{i}_is_on", "value": "false"})
+            continue
+        parameters.append({"param": "tolerance", "value": "2.6e-6"})
+        parameters.append({"param": f"gen{i}_is_on", "value": "true"})
+        parameters.append({"param": f"generator_P_rat_{i}", "value": _js_number(engine["engine_p_max"] * 1000)})
+        parameters.append({"param": f"generator_P_idle_{i}", "value": _js_number(engine["engine_p_min"] * 1000)})
+        lhv, rho, rho_liq, carbon, molar_mass = FUEL_PARAMETERS.get(engine.get("engine_fuel_type"), DEFAULT_FUEL_PARAMETERS)
+        parameters.append({"param": f"generator_FLHV_{i}", "value": lhv})
+        parameters.append({"param": f"generator_Frho_{i}", "value": rho})
+        parameters.append({"param": f"generator_Frho_liq_{i}", "value": rho_liq})
+        parameters.append({"param": f"generator_FcarbonContent_{i}", "value": carbon})
+        parameters.append({"param": f"generator_MolarMass_{i}", "value": molar_mass})
+        # BSFC upper and lower bound (optimal zone)
+        parameters.append({"param": f"mCtrl_user_defined_BSFC_percentage_{i}", "value": _js_number(config[f"slot {i}_upper"])})
+        parameters.append({"param": f"mCtrl_user_defined_BSFC_percentage_{i}_lower", "value": _js_number(config[f"slot {i}_lower"])})
+        if duty_cycle_path:
+            parameters.append({"param": "combiTable1Ds.fileName", "value": str(duty_cycle_path).replace("\\", "/")})
+
+    count = config.get("battery_count", 0)
+    if count > 0:
+        battery = config["battery"]
+        parameters.append({"param": "battery_P_max", "value": _js_number(battery["battery_max_charge_power"] * count)})
+        parameters.append({"param": "battery_Capacity", "value": _js_number(battery["battery_capcity"] * 3600000 * count)})
+    else:
+        # Without a battery, the battery does not output power
+        parameters.append({"param": "battery_P_max", "value": "0.1"})
+    return parameters
+
+
+def _select(catalog, ids, kind):
+    if not catalog:
+        raise ValueError(f"The search space has no {kind} catalog ({kind}s)")
+    if ids is None:
+        return list(catalog)
+    by_id = {entry.get(f"{kind}_db_index"): entry for entry in catalog}
+    unknown = [i for i in ids if i not in by_id]
+    if unknown:
+        raise ValueError(f"Unknown {kind} ids: {', '.join(map(str, unknown))}")
+    return [by_id[i] for i in ids]
+
+
+def _column(options, key):
+    return np.array([np.nan if engine.get(key) is None else engine[key] for engine, _, _ in options],
+                    dtype=np.float64)
+
+
+def _js_number(value):
+    # Number.prototype.toString(): integral values without a decimal point
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
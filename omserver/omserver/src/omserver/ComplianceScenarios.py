@@ -0,0 +1,52 @@
+import numpy as np
+
+from .EUEmissionCalculator import EUMarineEmissionCalculator, get_emission_calculator
+
+# Simulated fuels, their FuelEU Maritime pathway in the emission lookup tables
+# and the catalog column holding an iteration's consumption in tonnes
+EU_FUEL_TYPES = {
+    'Diesel': 'MDO MGO (Grades DMX to DMB)',
+    'Methanol': 'e-methanol E10'
+}
+FUEL_COLUMNS = {
+    'Diesel': 'diesel_usage_t',
+    'Methanol': 'meth_usage_t'
+}
+
+# First year of every target period, 2025 to 2050
+DEFAULT_YEARS = tuple(EUMarineEmissionCalculator.GHG_INTENSITY_REDUCTION)
+
+
+def fuel_consumption(rows):
+    """
+    Args:
+        rows: Catalog rows (ResultStore.iterations / query)
+
+    Returns:
+        np.ndarray: (N, F) consumption in tonnes in EU_FUEL_TYPES order; missing or negative as 0
+    """
+    columns = [FUEL_COLUMNS[fuel] for fuel in EU_FUEL_TYPES]
+    consumption = np.array([[row.get(column) for column in columns] for row in rows],
+                           dtype=np.float64).reshape(len(rows), len(columns))
+    # Only fuel that was burnt counts (NaN for a missing value fails the test as well)
+    return np.where(consumption > 0, consumption, 0.0)
+
+
+def compliance_scenarios(rows, target_years=DEFAULT_YEARS, in_out_shares=(0.0,)):
+    """
+    FuelEU compliance of stored iterations for every target year and scope split,
+    from the fuel consumption in the catalog (no simulation is run).
+
+    Args:
+        rows: Catalog rows
+        target_years: Reporting years (2025 on)
+        in_out_shares: Shares of the fuel burnt on voyages in & out of EU/EEA
+
+    Returns:
+        dict: See EUMarineEmissionCalculator.calculate_compliance_scenarios; rows in the given order
+
+    Raises:
+        ValueError: A year before 2025 or a share outside 0..1
+    """
+    return get_emission_calculator().calculate_compliance_scenarios(
+        list(EU_FUEL_TYPES.values()), fuel_consumption(rows), target_years, in_out_shares)
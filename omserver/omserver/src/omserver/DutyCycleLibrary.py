@@ -0,0 +1,366 @@
+import hashlib
+import io
+import json
+import re
+import struct
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from flask import current_app
+
+from .JobWorkspace import replace_file_atomic
+
+# Model-facing table files: MAT v4 (binary) or Modelica text table; CombiTable1Ds reads both through fileName
+TABLE_FORMATS = ("mat", "txt")
+
+# Table name used when the uploaded file does not declare one ("double <name>(rows, cols)")
+DEFAULT_TABLE_NAME = "tab1"
+
+PERCENTILES = (50, 90, 95, 99)
+
+_TABLE_HEADER = re.compile(r"^\s*(?:double|float)\s+(\w+)\s*\(")
+
+
+def parse_duty_cycle(text):
+    """
+    Time/power rows of a Modelica text table: the two header lines are
+    skipped, then the first two columns of every row. Rows that are not
+    two numbers are skipped.
+
+    Args:
+        text: Content of the duty cycle .txt file
+
+    Returns:
+        tuple: (np.ndarray of shape (N, 2), table name from the header)
+    """
+    text = text.strip()
+    lines = text.splitlines()
+    table_name = next((m.group(1) for m in map(_TABLE_HEADER.match, lines[:2]) if m), DEFAULT_TABLE_NAME)
+    try:
+        table = np.loadtxt(io.StringIO(text), skiprows=2, usecols=(0, 1), ndmin=2, dtype=np.float64)
+    except ValueError:
+        # Malformed rows: parse row by row and drop them
+        rows = []
+        for line in lines[2:]:
+            parts = line.split()
+            if len(parts) >= 2:
+                try:
+                    rows.append((float(parts[0]), float(parts[1])))
+                except ValueError:
+                    continue
+        table = np.array(rows, dtype=np.float64).reshape(-1, 2)
+    return table, table_name
+
+
+def duty_cycle_stats(table):
+    """
+    Args:
+        table: (N, 2) time (s) and power (kW) rows
+
+    Returns:
+        dict: start/end time, duration, min/max/mean power, energy, power percentiles and ramp rates
+    """
+    t, p = table[:, 0], table[:, 1]
+    dt = np.diff(t)
+    energy_kws = _trapezoid_energy(t, p)
+    duration = float(t[-1] - t[0])
+    moving = dt > 0
+    ramps = np.diff(p)[moving] / dt[moving]
+    return {
+        "start_time": float(t[0]),
+        "end_time": float(t[-1]),
+        "duration_s": duration,
+        "min_power": float(p.min()),
+        "max_power": float(p.max()),
+        # Time weighted, like the energy
+        "mean_power": energy_kws / duration if duration > 0 else float(p.mean()),
+        "energy_kwh": energy_kws / 3600,
+        "power_percentiles": {f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(p, PERCENTILES))},
+        "max_ramp_up": float(ramps.max()) if len(ramps) and ramps.max() > 0 else 0.0,
+        "max_ramp_down": float(-ramps.min()) if len(ramps) and ramps.min() < 0 else 0.0,
+    }
+
+
+def simplify_duty_cycle(table, tolerance_kw=None, energy_tolerance=None):
+    """
+    Piecewise linear simplification (Douglas-Peucker on the power axis).
+    Points are dropped while the linear interpolation between the kept
+    points stays within tolerance_kw of every original sample. The first,
+    last and peak points and both points of a step (repeated time) are
+    always kept, so the time span and the peak power are unchanged. With
+    energy_tolerance, the power tolerance is halved until the energy error
+    is within it as well.
+
+    Args:
+        table: (N, 2) time (s) and power (kW) rows
+        tolerance_kw: Largest power deviation (kW); default: the power range
+        energy_tolerance: Largest relative energy error (e.g. 0.001 for 0.1 %)
+
+    Returns:
+        tuple: (simplified (M, 2) table, dict with the achieved errors and the point reduction)
+
+    Raises:
+        ValueError: No tolerance given, or a negative one
+    """
+    if tolerance_kw is None and energy_tolerance is None:
+        raise ValueError("Give a power tolerance (kW) and/or an energy tolerance")
+    for value in (tolerance_kw, energy_tolerance):
+        if value is not None and not (np.isfinite(value) and value >= 0):
+            raise ValueError("Tolerances must be finite and not negative")
+
+    t, p = table[:, 0], table[:, 1]
+    tolerance = float(np.ptp(p)) if tolerance_kw is None else float(tolerance_kw)
+    energy = _trapezoid_energy(t, p)
+    while True:
+        kept = _douglas_peucker(t, p, tolerance)
+        energy_error = _trapezoid_energy(t[kept], p[kept]) - energy
+        relative = abs(energy_error) / abs(energy) if energy else 0.0
+        if energy_tolerance is None or relative <= energy_tolerance or tolerance == 0:
+            break
+        # Below a micro-kW, only points on a straight line are dropped (exact energy)
+        tolerance = tolerance / 2 if tolerance > 1e-6 else 0.0
+
+    simplified = table[kept]
+    return simplified, {
+        "tolerance_kw": tolerance_kw,
+        "energy_tolerance": energy_tolerance,
+        "applied_tolerance_kw": tolerance,
+        "source_points": int(len(table)),
+        "points": int(len(kept)),
+        "reduction": 1 - len(kept) / len(table),
+        "max_power_error_kw": float(np.max(np.abs(_interpolate(t, kept, p) - p))),
+        "energy_error_kwh": energy_error / 3600,
+        "energy_error_rel": relative,
+        "peak_error_kw": float(p.max() - simplified[:, 1].max()),
+    }
+
+
+def _trapezoid_energy(t, p):
+    return float(np.sum((p[1:] + p[:-1]) / 2 * np.diff(t)))
+
+
+def _segment_fraction(t, a, b, k):
+    """Position of samples k between samples a and b (0 on a step, where both have the same time)."""
+    span = t[b] - t[a]
+    return np.divide(t[k] - t[a], span, out=np.zeros(np.shape(k)), where=span > 0)
+
+
+def _interpolate(t, kept, p):
+    """Power of the kept points linearly interpolated at every original sample, by index so steps stay steps."""
+    index = np.arange(len(t))
+    segment = np.clip(np.searchsorted(kept, index, side="right") - 1, 0, max(len(kept) - 2, 0))
+    a, b = kept[segment], kept[np.minimum(segment + 1, len(kept) - 1)]
+    return p[a] + _segment_fraction(t, a, b, index) * (p[b] - p[a])
+
+
+def _douglas_peucker(t, p, tolerance):
+    """Indices of the points kept for the power tolerance, ascending."""
+    n = len(t)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1, int(np.argmax(p))]] = True
+    steps = np.flatnonzero(np.diff(t) == 0)
+    keep[steps] = keep[steps + 1] = True
+    forced = np.flatnonzero(keep)
+    stack = list(zip(forced[:-1].tolist(), forced[1:].tolist()))
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        inner = np.arange(a + 1, b)
+        error = np.abs(p[inner] - (p[a] + _segment_fraction(t, a, b, inner) * (p[b] - p[a])))
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            m = a + 1 + worst
+            keep[m] = True
+            stack.append((a, m))
+            stack.append((m, b))
+    return np.flatnonzero(keep)
+
+
+def _mat_v4(name, matrix):
+    """A double matrix in MAT v4 format, as read by CombiTable1Ds."""
+    matrix = np.asarray(matrix, dtype="<f8")
+    header = struct.pack("<5i", 0, matrix.shape[0], matrix.shape[1], 0, len(name) + 1)
+    return header + name.encode("ascii") + b"\0" + matrix.tobytes(order="F")
+
+
+def _text_table(name, matrix):
+    # repr() is the shortest text that reads back as the same double, so the model sees the parsed values
+    rows = "".join("\t".join(map(repr, row)) + "\n" for row in matrix.tolist())
+    return f"#1\ndouble {name}({matrix.shape[0]},{matrix.shape[1]})\n{rows}".encode("utf-8")
+
+
+class DutyCycleLibrary:
+    """
+    Content addressed store of uploaded duty cycles.
+
+    Every distinct file is parsed once: the rows are kept as a binary .npy,
+    the statistics as .json, and the model-facing table files are written
+    the first time they are asked for. Uploading a known file again, or
+    looking a cycle up by id, reads none of the text.
+
+    Args:
+        root: Library directory (instance/dutycycles)
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._tables = {}
+
+    def add(self, content, name=None):
+        """
+        Add a duty cycle file, unless the same content is already stored.
+
+        Args:
+            content: Bytes of the .txt file
+            name: Uploaded file name (kept for display)
+
+        Returns:
+            dict: The entry (see get()), with "cached" telling whether it was known
+
+        Raises:
+            ValueError: The file has no time/power rows
+        """
+        cycle_id = hashlib.sha256(content).hexdigest()[:16]
+        entry = self.get(cycle_id)
+        if entry is not None:
+            return {**entry, "cached": True}
+
+        table, table_name = parse_duty_cycle(content.decode("utf-8"))
+        if not len(table):
+            raise ValueError("The duty cycle has no time/power rows")
+        entry = self._store(cycle_id, table, {"name": name, "table_name": table_name})
+        print(f"[DutyCycleLibrary] {name or cycle_id}: {len(table)} points stored as {cycle_id}")
+        return {**entry, "cached": False}
+
+    def simplify(self, cycle_id, tolerance_kw=None, energy_tolerance=None):
+        """
+        Store the simplified profile of a duty cycle (see simplify_duty_cycle())
+        as a duty cycle of its own, once per source and tolerances.
+
+        Args:
+            cycle_id: Id of the stored source duty cycle
+            tolerance_kw: Largest power deviation (kW)
+            energy_tolerance: Largest relative energy error
+
+        Returns:
+            dict: The entry of the simplified cycle, with "source_id", "simplification" and "cached"
+
+        Raises:
+            KeyError: Unknown id
+            ValueError: No tolerance given, or a negative one
+        """
+        tolerance_kw, energy_tolerance = (None if v is None else float(v) for v in (tolerance_kw, energy_tolerance))
+        key = json.dumps([cycle_id, tolerance_kw, energy_tolerance])
+        simplified_id = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        entry = self.get(simplified_id)
+        if entry is not None:
+            return {**entry, "cached": True}
+
+        source = self.get(cycle_id)
+        if source is None:
+            raise KeyError(cycle_id)
+        table, simplification = simplify_duty_cycle(self.load(cycle_id), tolerance_kw, energy_tolerance)
+        entry = self._store(simplified_id, table, {
+            "name": source["name"],
+            "table_name": source["table_name"],
+            "source_id": cycle_id,
+            "simplification": simplification,
+        })
+        print(f"[DutyCycleLibrary] {cycle_id}: simplified from {simplification['source_points']} "
+              f"to {simplification['points']} points as {simplified_id}")
+        return {**entry, "cached": False}
+
+    def _store(self, cycle_id, table, fields):
+        entry = {
+            "id": cycle_id,
+            **fields,
+            "points": int(len(table)),
+            "created": time.time(),
+            **duty_cycle_stats(table),
+        }
+        buffer = io.BytesIO()
+        np.save(buffer, table)
+        replace_file_atomic(self.root / f"{cycle_id}.npy", buffer.getvalue())
+        # The entry is written last: it marks a complete cycle
+        replace_file_atomic(self.root / f"{cycle_id}.json", json.dumps(entry).encode("utf-8"))
+        table.setflags(write=False)
+        with self._lock:
+            self._entries[cycle_id] = entry
+            self._tables[cycle_id] = table
+        return entry
+
+    def get(self, cycle_id):
+        """
+        Returns:
+            dict: id, name, table_name, points, created and the duty_cycle_stats
+            (simplified cycles also source_id and simplification); or None for an unknown id
+        """
+        with self._lock:
+            entry = self._entries.get(cycle_id)
+        if entry is not None:
+            return dict(entry)
+        if not re.fullmatch(r"[0-9a-f]{16}", str(cycle_id)):
+            return None
+        path = self.root / f"{cycle_id}.json"
+        if not path.exists():
+            return None
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        with self._lock:
+            self._entries[cycle_id] = entry
+        return dict(entry)
+
+    def list(self):
+        """Entries of all stored duty cycles, newest first."""
+        entries = [self.get(path.stem) for path in self.root.glob("*.json")]
+        return sorted((e for e in entries if e), key=lambda e: e["created"], reverse=True)
+
+    def load(self, cycle_id):
+        """
+        Returns:
+            np.ndarray: (N, 2) time and power rows (read-only)
+
+        Raises:
+            KeyError: Unknown id
+        """
+        with self._lock:
+            table = self._tables.get(cycle_id)
+        if table is not None:
+            return table
+        if self.get(cycle_id) is None:
+            raise KeyError(cycle_id)
+        table = np.load(self.root / f"{cycle_id}.npy")
+        table.setflags(write=False)
+        with self._lock:
+            self._tables[cycle_id] = table
+        return table
+
+    def table_path(self, cycle_id, table_format="mat"):
+        """
+        Model-facing table file of a duty cycle (for CombiTable1Ds fileName), written once per id.
+
+        Raises:
+            KeyError: Unknown id
+            ValueError: Unknown table format
+        """
+        if table_format not in TABLE_FORMATS:
+            raise ValueError(f"Unknown table format {table_format!r}, use one of {', '.join(TABLE_FORMATS)}")
+        path = self.root / f"{cycle_id}.{table_format}"
+        if not path.exists():
+            entry = self.get(cycle_id)
+            if entry is None:
+                raise KeyError(cycle_id)
+            table = self.load(cycle_id)
+            write = _mat_v4 if table_format == "mat" else _text_table
+            replace_file_atomic(path, write(entry["table_name"], table))
+        return path
+
+
+def get_duty_cycle_library() -> DutyCycleLibrary:
+    """The duty cycle library created for the running Flask app in create_app()."""
+    return current_app.extensions["duty_cycles"]
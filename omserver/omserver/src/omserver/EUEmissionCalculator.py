@@ -1,6 +1,10 @@
-import pandas as pd 
-from pathlib import Path 
-from typing  import Dict, List, Any
+import math
+
+import numpy as np
+from functools import lru_cache
+from typing  import Dict, List, Any, Sequence
+
+from .FuelRegistry import GWP_CH4, GWP_CO2, GWP_N2O, FuelRegistry, get_fuel_registry
 
 class EUMarineEmissionCalculator:
     """
@@ -14,9 +18,9 @@ class EUMarineEmissionCalculator:
     # EU Regulation Constants
     CONSTANTS = {
         # Global Warming Potentials (IPCC AR4 values used in EU regulation)
-        'GWP_CO2': 1,
-        'GWP_CH4': 25,
-        'GWP_N2O': 298,
+        'GWP_CO2': GWP_CO2,
+        'GWP_CH4': GWP_CH4,
+        'GWP_N2O': GWP_N2O,
         
         # GHG Intensity Targets (gCO2eq/MJ) - FuelEU Maritime
         'GHG_INTENSITY_BASELINE': 91.16,     # Baseline intensity (gCO2eq/MJ)
@@ -43,82 +47,53 @@ class EUMarineEmissionCalculator:
         'FOSSIL_FUEL_COMPARATOR_RED': 94.0,  # Fixed constant from RED regulation
     }
     
-    def __init__(self):
-        """Initialize calculator with fuel properties data"""
-        self.fuel_properties = self._load_fuel_properties()
-        self.biofuel_factors = self._load_biofuel_factors()  # Now used for biofuel calculations
-        
-    def _load_fuel_properties(self) -> pd.DataFrame:
-        """Load fuel properties from CSV file"""
-        try:
-            csv_path = Path(__file__).parent / 'lookup_tables' / 'fuel_properties.csv'
-            df = pd.read_csv(csv_path)
-            # Set pathway_name as index for faster lookups
-            return df.set_index('pathway_name')
-        except Exception as e:
-            ####print(f"Failed to load fuel properties: {e}")
-            return pd.DataFrame()
+    # GHG intensity target reduction below GHG_INTENSITY_BASELINE, in force from the given year on
+    # (FuelEU Maritime Article 4(2))
+    GHG_INTENSITY_REDUCTION = {
+        2025: 0.02,
+        2030: 0.06,
+        2035: 0.145,
+        2040: 0.31,
+        2045: 0.62,
+        2050: 0.80,
+    }
     
-    def _load_biofuel_factors(self) -> pd.DataFrame:
-        """Load biofuel emission factors from CSV file"""
-        try:
-            csv_path = Path(__file__).parent / 'lookup_tables' / 'biofuel_emission_factors.csv'
-            
-            if not csv_path.exists():
-                ####print(f"Biofuel CSV file does not exist: {csv_path}")
-                return pd.DataFrame()
-            
-            df = pd.read_csv(csv_path)
-            
-            # Strip whitespace from column names and string values
-            df.columns = df.columns.str.strip()
-            df = df.map(lambda x: x.strip() if isinstance(x, str) else x)
-            
-            return df.set_index('pathway_name')
-        except Exception as e:
-            ####print(f"Failed to load biofuel factors: {e}")
-            return pd.DataFrame()
+    def __init__(self, registry: FuelRegistry = None):
+        """
+        Args:
+            registry: Fuel lookup tables (default: the shared get_fuel_registry())
+        """
+        self.registry = registry if registry is not None else get_fuel_registry()
+    
+    def ghg_intensity_target(self, target_year: int = 2025) -> float:
+        """
+        GHG intensity target (gCO2eq/MJ) of a reporting year
+        
+        Raises:
+            ValueError: Year before 2025
+        """
+        periods = [year for year in self.GHG_INTENSITY_REDUCTION if year <= int(target_year)]
+        if not periods:
+            raise ValueError(f"No GHG intensity target before {min(self.GHG_INTENSITY_REDUCTION)}, got {target_year}")
+        return self.CONSTANTS['GHG_INTENSITY_BASELINE'] * (1 - self.GHG_INTENSITY_REDUCTION[max(periods)])
     
     def get_fuel_properties(self, fuel_name: str) -> Dict[str, Any]:
         """Get fuel properties for a specific fuel type"""
-        if fuel_name not in self.fuel_properties.index:
+        props = self.registry.properties(fuel_name)
+        if props is None:
             raise ValueError(f"Fuel '{fuel_name}' not found in fuel properties database")
-        
-        props = self.fuel_properties.loc[fuel_name].to_dict()
-        
-        # Handle NaN values
-        for key, value in props.items():
-            if pd.isna(value):
-                props[key] = 0.0
-        
         return props
     
     def get_biofuel_pathways(self) -> Dict[str, Any]:
         """Get available biofuel pathways for frontend dropdown"""
-        if self.biofuel_factors.empty:
+        if not self.registry.biofuel_names:
             return {'pathways': [], 'error': 'Biofuel factors not loaded'}
         
-        try:
-            pathways = []
-            for pathway_name in self.biofuel_factors.index:
-                typical_value = self.biofuel_factors.loc[pathway_name, 'ghg_emissions_saving_typical_value']
-                
-                # Convert numpy types to Python types for JSON serialization
-                pathways.append({
-                    'name': str(pathway_name),  # Ensure string
-                    'typical_value': int(typical_value) if pd.notna(typical_value) else 0  # Convert np.int64 to int
-                })
-            
-            return {'pathways': pathways, 'error': None}
-            
-        except KeyError as e:
-            error_msg = f"Column not found in biofuel factors: {e}. Available columns: {list(self.biofuel_factors.columns)}"
-            ####print(error_msg)
-            return {'pathways': [], 'error': error_msg}
-        except Exception as e:
-            error_msg = f"Error processing biofuel pathways: {e}"
-            ####print(error_msg)
-            return {'pathways': [], 'error': error_msg}
+        pathways = [
+            {'name': str(name), 'typical_value': int(self.registry.biofuel_saving(name))}
+            for name in self.registry.biofuel_names
+        ]
+        return {'pathways': pathways, 'error': None}
     
     def calculate_wtt_ghg_biofuel(self, ttw_co2: float, biofuel_percentage: float) -> float:
         """
@@ -146,7 +121,7 @@ class EUMarineEmissionCalculator:
         
         Args:
             fuel_data: List of fuel consumption data dictionaries
-            target_year: Target year for GHG intensity (2025-2029)
+            target_year: Target year for GHG intensity (2025 on, see GHG_INTENSITY_REDUCTION)
             
         Returns:
             Results with intermediate calculations populated step by step
@@ -282,8 +257,7 @@ class EUMarineEmissionCalculator:
                     if biofuel_option == 2 and biofuel_pathway:
                         # Option 2: Get percentage from pathway lookup
                         try:
-                            raw_percentage = self.biofuel_factors.loc[biofuel_pathway, 'ghg_emissions_saving_typical_value']
-                            percentage = float(raw_percentage) if pd.notna(raw_percentage) else 0  # Convert numpy types
+                            percentage = self.registry.biofuel_saving(biofuel_pathway)
                         except KeyError:
                             ###print(f"Biofuel pathway '{biofuel_pathway}' not found, using default WtT GHG")
                             percentage = 0
@@ -648,7 +622,7 @@ class EUMarineEmissionCalculator:
         
         This step calculates 4 GHG intensity-related values:
         1. WtW GHG Intensity (GHGIEactual): =C68+C69+C70+C71 (sum of TtW emissions)
-        2. GHG Intensity Target in 2025 (GHGIEtarget): 91.16 × 0.98 (calculated using constants)
+        2. GHG Intensity Target (GHGIEtarget): 91.16 × (1 - reduction of target_year), × 0.98 in 2025-2029
         3. TtWGHG Intensity: =(1-C72)*(C69+C70+C71)+(C72*C66)/C61
         4. WtTGHG Intensity: =C68*C85
         
@@ -678,10 +652,8 @@ class EUMarineEmissionCalculator:
             # This includes both Well-to-Tank (WtT) and Tank-to-Wake (TtW) emissions
             wtw_ghg_intensity = wtt_ghg + ttw_co2 + ttw_ch4 + ttw_n2o  # gCO2eq/MJ
             
-            # 2. GHG Intensity Target: Calculate using constants (91.16 × 0.98)
-            baseline_intensity = self.CONSTANTS['GHG_INTENSITY_BASELINE']  # 91.16
-            reduction_factor = 0.98  # 2% reduction for 2025
-            ghg_intensity_target = baseline_intensity * reduction_factor  # gCO2eq/MJ
+            # 2. GHG Intensity Target: Baseline 91.16 less the reduction of target_year (× 0.98 for 2025)
+            ghg_intensity_target = self.ghg_intensity_target(target_year)  # gCO2eq/MJ
             
             # 3. TtWGHG Intensity: =(1-C72)*(C69+C70+C71)+(C72*C66)/C61
             # This accounts for carbon slip effects on TtW emissions
@@ -850,7 +822,7 @@ class EUMarineEmissionCalculator:
             if not fuel.get('fuel_type'):
                 return {'valid': False, 'error': f"Fuel type missing for fuel {i+1}"}
             
-            if fuel.get('fuel_type') not in self.fuel_properties.index:
+            if fuel.get('fuel_type') not in self.registry:
                 return {'valid': False, 'error': f"Unknown fuel type: {fuel.get('fuel_type')}"}
             
             within_eu = fuel.get('fuel_consumption_within_eu', 0)
@@ -861,6 +833,155 @@ class EUMarineEmissionCalculator:
         
         return {'valid': True, 'error': None}
 
+    def calculate_compliance_batch(self, fuel_types: Sequence[str], fuel_within_eu, fuel_in_out_eu=None,
+                                   target_year: int = 2025) -> Dict[str, np.ndarray]:
+        """
+        Phase 1 and Phase 2 for N iterations at once (standard fuels, no biofuel blending)
+
+        Gives the same numbers as calculate_emissions_phase2 run on each row: the
+        per-fuel constants come from the same formulas, every array operation
+        follows the order of the scalar ones and both sum over the fuels with
+        fuel_sum(), so the results are bit-identical.
+
+        Args:
+            fuel_types: F fuel pathway names (columns of the mass arrays)
+            fuel_within_eu: (N, F) fuel consumption within EU/EEA in tonnes
+            fuel_in_out_eu: (N, F) fuel consumption in & out of EU/EEA in tonnes (default 0)
+            target_year: Reporting year of the GHG intensity target
+
+        Returns:
+            Dict of (N,) arrays named like the Phase 2 final_results: energy_use_in_scope,
+            wtt_ghg_intensity_aggregate, ttw_ghg_intensity_aggregate, ghg_intensity_actual,
+            compliance_balance_gco2eq, compliance_balance_tco2eq, penalty, ghg_emission;
+            plus the scalar ghg_intensity_target_2025_2029
+        """
+        within = np.atleast_2d(np.asarray(fuel_within_eu, dtype=np.float64))
+        in_out = np.zeros_like(within) if fuel_in_out_eu is None else np.atleast_2d(np.asarray(fuel_in_out_eu, dtype=np.float64))
+        results = self._batch_ghg_intensity(fuel_types, within, in_out)
+        target = self.ghg_intensity_target(target_year)
+        balance, penalty = self._batch_compliance(target, results['ghg_intensity_actual'], results['energy_use_in_scope'])
+        results.update({
+            'ghg_intensity_target_2025_2029': target,
+            'compliance_balance_gco2eq': balance,
+            'compliance_balance_tco2eq': balance / 1000000,
+            'penalty': penalty,
+        })
+        return results
+
+    def calculate_compliance_scenarios(self, fuel_types: Sequence[str], fuel_consumption, target_years: Sequence[int],
+                                       in_out_shares: Sequence[float] = (0.0,)) -> Dict[str, np.ndarray]:
+        """
+        Compliance of N iterations for S scope splits and Y reporting years in one pass
+
+        Scope split s puts the share s of every fuel on voyages in & out of EU/EEA
+        and the rest within EU/EEA; share 0 in target year y gives exactly
+        calculate_compliance_batch(fuel_types, fuel_consumption, target_year=y).
+
+        Args:
+            fuel_types: F fuel pathway names
+            fuel_consumption: (N, F) fuel consumption in tonnes
+            target_years: Y reporting years (2025 on)
+            in_out_shares: S shares between 0 and 1
+
+        Returns:
+            Dict with target_years (Y,), in_out_shares (S,), ghg_intensity_target (Y,),
+            ghg_intensity_actual, energy_use_in_scope, ghg_emission (S, N),
+            compliance_balance_tco2eq and penalty (S, Y, N)
+        """
+        consumption = np.atleast_2d(np.asarray(fuel_consumption, dtype=np.float64))
+        shares = np.asarray(in_out_shares, dtype=np.float64).reshape(-1)
+        if ((shares < 0) | (shares > 1)).any():
+            raise ValueError("In & out of EU/EEA shares must be between 0 and 1")
+        targets = np.array([self.ghg_intensity_target(year) for year in target_years], dtype=np.float64)
+
+        n, f = consumption.shape
+        within = (consumption[None] * (1 - shares)[:, None, None]).reshape(-1, f)
+        in_out = (consumption[None] * shares[:, None, None]).reshape(-1, f)
+        results = {key: value.reshape(len(shares), n)
+                   for key, value in self._batch_ghg_intensity(fuel_types, within, in_out).items()}
+        balance, penalty = self._batch_compliance(targets[None, :, None],
+                                                  results['ghg_intensity_actual'][:, None, :],
+                                                  results['energy_use_in_scope'][:, None, :])
+        return {
+            'target_years': np.asarray(target_years, dtype=np.int64),
+            'in_out_shares': shares,
+            'ghg_intensity_target': targets,
+            'ghg_intensity_actual': results['ghg_intensity_actual'],
+            'energy_use_in_scope': results['energy_use_in_scope'],
+            'ghg_emission': results['ghg_emission'],
+            'compliance_balance_tco2eq': balance / 1000000,
+            'penalty': penalty,
+        }
+
+    def _batch_ghg_intensity(self, fuel_types: Sequence[str], within: np.ndarray, in_out: np.ndarray) -> Dict[str, np.ndarray]:
+        """Phase 1 Steps 4-6 and the Phase 2 aggregates that do not depend on the target"""
+        fuel_types = list(fuel_types)
+        if within.ndim != 2 or within.shape[1] != len(fuel_types) or in_out.shape != within.shape:
+            raise ValueError(f"Fuel mass arrays must have shape (N, {len(fuel_types)}), got {within.shape} and {in_out.shape}")
+        if (within < 0).any() or (in_out < 0).any():
+            raise ValueError("Negative fuel consumption values")
+
+        scope_within_eu = self.CONSTANTS['DEFAULT_FUEL_SCOPE_WITHIN_EU']
+        scope_in_out_eu = self.CONSTANTS['DEFAULT_FUEL_SCOPE_IN_OUT_EU']
+
+        # Per-fuel terms, summed over the fuels with fuel_sum() as in Phase 2
+        energy_use_scopes = []
+        wtt_terms = []
+        ttw_terms = []
+        denominator_terms = []
+        ghg_emissions = []
+        for i, fuel_type in enumerate(fuel_types):
+            if fuel_type not in self.registry:
+                raise ValueError(f"Fuel '{fuel_type}' not found in fuel properties database")
+            fuel = self.registry.pathway(fuel_type)
+            if fuel.ttw_ghg_intensity is None:
+                raise ValueError(f"Fuel '{fuel_type}' has no LCV")
+            lcv = fuel.lcv
+            # Step 4: energy use in scope (MJ)
+            energy_use_scope = (
+                (in_out[:, i] * lcv * scope_in_out_eu / 100) +
+                (within[:, i] * lcv * scope_within_eu / 100)
+            )
+            # Step 6: GHG emission
+            ghg_emissions.append(fuel.cf_co2 * within[:, i] + fuel.cf_co2 * in_out[:, i])
+
+            energy_use_scopes.append(energy_use_scope)
+            wtt_terms.append(fuel.wtt_ghg * energy_use_scope * 1000000)
+            ttw_terms.append(fuel.ttw_ghg_intensity * energy_use_scope * 1000000)
+            denominator_terms.append(energy_use_scope * 1000000)
+        energy_use_total = fuel_sum(energy_use_scopes)
+        wtt_numerator = fuel_sum(wtt_terms)
+        ttw_numerator = fuel_sum(ttw_terms)
+        denominator = fuel_sum(denominator_terms)
+        ghg_emission = fuel_sum(ghg_emissions)
+
+        n = within.shape[0]
+        denominator = np.broadcast_to(denominator, n)
+        has_energy = denominator > 0
+        safe_denominator = np.where(has_energy, denominator, 1.0)
+        wtt_aggregate = np.where(has_energy, wtt_numerator / safe_denominator, 0.0)
+        ttw_aggregate = np.where(has_energy, ttw_numerator / safe_denominator, 0.0)
+        return {
+            'energy_use_in_scope': np.broadcast_to(energy_use_total * 1000000, n).astype(np.float64),
+            'wtt_ghg_intensity_aggregate': wtt_aggregate,
+            'ttw_ghg_intensity_aggregate': ttw_aggregate,
+            'ghg_intensity_actual': wtt_aggregate + ttw_aggregate,
+            'ghg_emission': np.broadcast_to(ghg_emission, n).astype(np.float64),
+        }
+
+    def _batch_compliance(self, target, ghg_intensity_actual, energy_use_in_scope):
+        """Phase 2 compliance balance (gCO2eq) and penalty (EUR), broadcast over the arguments"""
+        compliance_balance_gco2eq = (target - ghg_intensity_actual) * energy_use_in_scope
+        # No penalty with a surplus; without any energy use (nothing burnt) Phase 2 has no penalty to compute either
+        penalised = (compliance_balance_gco2eq <= 0) & (ghg_intensity_actual != 0)
+        safe_actual = np.where(penalised, ghg_intensity_actual, 1.0)
+        penalty = np.where(
+            penalised,
+            np.abs(compliance_balance_gco2eq) / (safe_actual * self.CONSTANTS['VLSFO_LCV']) * self.CONSTANTS['FUEL_PENALTY_RATE'],
+            0.0,
+        )
+        return compliance_balance_gco2eq, penalty
+
     def calculate_emissions_phase2(self, fuel_data: List[Dict[str, Any]], target_year: int = 2025) -> Dict[str, Any]:
         """
         Phase 2: Aggregate calculations for final results
@@ -870,7 +991,7 @@ class EUMarineEmissionCalculator:
         
         Args:
             fuel_data: List of fuel consumption data dictionaries
-            target_year: Target year for GHG intensity (2025-2029)
+            target_year: Target year for GHG intensity (2025 on, see GHG_INTENSITY_REDUCTION)
             
         Returns:
             Results with final aggregate calculations
@@ -885,17 +1006,17 @@ class EUMarineEmissionCalculator:
             # Phase 2 aggregate calculations
             final_results = {}
             
-            # 1. GHG Intensity Target 2025-2029 (GHGIEtarget) = C87*(1-0.02)
-            # Using the baseline GHG intensity with 2% reduction for 2025-2029
-            ghg_intensity_target_2025_2029 = self.CONSTANTS['GHG_INTENSITY_BASELINE'] * (1 - 0.02)
+            # 1. GHG Intensity Target (GHGIEtarget) = C87*(1-0.02)
+            # Using the baseline GHG intensity with the reduction of target_year (2% for 2025-2029)
+            ghg_intensity_target_2025_2029 = self.ghg_intensity_target(target_year)
             final_results['ghg_intensity_target_2025_2029'] = ghg_intensity_target_2025_2029
             
             # 2. Leg Energy Total in EU = C81+D81+E81+F81+G81+H81 (sum of energy_in_eu)
-            leg_energy_total_in_eu = sum(fuel['energy_in_eu'] for fuel in fuel_breakdown)
+            leg_energy_total_in_eu = fuel_sum(fuel['energy_in_eu'] for fuel in fuel_breakdown)
             final_results['leg_energy_total_in_eu'] = leg_energy_total_in_eu
             
             # 3. Leg Energy Total Out of EU = C82+D82+E82+F82+G82+H82 (sum of energy_out_eu)
-            leg_energy_total_out_eu = sum(fuel['energy_out_eu'] for fuel in fuel_breakdown)
+            leg_energy_total_out_eu = fuel_sum(fuel['energy_out_eu'] for fuel in fuel_breakdown)
             final_results['leg_energy_total_out_eu'] = leg_energy_total_out_eu
             
             # 4. FuelEU Energy Total in EU = C95*C79 (leg_energy_total_in_eu * fuel_scope_within_eu)
@@ -909,22 +1030,22 @@ class EUMarineEmissionCalculator:
             final_results['fueleu_energy_total_out_eu'] = fueleu_energy_total_out_eu
             
             # 6. Energy Use in Scope = (C85+D85+E85+F85+G85+H85)*1000000 (sum of energy_use_scope in MJ)
-            energy_use_in_scope = sum(fuel['energy_use_scope'] for fuel in fuel_breakdown) * 1000000
+            energy_use_in_scope = fuel_sum(fuel['energy_use_scope'] for fuel in fuel_breakdown) * 1000000
             final_results['energy_use_in_scope'] = energy_use_in_scope
             
             # 7. WtT GHG Intensity = ((C68*C85*1000000)+(D68*D85*1000000)+...)/((C85*C73*1000000)+(D85*D73*1000000)+...)
             # Numerator: sum of (wtt_ghg * energy_use_scope * 1000000) for each fuel
             # Denominator: sum of (energy_use_scope * 1000000) for each fuel (C73 appears to be 1, not fuel_scope)
-            wtt_numerator = sum(fuel['wtt_ghg'] * fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
-            wtt_denominator = sum(fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
+            wtt_numerator = fuel_sum(fuel['wtt_ghg'] * fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
+            wtt_denominator = fuel_sum(fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
             wtt_ghg_intensity_aggregate = wtt_numerator / wtt_denominator if wtt_denominator > 0 else 0
             final_results['wtt_ghg_intensity_aggregate'] = wtt_ghg_intensity_aggregate
             
             # 8. TtW GHG Intensity = ((C89*C85*1000000)+(D89*D85*1000000)+...)/((C85*C73*1000000)+(D85*D73*1000000)+...)
             # Numerator: sum of (ttw_ghg_intensity * energy_use_scope * 1000000) for each fuel
             # Denominator: sum of (energy_use_scope * 1000000) for each fuel (C73 appears to be 1, not fuel_scope)
-            ttw_numerator = sum(fuel['ttw_ghg_intensity'] * fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
-            ttw_denominator = sum(fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
+            ttw_numerator = fuel_sum(fuel['ttw_ghg_intensity'] * fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
+            ttw_denominator = fuel_sum(fuel['energy_use_scope'] * 1000000 for fuel in fuel_breakdown)
             ttw_ghg_intensity_aggregate = ttw_numerator / ttw_denominator if ttw_denominator > 0 else 0
             final_results['ttw_ghg_intensity_aggregate'] = ttw_ghg_intensity_aggregate
             
@@ -955,7 +1076,7 @@ class EUMarineEmissionCalculator:
             final_results['penalty'] = penalty
             
             # Add total GHG emission (sum of all fuels, in tonnes)
-            total_ghg_emission = sum(fuel.get('ghg_emission', 0) for fuel in fuel_breakdown)
+            total_ghg_emission = fuel_sum(fuel.get('ghg_emission', 0) for fuel in fuel_breakdown)
             final_results['ghg_emission'] = total_ghg_emission
             
             # Log Phase 2 results
@@ -984,4 +1105,41 @@ class EUMarineEmissionCalculator:
             
         except Exception as e:
             ###print(f"Phase 2 calculation error: {e}")
-            raise 
\ No newline at end of file
+            raise 
+
+
+@lru_cache(maxsize=None)
+def get_emission_calculator() -> EUMarineEmissionCalculator:
+    """Shared calculator (it keeps no state between calculations)"""
+    return EUMarineEmissionCalculator()
+
+
+def fuel_sum(values):
+    """
+    Sum over fuels with Neumaier's compensated summation, the algorithm of the
+    builtin sum() on floats since Python 3.12
+
+    Phase 2 (floats) and the batch path (arrays, summed element-wise) both
+    use it, so they round the same on every interpreter.
+
+    Args:
+        values: Floats, or NumPy arrays of one shape
+
+    Returns:
+        The sum (0.0 for no values)
+    """
+    total = 0.0
+    compensation = 0.0
+    for value in values:
+        t = total + value
+        if isinstance(t, np.ndarray):
+            compensation = compensation + np.where(np.abs(total) >= np.abs(value), (total - t) + value, (value - t) + total)
+        elif abs(total) >= abs(value):
+            compensation += (total - t) + value
+        else:
+            compensation += (value - t) + total
+        total = t
+    # Like sum(), a zero or non-finite compensation is not added
+    if isinstance(compensation, np.ndarray):
+        return np.where((compensation != 0) & np.isfinite(compensation), total + compensation, total)
+    return total + compensation if compensation and math.isfinite(compensation) else total
@@ -1,60 +1,103 @@
+import re
+
+import numpy as np
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 from pathlib import Path
 from flask import current_app
+
+# Time series sheet: column header -> iteration key
+SERIES_COLUMNS = [
+    ("Time (h)", "time (h)"),
+    ("Power Demand (kW)", "power_demand (KW)"),
+    ("Gen 1 Power (kW)", "gen_1_power (KW)"),
+    ("Gen 2 Power (kW)", "gen_2_power (KW)"),
+    ("Gen 3 Power (kW)", "gen_3_power (KW)"),
+    ("Gen 1 Energy (kWh)", "Gen1 Energy (kWh)"),
+    ("Gen 2 Energy (kWh)", "Gen2 Energy (kWh)"),
+    ("Gen 3 Energy (kWh)", "Gen3 Energy (kWh)"),
+    ("Battery SOC (%)", "battery_soc (%)"),
+    ("Battery Discharge (KW)", "battery_discharge (KW)"),
+    ("Battery Charge (KW)", "battery_charge (KW)"),
+    ("Battery Discharging Energy (kWh)", "Battery Charging Energy(kWh)"),
+    ("Battery Charging Energy(kWh)", "Battery Discharging Energy(kWh)"),
+    ("Wasted Power (KW)", "Wasted Power (kW)"),
+    ("Battery Measured Power (kW)", "battery_measured_power (kW)"),
+]
+
+# Computed from "Wasted Power (kW)"
+DERIVED_SERIES_HEADERS = ["Inefficient Performance (KW)", "Under Supply (KW)", "Power Balance Check", "Significant Check?"]
+
+ILLEGAL_SHEET_CHARS = re.compile(r"[\[\]\:\*\?\/\\']")
+MAX_SHEET_NAME_LEN = 31
+
+
 class ExcelGenerator:
     """
     Export batch simulation results to Excel file with multiple sheets.
-    
+
+    The workbook is written in openpyxl's write-only mode and each sheet is
+    closed as soon as its rows are written, so only one iteration is held
+    in memory at a time, whatever the batch size.
+
     Args:
         batch_data: Dictionary containing batch simulation results
-        
+        iterations: Function returning a fresh iterable of iteration dicts, called
+            once per pass (optional, default batch_data["batch_sim_res_collection"])
+        summaries: Same for the overview sheet, which only reads scalars (optional, default iterations)
+
     Returns:
         Filename of the created Excel file
     """
-    def __init__(self, batch_data):
+    def __init__(self, batch_data, iterations=None, summaries=None):
         self.batch_data = batch_data
-    def export_batch_to_excel(self):
+        self.iterations = iterations or (lambda: batch_data.get("batch_sim_res_collection", []) or [])
+        self.summaries = summaries or self.iterations
+
+    def export_batch_to_excel(self, output_path=None):
         """
         Export batch simulation results to Excel file with multiple sheets.
-        
+
         Args:
-            batch_data: Dictionary containing batch simulation results
-            
+            output_path: File to write (optional, default <instance>/<batch title>.xlsx)
+
         Returns:
             Filename of the created Excel file
         """
-        wb = Workbook()
-        
-        # Remove default sheet
-        if 'Sheet' in wb.sheetnames:
-            wb.remove(wb['Sheet'])
-        
+        wb = Workbook(write_only=True)
+
+        # Sheet 2: Iterations Overview (written first, it counts the iterations for the summary)
+        ws_overview = wb.create_sheet("Iterations_Overview")
+        count = self._create_iterations_overview_sheet(ws_overview, self.summaries())
+        ws_overview.close()
+
         # Sheet 1: Batch Summary
-        ws_batch = wb.create_sheet("Batch_Summary", 0)
-        self._create_batch_summary_sheet(ws_batch, self.batch_data)
-        
-        # Sheet 2: Iterations Overview
-        ws_overview = wb.create_sheet("Iterations_Overview", 1)
-        self._create_iterations_overview_sheet(ws_overview, self.batch_data)
-        
+        ws_batch = wb.create_sheet("Batch_Summary")
+        self._create_batch_summary_sheet(ws_batch, self.batch_data, count)
+        ws_batch.close()
+        wb.move_sheet("Batch_Summary", -1)
+
         # Sheets 3+: Individual iteration sheets
-        iterations = self.batch_data.get("batch_sim_res_collection", [])
-        for idx, iteration in enumerate(iterations):
+        for idx, iteration in enumerate(self.iterations()):
             sheet_name = self._generate_iteration_sheet_name(iteration, idx)
-            ws_iter = wb.create_sheet(sheet_name, idx + 2)
+            ws_iter = wb.create_sheet(sheet_name)
             self._create_iteration_detail_sheet(ws_iter, iteration)
-        
+            ws_iter.close()
+
         # Save Excel file
-        safe_title = self._sanitize_filename(self.batch_data.get("batch_sim_title", "batch"))
-        filename = f"{safe_title}.xlsx"
-        output_path = Path(current_app.instance_path) / filename
+        if output_path is None:
+            safe_title = self._sanitize_filename(self.batch_data.get("batch_sim_title", "batch"))
+            output_path = Path(current_app.instance_path) / f"{safe_title}.xlsx"
         wb.save(output_path)
-        
-        return filename
-    
-    def _create_batch_summary_sheet(self, ws, batch_data):
+
+        return Path(output_path).name
+
+    def _create_batch_summary_sheet(self, ws, batch_data, count):
         """Create the batch summary sheet with basic batch information."""
+        # Write-only sheets take column widths before the first row
+        for col in range(1, 3):
+            ws.column_dimensions[get_column_letter(col)].width = 25
+
         ws.append(["Batch Simulation Summary"])
         ws.append([])  # Empty row
         
@@ -63,16 +106,11 @@ class ExcelGenerator:
         ws.append(["Timestamp", batch_data.get("batch_sim_time_stamp", "N/A")])
         ws.append(["Vessel Name", batch_data.get("vessel_name", "N/A")])
         ws.append(["Batch Size", batch_data.get("batch_size", 0)])
-        ws.append(["Actual Iterations", len(batch_data.get("batch_sim_res_collection", []))])
-        
-        # Auto-size columns
-        for col in range(1, 3):
-            ws.column_dimensions[get_column_letter(col)].width = 25
-    
-    def _create_iterations_overview_sheet(self,ws, batch_data):
-        """Create the iterations overview sheet with summary of all iterations."""
-        iterations = batch_data.get("batch_sim_res_collection", [])
-        
+        ws.append(["Actual Iterations", count])
+
+    def _create_iterations_overview_sheet(self, ws, iterations):
+        """Create the iterations overview sheet with summary of all iterations; returns their number."""
+
         # Header row
         headers = [
             "Iteration ID",
@@ -119,10 +157,14 @@ class ExcelGenerator:
             "Gen2 Mass (KG)",
             "Gen3 Mass (KG)"
         ]
+        for col in range(1, len(headers) + 1):
+            ws.column_dimensions[get_column_letter(col)].width = 18
         ws.append(headers)
-        
+
         # Data rows
+        count = 0
         for iteration in iterations:
+            count += 1
             sime_name = iteration.get("sim_name", "N/A")
             sequence = iteration.get("sequence", "N/A")
             battery_name = iteration.get("battery_name", "N/A")
@@ -132,9 +174,10 @@ class ExcelGenerator:
             gen_mass = iteration.get("Gen Mass", [0,0,0])
             gen_volume = iteration.get("Gen Volumes", [0,0,0])
             battery_spec = iteration.get("Battery Specs", [0,0,0])
-            energy_balance = "True" if iteration.get("Total Energy Wasted (kWh)") == 0 else "False"
-            wastered_energy_significance_check = "True" if iteration.get("Total Energy Wasted (kWh)") >  10  else "False"
-            limitation_check  = "Use Less Engine" if iteration.get("Total Energy Wasted (kWh)") >  10 else "Use More Battery" if  iteration.get("Total Energy Wasted (kWh)") < -10 else "None"
+            wasted = iteration.get("Total Energy Wasted (kWh)") or 0
+            energy_balance = "True" if wasted == 0 else "False"
+            wastered_energy_significance_check = "True" if wasted > 10 else "False"
+            limitation_check = "Use Less Engine" if wasted > 10 else "Use More Battery" if wasted < -10 else "None"
             # Parse sequence to extract generator names
             gen_names =self._parse_generator_names_from_sequence(sequence)
             
@@ -178,10 +221,7 @@ class ExcelGenerator:
                 gen_mass[2]
             ]
             ws.append(row)
-        
-        # Auto-size columns
-        for col in range(1, len(headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 18
+        return count
     
     def _generate_iteration_sheet_name(self, iteration, idx):
         """Generate a unique sheet name for an iteration (max 31 characters)."""
@@ -213,6 +253,9 @@ class ExcelGenerator:
     
     def _create_iteration_detail_sheet(self, ws, iteration):
         """Create detailed sheet for a single iteration."""
+        for col in range(1, len(SERIES_COLUMNS) + len(DERIVED_SERIES_HEADERS) + 1):
+            ws.column_dimensions[get_column_letter(col)].width = 20
+
         # Section 1: Basic Information
         ws.append(["Iteration Details"])
         ws.append([])
@@ -252,81 +295,23 @@ class ExcelGenerator:
         ws.append([])
         
 
-        # Headers for time series
-        time_series_headers = [
-            "Time (h)",
-            "Power Demand (kW)",
-            "Gen 1 Power (kW)",
-            "Gen 2 Power (kW)",
-            "Gen 3 Power (kW)",
-            "Gen 1 Energy (kWh)",
-            "Gen 2 Energy (kWh)",
-            "Gen 3 Energy (kWh)",
-            "Battery SOC (%)",
-            "Battery Discharge (KW)",
-            "Battery Charge (KW)",
-            "Battery Discharging Energy (kWh)",
-            "Battery Charging Energy(kWh)",
-            "Wasted Power (KW)",
-            "Battery Measured Power (kW)",
-            "Inefficient Performance (KW)",
-            "Under Supply (KW)",
-            "Power Balance Check",
-            "Significant Check?",
+        ws.append([header for header, _ in SERIES_COLUMNS] + DERIVED_SERIES_HEADERS)
+
+        columns = [_series(iteration, key) for _, key in SERIES_COLUMNS]
+        wasted_power = _series(iteration, "Wasted Power (kW)").astype(np.float64)
+        columns += [
+            np.where(wasted_power > 0, wasted_power, 0),
+            np.where(wasted_power < 0, wasted_power, 0),
+            np.where(wasted_power == 0, "True", "False"),
+            np.where(np.abs(wasted_power) > 5, "True", "False"),
         ]
-        ws.append(time_series_headers)
-        
-        # Extract time series data
-        time = iteration.get("time (h)", [])
-        power_demand = iteration.get("power_demand (KW)", [])
-        gen1_power = iteration.get("gen_1_power (KW)", [])
-        gen2_power = iteration.get("gen_2_power (KW)", [])
-        gen3_power = iteration.get("gen_3_power (KW)", [])
-        gen1_energy = iteration.get("Gen1 Energy (kWh)", [])
-        gen2_energy = iteration.get("Gen2 Energy (kWh)", [])
-        gen3_energy = iteration.get("Gen3 Energy (kWh)", [])
-        battery_soc = iteration.get("battery_soc (%)", [])
-        battery_discharge = iteration.get("battery_discharge (KW)", [])
-        battery_charge = iteration.get("battery_charge (KW)", [])
-        battery_charge_energy = iteration.get("Battery Charging Energy(kWh)", [])
-        battery_discharge_energy =iteration.get("Battery Discharging Energy(kWh)", [])
-        wasted_power = iteration.get("Wasted Power (kW)", [])
-        battery_measured = iteration.get("battery_measured_power (kW)", [])
-        over_supply =  [w if w > 0 else 0 for w in wasted_power]
-        under_supply = [w if w < 0 else 0 for w in wasted_power]
-        power_balance_check = ["True" if w == 0 else "False" for w in wasted_power]
-        signicant_check = ["True" if abs(w) > 5 else "False" for w in wasted_power]
-    
-        # Write time series data
-        max_len = max(len(time), len(power_demand), len(gen1_power))
-        for i in range(max_len):
-            row = [
-                time[i] if i < len(time) else "",
-                power_demand[i] if i < len(power_demand) else "",
-                gen1_power[i] if i < len(gen1_power) else "",
-                gen2_power[i] if i < len(gen2_power) else "",
-                gen3_power[i] if i < len(gen3_power) else "",
-                gen1_energy[i] if i < len(gen1_energy) else "",
-                gen2_energy[i] if i < len(gen2_energy) else "",
-                gen3_energy[i] if i < len(gen3_energy) else "",
-                battery_soc[i] if i < len(battery_soc) else "",
-                battery_discharge[i] if i < len(battery_discharge) else "",
-                battery_charge[i] if i < len(battery_charge) else "",
-                battery_charge_energy[i] if i < len(battery_charge_energy) else "",
-                battery_discharge_energy[i] if i < len(battery_discharge_energy) else "",
-                wasted_power[i] if i < len(wasted_power) else "",
-                battery_measured[i] if i < len(battery_measured) else "",
-                over_supply[i] if i< len(over_supply) else "",
-                under_supply[i] if i< len(under_supply) else "",
-                power_balance_check[i] if i< len(power_balance_check) else "",
-                signicant_check[i] if i <len(signicant_check) else "",
-            ]
+
+        # Rows run as long as time, power demand or gen 1 power; shorter columns are padded with ""
+        n_rows = max(len(columns[0]), len(columns[1]), len(columns[2]))
+        columns = [_padded(c, n_rows) for c in columns]
+        for row in zip(*columns):
             ws.append(row)
-        
-        # Auto-size columns
-        for col in range(1, len(time_series_headers) + 1):
-            ws.column_dimensions[get_column_letter(col)].width = 20
-    
+
     def _sanitize_filename(self, filename):
 
         """Sanitize filename for filesystem compatibility."""
@@ -360,4 +345,133 @@ class ExcelGenerator:
         return gen_names
 
     
-    
\ No newline at end of file
+    
+
+def _series(iteration, key):
+    values = iteration.get(key)
+    return np.asarray(values if values is not None else [])
+
+
+def _padded(values, n):
+    values = values[:n].tolist()
+    return values + [""] * (n - len(values))
+
+
+def export_batch_series(store, batch_id, output_path):
+    """
+    Export a stored batch with every field as recorded: a key/value batch
+    summary, one row of scalars per iteration, and one sheet of raw series
+    per iteration. Iterations are streamed from the store one at a time.
+
+    Args:
+        store: ResultStore holding the batch
+        batch_id: Batch to export
+        output_path: File to write
+
+    Returns:
+        Filename of the created Excel file
+    """
+    batch = store.get_batch(batch_id, load_iterations=False)
+    count = store.batch_info(batch_id)["iteration_count"]
+
+    # Write-only workbook: every sheet streams to a temp file and is closed when done
+    wb = Workbook(write_only=True)
+    # Batch summary (key/value style)
+    _write_sheet(wb, "Batch_Summary", [
+        ["batch_sim_title", batch.get("batch_sim_title", "")],
+        ["batch_sim_time_stamp", batch.get("batch_sim_time_stamp", "")],
+        ["vessel_name", batch.get("vessel_name", "")],
+        ["batch_size", batch.get("batch_size", "")],
+        ["actual_iterations", count],
+    ])
+
+    # Iterations_Summary (immediately after), built from the catalog without loading series
+    scalar_rows = []
+    for idx, row in enumerate(store.iterations(batch_id)):
+        row_obj = {"iteration_idx": idx}
+        row_obj.update({k: v for k, v in row["scalars"].items() if not _is_listlike(v)})
+        scalar_rows.append(row_obj)
+    if scalar_rows:
+        headers = list(scalar_rows[0].keys())
+        _write_sheet(wb, "Iterations_Summary", [headers] + [[r.get(h) for h in headers] for r in scalar_rows])
+    else:
+        _write_sheet(wb, "Iterations_Summary", [["note"], ["No iterations"]])
+
+    # Iteration sheets (one per iteration), in batch order: "00", "1", "2", ...
+    used_names = set()
+    for idx, it in enumerate(store.iter_batch(batch_id)):
+        series, _scalars = _split_iteration_fields(it)
+        base = _sanitize_sheet_name(idx or "00")
+        name = base
+        n = 1
+        while name in used_names or not name:
+            suffix = f"_{n}"
+            head = base[: MAX_SHEET_NAME_LEN - len(suffix)]
+            name = _sanitize_sheet_name(head + suffix)
+            n += 1
+        used_names.add(name)
+        _write_sheet(wb, name, _series_to_rows(series))
+
+    wb.save(output_path)
+    return Path(output_path).name
+
+
+def _sanitize_sheet_name(name: str) -> str:
+    if not name:
+        name = "Sheet"
+    name = ILLEGAL_SHEET_CHARS.sub("", str(name)).strip()
+    if len(name) > MAX_SHEET_NAME_LEN:
+        name = name[:MAX_SHEET_NAME_LEN]
+    return name or "Sheet"
+
+
+def _is_listlike(v):
+    return isinstance(v, (list, np.ndarray))
+
+
+def _split_iteration_fields(iter_obj: dict):
+    """Split a single iteration object into
+       - series: dict of { key: list }
+       - scalars: dict of non-list values
+    """
+    series = {}
+    scalars = {}
+    for k, v in (iter_obj or {}).items():
+        if _is_listlike(v):
+            series[k] = v
+        else:
+            scalars[k] = v
+    return series, scalars
+
+
+def _column_widths(rows):
+    # Sized by header and first 50 rows; write-only sheets need widths before the first row
+    widths = {}
+    for row in rows[:50]:
+        for col_idx, value in enumerate(row, start=1):
+            if value is not None:
+                widths[col_idx] = max(widths.get(col_idx, 0), len(str(value)))
+    return {col_idx: min(max(10, length + 2), 50) for col_idx, length in widths.items()}
+
+
+def _write_sheet(wb, title, rows):
+    """Append rows to a new write-only sheet of wb and close it."""
+    ws = wb.create_sheet(title=title)
+    for col_idx, width in _column_widths(rows).items():
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+    for row in rows:
+        ws.append(row)
+    ws.close()
+
+
+def _series_to_rows(series: dict):
+    """Turn { col1: [...], col2: [...] } into [ [header...], [row1...], ... ] (shorter columns padded with None)"""
+    keys = list(series.keys())
+    if not keys:
+        return [["no_series_data"]]
+    max_len = max(len(series.get(k, [])) for k in keys)
+    columns = []
+    for k in keys:
+        values = np.asarray(series[k]).tolist()
+        columns.append(values + [None] * (max_len - len(values)))
+    return [keys] + [list(row) for row in zip(*columns)]
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from flask import current_app
+
+from .ExcelGenerator import ExcelGenerator, export_batch_series
+from .ResultExtractionPlan import json_default
+
+# ExcelGenerator layout: batch summary, iterations overview, one detail sheet per iteration
+EXPORT_OVERVIEW = "overview"
+# export_batch_series layout: every stored field, one raw series sheet per iteration
+EXPORT_SERIES = "series"
+EXPORT_KINDS = (EXPORT_OVERVIEW, EXPORT_SERIES)
+
+# Part of every cache key; bump it when a workbook layout changes so old files are not served
+EXPORT_VERSION = 1
+
+
+class ExportJobManager:
+    """
+    Runs Excel exports of stored batches on background threads, so neither
+    the batch request nor the next batch's simulations wait for spreadsheet
+    writing. Finished workbooks are kept under root, named by batch id and
+    a hash of the batch's catalog entry and the layout; exporting the same
+    batch again returns the existing file (or joins the running job).
+
+    Args:
+        root: Directory of the exported workbooks (instance/exports)
+        max_workers: Number of exports written at the same time
+        max_jobs: Finished jobs remembered for status requests
+    """
+
+    def __init__(self, root, max_workers=1, max_jobs=200):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._events = {}
+        self._by_path = {}
+        for tmp in self.root.glob(".*.tmp"):
+            tmp.unlink(missing_ok=True)
+
+    def submit(self, store, batch_id, kind=EXPORT_OVERVIEW):
+        """
+        Export a batch, unless the same export is cached or already running.
+
+        Args:
+            store: ResultStore holding the batch
+            batch_id: Batch to export
+            kind: EXPORT_OVERVIEW or EXPORT_SERIES
+
+        Returns:
+            dict: The job (see get())
+
+        Raises:
+            ValueError: Unknown kind or batch
+        """
+        if kind not in EXPORT_KINDS:
+            raise ValueError(f"Unknown export kind {kind!r}, use one of {', '.join(EXPORT_KINDS)}")
+        info = store.batch_info(batch_id)
+        if info is None:
+            raise ValueError(f"Unknown batch {batch_id}")
+        path = self.root / self._filename(store, info, kind)
+
+        with self._lock:
+            running = self._jobs.get(self._by_path.get(path))
+            if running is not None and running["state"] in ("queued", "running"):
+                return dict(running)
+            job = {
+                "id": secrets.token_hex(8),
+                "batch_id": batch_id,
+                "batch_name": info["title"],
+                "kind": kind,
+                "state": "queued",
+                "cached": False,
+                "filename": path.name,
+                "path": str(path),
+                "error": None,
+                "created": time.time(),
+                "elapsed_s": None,
+            }
+            self._jobs[job["id"]] = job
+            self._events[job["id"]] = threading.Event()
+            self._by_path[path] = job["id"]
+            if path.exists():
+                job.update(state="done", cached=True, elapsed_s=0.0)
+                self._events[job["id"]].set()
+            else:
+                self._executor.submit(self._run, job["id"], store, batch_id, kind, path)
+            self._forget_old()
+            return dict(job)
+
+    def get(self, job_id):
+        """
+        Returns:
+            dict: id, batch_id, batch_name, kind, state (queued/running/done/error), cached,
+                  filename, path, error, created, elapsed_s; or None for an unknown job
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job has finished (or timeout seconds passed) and return it."""
+        event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+        return self.get(job_id)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job_id, store, batch_id, kind, path):
+        with self._lock:
+            self._jobs[job_id]["state"] = "running"
+        started = time.perf_counter()
+        # Written next to the target and renamed, so a cached file is always complete
+        tmp = path.with_name(f".{path.stem}-{secrets.token_hex(4)}.tmp")
+        try:
+            if kind == EXPORT_OVERVIEW:
+                batch = store.get_batch(batch_id, load_iterations=False)
+                # The overview sheet only needs scalars, which come from the catalog
+                ExcelGenerator(batch, iterations=lambda: store.iter_batch(batch_id),
+                               summaries=lambda: (row["scalars"] for row in store.iterations(batch_id))
+                               ).export_batch_to_excel(tmp)
+            else:
+                export_batch_series(store, batch_id, tmp)
+            os.replace(tmp, path)
+            state, error = "done", None
+            print(f"[ExportJobs] {path.name} written in {time.perf_counter() - started:.1f}s")
+        except Exception as e:
+            tmp.unlink(missing_ok=True)
+            state, error = "error", str(e)
+            print(f"[ExportJobs] export of batch {batch_id} failed: {e}")
+        with self._lock:
+            self._jobs[job_id].update(state=state, error=error, elapsed_s=round(time.perf_counter() - started, 2))
+            self._events[job_id].set()
+
+    def _filename(self, store, info, kind):
+        # The batch's catalog entry changes with its content, the id alone could be reused by a new catalog
+        batch = store.get_batch(info["id"], load_iterations=False)
+        content = json.dumps([EXPORT_VERSION, kind, info, batch], sort_keys=True, default=json_default)
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+        title = "".join(c if c.isalnum() or c in "-_" else "_" for c in info["title"])[:80]
+        return f"{info['id']}_{title}_{kind}_{digest}.xlsx"
+
+    def _forget_old(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["state"] in ("done", "error")]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+            del self._events[job_id]
+        self._by_path = {path: job_id for path, job_id in self._by_path.items() if job_id in self._jobs}
+
+
+def get_export_jobs() -> ExportJobManager:
+    """The export job manager created for the running Flask app in create_app()."""
+    return current_app.extensions["export_jobs"]
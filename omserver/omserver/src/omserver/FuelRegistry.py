@@ -0,0 +1,121 @@
+from collections import namedtuple
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+
+import pandas as pd
+
+LOOKUP_TABLES = Path(__file__).parent / "lookup_tables"
+
+# Global Warming Potentials (IPCC AR4 values used in the FuelEU Maritime regulation)
+GWP_CO2 = 1
+GWP_CH4 = 25
+GWP_N2O = 298
+
+# Mass independent values of one fuel pathway; ttw_* in gCO2eq/MJ, c_slip as a fraction.
+# ttw_ghg_intensity is the Phase 1 Step 5 TtWGHG intensity, None for a fuel without LCV.
+FuelPathway = namedtuple("FuelPathway", [
+    "name", "lcv", "wtt_ghg", "cf_co2", "cf_ch4", "cf_n2o", "c_slip",
+    "ttw_co2", "ttw_ch4", "ttw_n2o", "ttw_ghg_intensity",
+])
+
+
+def ttw_per_mj(carbon_factor, lcv, gwp):
+    """Tank-to-Wake emission of one gas per MJ: (C / LCV) × GWP, 0 without LCV."""
+    if lcv <= 0:
+        return 0.0
+    return (carbon_factor / lcv) * gwp
+
+
+class FuelRegistry:
+    """
+    Fuel pathways of the EU lookup tables, read once and never modified.
+
+    The CSV rows are kept as read-only dicts (NaN as 0.0) and every pathway's
+    emission constants are computed up front, so a lookup is a dict hit.
+    Use get_fuel_registry() for the instance shared by the process.
+
+    Args:
+        fuel_properties_path: fuel_properties.csv
+        biofuel_factors_path: biofuel_emission_factors.csv (optional)
+    """
+
+    def __init__(self, fuel_properties_path=LOOKUP_TABLES / "fuel_properties.csv",
+                 biofuel_factors_path=LOOKUP_TABLES / "biofuel_emission_factors.csv"):
+        df = pd.read_csv(fuel_properties_path).set_index("pathway_name")
+        properties = {}
+        pathways = {}
+        for name, row in df.iterrows():
+            props = {key: 0.0 if pd.isna(value) else value for key, value in row.to_dict().items()}
+            properties[name] = MappingProxyType(props)
+            pathways[name] = self._pathway(name, props)
+        self._properties = MappingProxyType(properties)
+        self._pathways = MappingProxyType(pathways)
+        self.names = tuple(pathways)
+
+        savings = {}
+        if biofuel_factors_path is not None and Path(biofuel_factors_path).exists():
+            bio = pd.read_csv(biofuel_factors_path)
+            bio.columns = bio.columns.str.strip()
+            for name, value in zip(bio["pathway_name"], bio["ghg_emissions_saving_typical_value"]):
+                name = name.strip() if isinstance(name, str) else name
+                value = value.strip() if isinstance(value, str) else value
+                savings[name] = float(value) if pd.notna(value) else 0.0
+        self._biofuel_savings = MappingProxyType(savings)
+        self.biofuel_names = tuple(savings)
+
+    @staticmethod
+    def _pathway(name, props):
+        lcv = props.get("lcv_mj_per_g", 0)
+        cf_co2 = props.get("cf_co2_gco2_per_gfuel", 0)
+        cf_ch4 = props.get("cf_ch4_gch4_per_gfuel", 0)
+        cf_n2o = props.get("cf_n2o_gn2o_per_gfuel", 0)
+        c_slip = props.get("c_slip_percent", 0) / 100
+        ttw_co2 = ttw_per_mj(cf_co2, lcv, GWP_CO2)
+        ttw_ch4 = ttw_per_mj(cf_ch4, lcv, GWP_CH4)
+        ttw_n2o = ttw_per_mj(cf_n2o, lcv, GWP_N2O)
+        # TtWGHG = (1 - slip) × (TtW CO2 + CH4 + N2O) + slip × GWP CH4 / LCV
+        ttw_ghg_intensity = (1 - c_slip) * (ttw_co2 + ttw_ch4 + ttw_n2o) + (c_slip * GWP_CH4) / lcv if lcv else None
+        return FuelPathway(name, lcv, props.get("co2_eq_wtt_gco2eq_per_mj", 0), cf_co2, cf_ch4, cf_n2o, c_slip,
+                           ttw_co2, ttw_ch4, ttw_n2o, ttw_ghg_intensity)
+
+    def __contains__(self, name):
+        return name in self._pathways
+
+    def __len__(self):
+        return len(self._pathways)
+
+    def pathway(self, name):
+        """
+        Returns:
+            FuelPathway: Constants of the fuel
+
+        Raises:
+            KeyError: Unknown fuel
+        """
+        return self._pathways[name]
+
+    def properties(self, name):
+        """CSV row of the fuel as a new dict (NaN as 0.0), or None for an unknown fuel."""
+        props = self._properties.get(name)
+        return dict(props) if props is not None else None
+
+    def biofuel_saving(self, pathway_name):
+        """
+        Typical GHG emission saving of a biofuel pathway in %.
+
+        Raises:
+            KeyError: Unknown pathway
+        """
+        return self._biofuel_savings[pathway_name]
+
+    def search(self, search_term):
+        """Fuel names containing search_term (case insensitive)."""
+        term = search_term.lower()
+        return [name for name in self.names if term in name.lower()]
+
+
+@lru_cache(maxsize=None)
+def get_fuel_registry() -> FuelRegistry:
+    """The registry of the packaged lookup tables, loaded on first use."""
+    return FuelRegistry()
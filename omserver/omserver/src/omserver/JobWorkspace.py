@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+
+class JobWorkspace:
+    """
+    A private folder under instance/runs/ holding a snapshot of one model.
+
+    Batches edit and simulate the snapshot instead of instance/<model>.mo, and
+    results land in the workspace, so concurrent batches, uploads and duty
+    cycle changes cannot see each other's half-finished files.
+
+    Args:
+        instance_path: The app's instance folder
+        model_name: Model to snapshot (instance/<model_name>.mo)
+        prefix: Name prefix of the workspace folder
+    """
+
+    def __init__(self, instance_path, model_name, prefix="job"):
+        runs_dir = Path(instance_path) / "runs"
+        runs_dir.mkdir(parents=True, exist_ok=True)
+        self.model_name = model_name
+        self.root = Path(tempfile.mkdtemp(prefix=f"{prefix}_", dir=runs_dir))
+        self.model_path = self.root / f"{model_name}.mo"
+        try:
+            shutil.copyfile(Path(instance_path) / f"{model_name}.mo", self.model_path)
+        except Exception:
+            self.cleanup()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+
+    def result_file(self, result_format="csv") -> Path:
+        return self.root / f"{self.model_name}_res.{result_format}"
+
+    def cleanup(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+def replace_file_atomic(path, data: bytes):
+    """Write data next to path and rename it over path, so readers never see a partial file."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
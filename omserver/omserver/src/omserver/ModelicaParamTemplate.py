@@ -0,0 +1,91 @@
+import hashlib
+import re
+from pathlib import Path
+
+
+class ModelicaParamTemplate:
+    """
+    A model source parsed once, with the offsets of every declaration the
+    batch parsers inject values into:
+
+        ("bsfc", N)       parameter Real BSFC_Curve_N[:, 2] = [...]
+        ("fcc", N)        parameter Real Engine_Fuel_Consumption_Look_Up_Table_Diesle_N[.., 2] = [...]
+        ("gen_is_on", N)  parameter Boolean genN_is_on = true|false
+
+    render() builds a combination's source in one pass over the indexed
+    spans; write() only touches the file when the rendered text differs from
+    what was last written there.
+
+    Args:
+        content: Modelica source text
+    """
+
+    _PATTERNS = {
+        "bsfc": re.compile(
+            r'parameter\s+Real\s+BSFC_Curve_(\d+)\s*\[\s*:\s*,\s*2\s*\]\s*=\s*(\[[^\]]*\])', re.DOTALL),
+        "fcc": re.compile(
+            r'parameter\s+Real\s+Engine_Fuel_Consumption_Look_Up_Table_Diesle_(\d+)\s*\[[^\]]*,\s*2\s*\]\s*=\s*(\[[^\]]*\])',
+            re.DOTALL),
+        "gen_is_on": re.compile(r'\bparameter\s+Boolean\s+gen(\d+)_is_on\s*=\s*(true|false)'),
+    }
+
+    def __init__(self, content):
+        self.content = content
+        spans = []
+        for kind, pattern in self._PATTERNS.items():
+            for m in pattern.finditer(content):
+                spans.append((m.start(2), m.end(2), kind, int(m.group(1))))
+        self._spans = sorted(spans)
+        self._written = {}
+
+    @classmethod
+    def from_file(cls, path):
+        path = Path(path)
+        content = path.read_text(encoding="utf-8")
+        template = cls(content)
+        template._written[str(path)] = _digest(content)
+        return template
+
+    def numbers(self, kind):
+        """Sorted numbers N of the injectable declarations of one kind."""
+        return sorted({n for _, _, k, n in self._spans if k == kind})
+
+    def render(self, values):
+        """
+        Args:
+            values: {(kind, N): replacement text}; declarations not in values keep the template text
+
+        Returns:
+            str: The rendered source
+        """
+        parts = []
+        pos = 0
+        for start, end, kind, n in self._spans:
+            value = values.get((kind, n))
+            if value is None:
+                continue
+            parts.append(self.content[pos:start])
+            parts.append(value)
+            pos = end
+        parts.append(self.content[pos:])
+        return "".join(parts)
+
+    def write(self, path, values):
+        """
+        Render values into path.
+
+        Returns:
+            bool: True if the file was rewritten, False if it already held this source
+        """
+        text = self.render(values)
+        digest = _digest(text)
+        path = Path(path)
+        if self._written.get(str(path)) == digest and path.exists():
+            return False
+        path.write_text(text, encoding="utf-8")
+        self._written[str(path)] = digest
+        return True
+
+
+def _digest(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
@@ -2,21 +2,31 @@ from pathlib import Path
 from flask import current_app
 import re 
 
+# Fixed row count of the fuel consumption tables in runtime-tables mode
+RUNTIME_TABLE_ROWS = 16
+
 class ModelicaSequentialParamParser:
  
     
-    def __init__(self, modelName, bsfc_list, fuelConsumptionTable, gen_is_on_list=None):
+    def __init__(self, modelName, bsfc_list, fuelConsumptionTable, gen_is_on_list=None, table_rows=RUNTIME_TABLE_ROWS, model_dir=None):
         
         self.modelName = modelName
         self.bsfc_list = bsfc_list
         self.fuelConsumptionTable = fuelConsumptionTable
         self.gen_is_on_list = gen_is_on_list if gen_is_on_list else []
+        self.table_rows = table_rows
+        # Folder holding <modelName>.mo, defaults to the instance folder
+        self.model_dir = model_dir
+
+    def _model_path(self) -> Path:
+        return Path(self.model_dir or current_app.instance_path) / f"{self.modelName}.mo"
+
     def initilize_generator_switch(self) -> bool:
         """
         Set all parameter Boolean gen{N}_is_on = (true|false) to false in the .mo file.
         """
         try:
-            path_to_mo = Path(current_app.instance_path) / f"{self.modelName}.mo"
+            path_to_mo = self._model_path()
             content = self._read_mo_file(str(path_to_mo))
             if not content:
                 print("[initilize_generator_switch] Reading Content Error")
@@ -39,7 +49,7 @@ class ModelicaSequentialParamParser:
          
         try:
             # Extract the path 
-            path_to_mo = Path(current_app.instance_path) / f"{self.modelName}.mo"
+            path_to_mo = self._model_path()
             
             # Extract the content of mo file
             content = self._read_mo_file(str(path_to_mo))
@@ -65,6 +75,149 @@ class ModelicaSequentialParamParser:
             print(f"[update_modelica_txt_formate] ERROR: {e}")
             return False
 
+    def update_from_template(self, template) -> bool:
+        """
+        Single-pass equivalent of initilize_generator_switch() followed by
+        update_modelica_txt_formate(): every switch is off unless this
+        combination turns it on, and the curves/tables of the occupied slots
+        are injected. Slots without a value keep the template's text.
+
+        Args:
+            template: ModelicaParamTemplate of the model source
+
+        Returns:
+            bool: True on success
+        """
+        try:
+            values = {("gen_is_on", n): "false" for n in template.numbers("gen_is_on")}
+            for idx, is_on in enumerate(self.gen_is_on_list, start=1):
+                if is_on is not None:
+                    values[("gen_is_on", idx)] = "true" if is_on else "false"
+            for idx, bsfc_value in enumerate(self.bsfc_list, start=1):
+                if bsfc_value:
+                    values[("bsfc", idx)] = self._as_array(bsfc_value)
+            for idx, fcc_value in enumerate(self.fuelConsumptionTable, start=1):
+                if fcc_value:
+                    values[("fcc", idx)] = self._as_array(fcc_value)
+
+            template.write(self._model_path(), values)
+            return True
+
+        except Exception as e:
+            print(f"[update_from_template] ERROR: {e}")
+            return False
+
+    # ---- runtime-tables mode ----
+    # Fuel consumption tables get a fixed [table_rows, 2] size and generator
+    # switches become per-run overrides, so one compiled model serves every
+    # engine choice. BSFC curves stay in the source: the bounds calculator
+    # sizes its arrays from the curve minimum, which makes them structural.
+
+    def prepare_runtime_model(self) -> str:
+        """
+        Rewrite the .mo once for runtime-tables mode.
+
+        Returns:
+            str: The rewritten source, used as the base for every combination ("" on error)
+        """
+        try:
+            path_to_mo = self._model_path()
+            content = self._read_mo_file(str(path_to_mo))
+            if not content:
+                print("[prepare_runtime_model] Reading Content Error")
+                return ""
+
+            content, _ = self._set_all_generators_off(content)
+            pattern = re.compile(
+                r'(parameter\s+Real\s+Engine_Fuel_Consumption_Look_Up_Table_Diesle_\d+\s*)'
+                r'\[\s*[^\]]*,\s*2\s*\](\s*=\s*)\[([^\]]*)\]',
+                flags=re.DOTALL)
+            content, count = pattern.subn(
+                lambda m: f"{m.group(1)}[{self.table_rows}, 2]{m.group(2)}"
+                          f"[{self._format_table(self._pad_table(self._parse_table(m.group(3))))}]",
+                content)
+            print(f"[prepare_runtime_model] Fixed {count} fuel consumption table(s) to {self.table_rows} rows")
+
+            self._write_to_mo_file(path_to_mo, content)
+            return content
+
+        except Exception as e:
+            print(f"[prepare_runtime_model] ERROR: {e}")
+            return ""
+
+    def update_runtime_model(self, template) -> bool:
+        """
+        Write the BSFC curves of the engines that are on into the template
+        of the prepared model. Slots that are off keep the base curve, so
+        combinations with the same running engines produce the same source.
+        The file is only rewritten when it changes.
+
+        Args:
+            template: ModelicaParamTemplate of the source returned by prepare_runtime_model()
+        """
+        try:
+            values = {}
+            for idx, bsfc_value in enumerate(self.bsfc_list, start=1):
+                is_on = idx <= len(self.gen_is_on_list) and self.gen_is_on_list[idx - 1]
+                if bsfc_value and is_on:
+                    values[("bsfc", idx)] = self._as_array(bsfc_value)
+
+            template.write(self._model_path(), values)
+            return True
+
+        except Exception as e:
+            print(f"[update_runtime_model] ERROR: {e}")
+            return False
+
+    def runtime_overrides(self) -> list:
+        """
+        Per-run override values for runtime-tables mode.
+
+        Returns:
+            list: "name=value" strings for the fuel consumption tables and generator switches
+        """
+        overrides = []
+        for idx, fcc_value in enumerate(self.fuelConsumptionTable, start=1):
+            if not fcc_value:
+                continue
+            rows = self._pad_table(self._parse_table(fcc_value))
+            name = f"Engine_Fuel_Consumption_Look_Up_Table_Diesle_{idx}"
+            for i, (x, y) in enumerate(rows, start=1):
+                overrides.append(f"{name}[{i},1]={x}")
+                overrides.append(f"{name}[{i},2]={y}")
+
+        for idx, is_on in enumerate(self.gen_is_on_list, start=1):
+            overrides.append(f"gen{idx}_is_on={'true' if is_on else 'false'}")
+        return overrides
+
+    def _parse_table(self, value: str) -> list:
+        value = value.strip()
+        if value.startswith('[') and value.endswith(']'):
+            value = value[1:-1]
+        rows = []
+        for row in value.split(';'):
+            if row.strip():
+                x, y = (float(v) for v in row.split(','))
+                rows.append((x, y))
+        return rows
+
+    def _pad_table(self, rows: list) -> list:
+        """Pad to table_rows with points past the last x holding the last y (x must stay increasing)."""
+        if len(rows) > self.table_rows:
+            raise ValueError(f"Table has {len(rows)} rows, runtime mode allows {self.table_rows}")
+        last_x, last_y = rows[-1]
+        return rows + [(last_x + k, last_y) for k in range(1, self.table_rows - len(rows) + 1)]
+
+    def _as_array(self, value: str) -> str:
+        # Accept both "[...]" and "..." like the regex replacers do
+        value = value.strip()
+        if value.startswith('[') and value.endswith(']'):
+            value = value[1:-1]
+        return f"[{value}]"
+
+    def _format_table(self, rows: list) -> str:
+        return "; ".join(f"{x:.10g}, {y:.10g}" for x, y in rows)
+
     def _read_mo_file(self, path: str) -> str:
         
         try:
@@ -129,10 +282,11 @@ class ModelicaSequentialParamParser:
             fcc_value = fcc_value[1:-1]
         
         # Pattern to match: parameter Real Engine_Fuel_Consumption_Look_Up_Table_Diesle_1[:, 2] = [old_values];
-        pattern = rf'(parameter\s+Real\s+Engine_Fuel_Consumption_Look_Up_Table_Diesle_{engine_number}\s*\[\s*:\s*,\s*2\s*\]\s*=\s*)\[([^\]]*)\]'
+        # (also a fixed [N, 2] left behind by runtime-tables mode, which is put back to [:, 2])
+        pattern = rf'(parameter\s+Real\s+Engine_Fuel_Consumption_Look_Up_Table_Diesle_{engine_number}\s*)\[\s*[^\]]*,\s*2\s*\](\s*=\s*)\[([^\]]*)\]'
         
         # Replace the array content while keeping the parameter declaration
-        replacement = rf'\1[{fcc_value}]'
+        replacement = rf'\1[:, 2]\2[{fcc_value}]'
         
         modified_content, count = re.subn(pattern, replacement, content, flags=re.DOTALL)
         
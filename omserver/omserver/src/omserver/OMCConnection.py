@@ -1,28 +1,87 @@
+import getpass
 import os
 import secrets
 import shutil
+import socket
 import subprocess
+import tempfile
+import threading
 import time
 from pathlib import Path
 import zmq
 
+# Ports handed out to OMCConnection instances of this process
+_LEASED_PORTS = set()
+_LEASE_LOCK = threading.Lock()
+
 
 class OMCConnection:
+    """
+    One omc process talking ZeroMQ on its own endpoint.
+
+    With port=None (default) omc binds a free ephemeral port itself and
+    publishes it in a port file named after the -z suffix, so any number of
+    connections (threads or worker processes) can start side by side.
+    Passing a port leases the first free port at or above it instead.
+    """
     
-    def __init__(self, random_socket_name=False, port=10000, start_timeout_s=20):
-        self._port = int(port)
-        self._omc_process = self._start_omc_process(random_socket_name)
+    def __init__(self, random_socket_name=False, port=None, start_timeout_s=20):
+        self._leased_port = None
+        self._port_file = None
+        self._port = None if port is None else self._lease_port(int(port))
+        # a suffix is required for the port file when omc picks its own port
+        self._suffix = secrets.token_hex(8) if (random_socket_name or self._port is None) else None
+        self._omc_process = self._start_omc_process()
         self._context = zmq.Context()
-        self._omc_socket = self._create_client_socket()
-        # quick readiness check
-        self._wait_until_ready(timeout_s=start_timeout_s)
+        try:
+            self._endpoint = self._resolve_endpoint(timeout_s=start_timeout_s)
+            self._omc_socket = self._create_client_socket()
+            # quick readiness check
+            self._wait_until_ready(timeout_s=start_timeout_s)
+        except Exception:
+            self.close()
+            raise
 
     def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def endpoint(self):
+        return getattr(self, "_endpoint", None)
+
+    def close(self, timeout_s=5):
+        """Stop the omc process and release the zmq socket/context, port lease and port file."""
+        process = getattr(self, "_omc_process", None)
+        if process is None:
+            self._release_endpoint()
+            return
+        self._omc_process = None
+        try:
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(timeout=timeout_s)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        except Exception:
+            pass
         try:
-            if getattr(self, "_omc_process", None):
-                self._omc_process.terminate()
+            if getattr(self, "_omc_socket", None) is not None:
+                self._omc_socket.close(linger=0)
+            self._context.term()
         except Exception:
             pass
+        self._release_endpoint()
+
+    def is_alive(self):
+        process = getattr(self, "_omc_process", None)
+        return process is not None and process.poll() is None
 
     # ---- helpers, determines OMC path (windows or linux) ----
     def _find_omc(self):
@@ -52,21 +111,85 @@ class OMCConnection:
             "Could not find omc. Set OMC_EXE, add it to PATH, or set OPENMODELICAHOME."
         )
 
-    def _start_omc_process(self, random_socket_name):
+    def _start_omc_process(self):
         omc_executable = self._find_omc()
-        cmd = [omc_executable, "--interactive=zmq", f"--interactivePort={self._port}"]
-        if random_socket_name:
+        cmd = [omc_executable, "--interactive=zmq"]
+        if self._port is not None:
+            cmd.append(f"--interactivePort={self._port}")
+        if self._suffix:
             # clean ASCII token, e.g. 'd9e3a2fbc1c84e33'
-            cmd.append(f"-z={secrets.token_hex(8)}")
+            cmd.append(f"-z={self._suffix}")
+            if self._port is None:
+                self._port_file = self._port_file_path()
+                self._port_file.unlink(missing_ok=True)
 
         # On Windows, avoid popping a console window (optional)
         creationflags = 0x08000000 if os.name == "nt" else 0  # CREATE_NO_WINDOW
         return subprocess.Popen(cmd, creationflags=creationflags)
 
+    # ---- endpoint leasing ----
+    def _lease_port(self, preferred, span=1000):
+        with _LEASE_LOCK:
+            for candidate in range(preferred, min(preferred + span, 65536)):
+                if candidate in _LEASED_PORTS or not self._port_is_free(candidate):
+                    continue
+                _LEASED_PORTS.add(candidate)
+                self._leased_port = candidate
+                return candidate
+        raise RuntimeError(f"No free port for OMC in range {preferred}-{preferred + span - 1}")
+
+    @staticmethod
+    def _port_is_free(port):
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as probe:
+            try:
+                probe.bind(("127.0.0.1", port))
+            except OSError:
+                return False
+        return True
+
+    def _port_file_path(self):
+        # Same naming omc uses for --interactive=zmq with -z=<suffix>
+        if os.name == "nt":
+            name = f"openmodelica.port.{self._suffix}"
+        else:
+            name = f"openmodelica.{getpass.getuser()}.port.{self._suffix}"
+        return Path(tempfile.gettempdir()) / name
+
+    def _resolve_endpoint(self, timeout_s=20):
+        if self._port is not None:
+            return f"tcp://127.0.0.1:{self._port}"
+
+        deadline = time.time() + timeout_s
+        while time.time() < deadline:
+            if self._omc_process.poll() is not None:
+                raise RuntimeError(f"omc exited with code {self._omc_process.returncode} before publishing its port")
+            try:
+                endpoint = self._port_file.read_text(encoding="utf-8").strip()
+                if endpoint:
+                    return endpoint
+            except FileNotFoundError:
+                pass
+            time.sleep(0.05)
+        raise TimeoutError("OMC did not become ready in time.")
+
+    def _release_endpoint(self):
+        port_file = getattr(self, "_port_file", None)
+        if port_file is not None:
+            self._port_file = None
+            try:
+                port_file.unlink(missing_ok=True)
+            except OSError:
+                pass
+        leased = getattr(self, "_leased_port", None)
+        if leased is not None:
+            self._leased_port = None
+            with _LEASE_LOCK:
+                _LEASED_PORTS.discard(leased)
+
     def _create_client_socket(self):
         sock = self._context.socket(zmq.REQ)
         sock.setsockopt(zmq.LINGER, 0)
-        sock.connect(f"tcp://127.0.0.1:{self._port}")
+        sock.connect(self._endpoint)
         return sock
 
     def _wait_until_ready(self, timeout_s=20):
@@ -77,6 +200,9 @@ class OMCConnection:
                 if self._omc_socket.poll(1000) & zmq.POLLIN:
                     _ = self._omc_socket.recv_string()
                     return
+                # REQ sockets cannot send twice without a reply; start over with a fresh one
+                self._omc_socket.close(linger=0)
+                self._omc_socket = self._create_client_socket()
             except Exception:
                 pass
             time.sleep(0.1)
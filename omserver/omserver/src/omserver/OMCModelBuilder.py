@@ -0,0 +1,350 @@
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import current_app
+
+
+class CompiledModel:
+    """
+    A simulation executable produced once by buildModel() and run directly
+    for every combination that shares the same model source.
+
+    Args:
+        model_name: Modelica class that was built
+        executable: Path to the generated simulation executable
+        build_dir: Directory holding the executable and its _init.xml
+        digest: Hash of the model source and build options
+    """
+
+    def __init__(self, model_name, executable, build_dir, digest):
+        self.model_name = model_name
+        self.executable = Path(executable)
+        self.build_dir = Path(build_dir)
+        self.digest = digest
+
+    def run(self, output_path, overrides=None, timeout_s=None, variable_filter=None, output_format="csv"):
+        """
+        Run the executable with per-run -overrideFile and -outputPath.
+
+        Args:
+            output_path: Directory the result file is written to
+            overrides: List of "name=value" strings (optional)
+            timeout_s: Kill the run after this many seconds (optional)
+            variable_filter: Regex of the variables written to the result file (optional, all by default)
+            output_format: "csv" (the build default) or "mat"
+
+        Returns:
+            Path: The result file written by the run
+        """
+        output_path = Path(output_path)
+        output_path.mkdir(parents=True, exist_ok=True)
+
+        cmd = [str(self.executable),
+               f"-inputPath={self.build_dir}",
+               f"-outputPath={output_path}"]
+        overrides = list(overrides or [])
+        if variable_filter:
+            overrides.append(f"variableFilter={variable_filter}")
+        if output_format != "csv":
+            overrides.append(f"outputFormat={output_format}")
+        if overrides:
+            override_file = output_path / f"{self.model_name}_override.txt"
+            override_file.write_text("\n".join(overrides) + "\n", encoding="utf-8")
+            cmd.append(f"-overrideFile={override_file}")
+
+        proc = subprocess.run(cmd, cwd=self.build_dir, env=_runtime_env(),
+                              capture_output=True, text=True, timeout=timeout_s)
+        if proc.returncode != 0:
+            tail = (proc.stdout + proc.stderr).strip().splitlines()[-10:]
+            raise RuntimeError(f"{self.executable.name} exited with code {proc.returncode}: " + "\n".join(tail))
+
+        result_path = output_path / f"{self.model_name}_res.{output_format}"
+        if not result_path.exists():
+            raise FileNotFoundError(f"Simulation did not produce a result file: {result_path}")
+        return result_path
+
+
+class CompiledModelCache:
+    """
+    On-disk store of built models, one folder per build digest, that
+    survives restarts and uploads. Each entry holds the build output plus a
+    meta.json; the meta file's mtime is the last-used time, and the least
+    recently used entries are removed once the cache grows past max_bytes.
+
+    Args:
+        root: Cache directory (instance/build_cache)
+        max_bytes: Size limit of all entries together (None for unlimited)
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, root, max_bytes=None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        """Return the CompiledModel stored under digest, or None."""
+        entry = self.root / digest
+        try:
+            meta = json.loads((entry / self.META_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        executable = entry / meta["executable"]
+        if not executable.exists():
+            return None
+        self.touch(digest)
+        return CompiledModel(meta["model_name"], executable, entry, digest)
+
+    def touch(self, digest):
+        try:
+            os.utime(self.root / digest / self.META_FILE)
+        except OSError:
+            pass
+
+    @contextmanager
+    def build_lock(self, digest):
+        """
+        Hold the lock of one digest across processes (pool workers, other
+        server processes), so only one of them builds it and the others find
+        its entry once they get the lock.
+        """
+        with open(self.root / f".{digest[:16]}.lock", "a+b") as handle:
+            _lock_file(handle)
+            try:
+                yield
+            finally:
+                _unlock_file(handle)
+
+    def staging_dir(self, digest):
+        """A fresh directory to build into; commit() moves it into place."""
+        staging = self.root / f".{digest[:16]}-{secrets.token_hex(4)}.tmp"
+        staging.mkdir(parents=True)
+        return staging
+
+    def commit(self, digest, staging, model_name, executable, meta=None):
+        """
+        Publish a finished build. The rename is atomic, so readers never see
+        a half-written entry; if another process got there first its entry wins.
+        """
+        record = dict(meta or {})
+        record.update({
+            "model_name": model_name,
+            "executable": Path(executable).relative_to(staging).as_posix(),
+            "created": time.time(),
+        })
+        (staging / self.META_FILE).write_text(json.dumps(record, indent=2), encoding="utf-8")
+
+        entry = self.root / digest
+        try:
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+        self.evict(keep=digest)
+        return self.get(digest)
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = []
+            for entry in self.root.iterdir():
+                meta = entry / self.META_FILE
+                if entry.name == keep or not meta.exists():
+                    continue
+                entries.append((meta.stat().st_mtime, _dir_size(entry), entry))
+
+            total = sum(size for _, size, _ in entries)
+            if keep is not None:
+                total += _dir_size(self.root / keep)
+            for _, size, entry in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                print(f"[CompiledModelCache] evicting {entry.name}")
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+
+    def clear_staging(self, older_than_s=3600):
+        """Remove builds left half-done by a crashed process."""
+        cutoff = time.time() - older_than_s
+        for entry in self.root.glob(".*.tmp"):
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry, ignore_errors=True)
+            except OSError:
+                pass
+
+
+class OMCModelBuilder:
+    """
+    Calls buildModel once per distinct model source and hands out the
+    resulting CompiledModel, so a batch only pays for flattening and C
+    compilation when the .mo content (or the build options) actually changes.
+    Builds are kept in a CompiledModelCache keyed by source, OMC version and
+    build options, so they are reused across uploads and restarts.
+
+    Args:
+        cache_root: Directory of the on-disk build cache
+        max_cache_bytes: Size limit of the build cache (None for unlimited)
+    """
+
+    def __init__(self, cache_root, max_cache_bytes=None):
+        self.cache = CompiledModelCache(cache_root, max_cache_bytes)
+        self.cache.clear_staging()
+        self._built = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._omc_version = None
+
+    def build(self, omc, model_path, model_name, start_time=0, stop_time=1,
+              number_of_intervals=500, tolerance=1e-6):
+        """
+        Return the CompiledModel for the current content of model_path,
+        building it with the given OMC session if it is not built yet.
+        """
+        options = (f'startTime={start_time}, stopTime={stop_time}, '
+                   f'numberOfIntervals={number_of_intervals}, tolerance={tolerance}, '
+                   f'outputFormat="csv"')
+        if self._omc_version is None:
+            self._omc_version = omc.request("getVersion()").strip().strip('"')
+        digest = _build_digest(model_path, model_name, f"{self._omc_version}\0{options}")
+
+        with self._lock:
+            compiled = self._built.get(digest)
+            if compiled is not None and compiled.executable.exists():
+                self.cache.touch(digest)
+                return compiled
+            key_lock = self._key_locks.setdefault(digest, threading.Lock())
+
+        with key_lock:
+            compiled = self.cache.get(digest)
+            if compiled is None:
+                with self.cache.build_lock(digest):
+                    # Another process may have built it while this one waited for the lock
+                    compiled = self.cache.get(digest)
+                    if compiled is None:
+                        compiled = self._build(omc, model_path, model_name, options, digest)
+            with self._lock:
+                self._built[digest] = compiled
+        return compiled
+
+    def _build(self, omc, model_path, model_name, options, digest):
+        build_dir = self.cache.staging_dir(digest)
+        print(f"[OMCModelBuilder] building {model_name} ({digest[:16]})")
+
+        try:
+            omc.load_file(model_path)
+            with omc.working_directory(build_dir):
+                result = omc.request(f'buildModel({model_name}, {options})')
+
+            # buildModel returns {"<executable>","<init xml>"}; empty strings on failure
+            exe_name = result.strip().strip("{}").split(",")[0].strip().strip('"')
+            if not exe_name:
+                raise RuntimeError(f"buildModel({model_name}) failed: {omc.request('getErrorString()')}")
+
+            executable = Path(exe_name)
+            if not executable.is_absolute():
+                executable = build_dir / executable
+            if os.name == "nt" and executable.suffix != ".exe":
+                executable = executable.with_suffix(".exe")
+
+            compiled = self.cache.commit(digest, build_dir, model_name, executable, meta={
+                "omc_version": self._omc_version,
+                "build_options": options,
+                "source": str(model_path),
+            })
+        except Exception:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        if compiled is None:
+            raise RuntimeError(f"Build of {model_name} did not produce a usable cache entry")
+        return compiled
+
+
+def get_model_builder() -> OMCModelBuilder:
+    """The builder created for the running Flask app in create_app()."""
+    return current_app.extensions["model_builder"]
+
+
+def variable_filter(columns):
+    """
+    OpenModelica variableFilter that keeps exactly the given result columns.
+
+    Args:
+        columns: Variable names, e.g. ["gain1.y", "battery1.SOC"]
+
+    Returns:
+        str: Anchored regex matching only those names, dots and brackets escaped
+    """
+    return "^(" + "|".join(re.sub(r"([.\[\](){}*+?|^$\\])", r"\\\1", c) for c in columns) + ")$"
+
+
+def modelica_string(text):
+    """Quote text as a Modelica string literal for scripting calls."""
+    return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _build_digest(model_path, model_name, options):
+    h = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(f"\0{model_name}\0{options}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _lock_file(handle):
+    if os.name == "nt":
+        import msvcrt
+        handle.seek(0)
+        while True:
+            try:
+                # LK_LOCK gives up after 10 s; a build takes longer, so keep waiting
+                msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+    else:
+        import fcntl
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock_file(handle):
+    if os.name == "nt":
+        import msvcrt
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def _runtime_env():
+    # On Windows the executable needs the OpenModelica runtime DLLs on PATH
+    env = os.environ.copy()
+    omhome = env.get("OPENMODELICAHOME")
+    if os.name == "nt" and omhome:
+        env["PATH"] = os.pathsep.join([str(Path(omhome) / "bin"), env.get("PATH", "")])
+    return env
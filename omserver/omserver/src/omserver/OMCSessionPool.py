@@ -0,0 +1,252 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from flask import current_app
+
+from .OMCConnection import OMCConnection
+
+
+class OMCSession:
+    """
+    A pooled OMC process plus the model file it currently has loaded.
+
+    Requests go straight to the underlying OMCConnection; any request that
+    fails marks the session as broken so the pool throws it away instead of
+    handing a half-dead process to the next caller.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.loaded_path = None
+        self.loaded_digest = None
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.last_checked = self.created_at
+        self.broken = False
+
+    def request(self, expression, timeout=300000):
+        try:
+            return self.connection.request(expression, timeout)
+        except Exception:
+            self.broken = True
+            raise
+
+    def load_file(self, path):
+        """
+        loadFile() the model unless this session already holds the exact same
+        file content. Switching to a different file clears the previously
+        loaded classes first so the session behaves like a fresh omc.
+        """
+        path = str(path).replace('\\', '/')
+        digest = _file_digest(path)
+        if path == self.loaded_path and digest == self.loaded_digest:
+            return "true\n"
+
+        if self.loaded_path is not None and path != self.loaded_path:
+            self.request("clearProgram()")
+        self.loaded_path = None
+        self.loaded_digest = None
+
+        result = self.request(f'loadFile("{path}")')
+        if result.strip() == "true":
+            self.loaded_path = path
+            self.loaded_digest = digest
+        return result
+
+    @contextmanager
+    def working_directory(self, path):
+        """cd() omc into path for the with-block (simulate() builds there) and back afterwards."""
+        previous = self.request("cd()").strip().strip('"')
+        self.request(f'cd("{Path(path).as_posix()}")')
+        try:
+            yield
+        finally:
+            self.request(f'cd("{previous}")')
+
+    def ping(self, timeout=2000):
+        """Cheap liveness probe: process still running and answering getVersion()."""
+        if not self.connection.is_alive():
+            self.broken = True
+            return False
+        try:
+            self.request("getVersion()", timeout=timeout)
+        except Exception:
+            return False
+        self.last_checked = time.monotonic()
+        return True
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+
+class OMCSessionPool:
+    """
+    Keeps a bounded set of warm OMC processes that can be borrowed per request.
+
+    Args:
+        max_sessions: Maximum number of omc processes alive at once
+        idle_timeout_s: Idle sessions older than this are shut down
+        health_check_interval_s: Sessions idle longer than this are pinged before reuse
+        acquire_timeout_s: How long acquire() waits for a free slot
+        connection_factory: Callable returning a new OMCConnection
+    """
+
+    def __init__(self, max_sessions=4, idle_timeout_s=600, health_check_interval_s=30,
+                 acquire_timeout_s=3600, connection_factory=None):
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_timeout_s = idle_timeout_s
+        self.health_check_interval_s = health_check_interval_s
+        self.acquire_timeout_s = acquire_timeout_s
+        self._connection_factory = connection_factory or OMCConnection
+        self._cond = threading.Condition()
+        self._idle = []
+        self._busy = 0
+        self._closed = False
+
+    # ---- public API ----
+    @contextmanager
+    def session(self, model_path=None):
+        """Borrow a session for the duration of a with-block."""
+        omc = self.acquire(model_path)
+        try:
+            yield omc
+        finally:
+            self.release(omc)
+
+    def acquire(self, model_path=None, timeout=None):
+        timeout = self.acquire_timeout_s if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        wanted = str(model_path).replace('\\', '/') if model_path else None
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("OMC session pool is closed")
+                expired = self._pop_expired_locked()
+                candidate = self._pop_idle_locked(wanted)
+                start_new = candidate is None and len(self._idle) + self._busy < self.max_sessions
+                if candidate is not None or start_new:
+                    self._busy += 1
+                elif not expired:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a free OMC session")
+                    self._cond.wait(remaining)
+                    continue
+
+            for stale in expired:
+                stale.close()
+            if candidate is None and not start_new:
+                continue
+
+            if candidate is not None:
+                if self._is_healthy(candidate):
+                    candidate.last_used = time.monotonic()
+                    return candidate
+                candidate.close()
+                self._give_back_slot()
+                continue
+
+            try:
+                fresh = OMCSession(self._connection_factory())
+            except Exception:
+                self._give_back_slot()
+                raise
+            return fresh
+
+    def release(self, omc):
+        with self._cond:
+            self._busy -= 1
+            keep = not (self._closed or omc.broken or not omc.connection.is_alive())
+            if keep:
+                omc.last_used = time.monotonic()
+                self._idle.append(omc)
+            expired = self._pop_expired_locked()
+            self._cond.notify_all()
+        if not keep:
+            omc.close()
+        for stale in expired:
+            stale.close()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for omc in idle:
+            omc.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_sessions": self.max_sessions,
+                "idle": len(self._idle),
+                "busy": self._busy,
+            }
+
+    # ---- helpers ----
+    def _give_back_slot(self):
+        with self._cond:
+            self._busy -= 1
+            self._cond.notify_all()
+
+    def _pop_idle_locked(self, wanted):
+        if not self._idle:
+            return None
+        # Prefer a session that already has this model loaded, then the most recently used one
+        for i in range(len(self._idle) - 1, -1, -1):
+            if wanted and self._idle[i].loaded_path == wanted:
+                return self._idle.pop(i)
+        return self._idle.pop()
+
+    def _pop_expired_locked(self):
+        if self.idle_timeout_s is None:
+            return []
+        now = time.monotonic()
+        expired = [s for s in self._idle if now - s.last_used > self.idle_timeout_s]
+        if expired:
+            self._idle = [s for s in self._idle if s not in expired]
+        return expired
+
+    def _is_healthy(self, omc):
+        if omc.broken or not omc.connection.is_alive():
+            return False
+        if time.monotonic() - omc.last_checked > self.health_check_interval_s:
+            return omc.ping()
+        return True
+
+
+def get_omc_pool() -> OMCSessionPool:
+    """The pool created for the running Flask app in create_app()."""
+    return current_app.extensions["omc_pool"]
+
+
+_WORKER_POOL = None
+_WORKER_POOL_PID = None
+
+
+def get_worker_pool() -> OMCSessionPool:
+    """
+    Process-local pool for ProcessPoolExecutor workers, which cannot share the
+    app's pool. Each worker keeps its single omc warm between jobs.
+    """
+    global _WORKER_POOL, _WORKER_POOL_PID
+    if _WORKER_POOL is None or _WORKER_POOL_PID != os.getpid():
+        _WORKER_POOL = OMCSessionPool(max_sessions=1)
+        _WORKER_POOL_PID = os.getpid()
+    return _WORKER_POOL
+
+
+def _file_digest(path):
+    h = hashlib.sha1()
+    with open(Path(path), "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
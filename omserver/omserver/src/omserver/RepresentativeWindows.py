@@ -0,0 +1,178 @@
+import numpy as np
+
+# Power samples per window the windows are compared on
+WINDOW_SAMPLES = 96
+
+
+def window_profiles(table, window_s, samples=WINDOW_SAMPLES):
+    """
+    Cut a duty cycle into consecutive windows of window_s from its start.
+
+    Args:
+        table: (N, 2) time (s) and power (kW) rows
+        window_s: Window length in seconds
+        samples: Power samples per window used to compare windows
+
+    Returns:
+        tuple: (window start times (W,), durations (W,), energies in kWh (W,),
+        power at evenly spaced times through each window (W, samples)); only
+        the last window may be shorter than window_s
+    """
+    if not window_s > 0:
+        raise ValueError("window_s must be positive")
+    t, p = table[:, 0], table[:, 1]
+    starts = np.arange(t[0], t[-1], window_s)
+    if not len(starts):
+        raise ValueError("The duty cycle has no duration")
+    stops = np.minimum(starts + window_s, t[-1])
+
+    # Cumulative energy at the window edges (trapezoid, exact for the linear table)
+    energy = np.concatenate([[0.0], np.cumsum((p[1:] + p[:-1]) / 2 * np.diff(t))])
+    edges = np.append(starts, stops[-1])
+    energies = np.diff(np.interp(edges, t, energy)) / 3600
+
+    # Sample midpoints over the full window length; a short last window holds its final power
+    offsets = (np.arange(samples) + 0.5) / samples * window_s
+    profiles = np.interp(starts[:, None] + offsets[None, :], t, p)
+    return starts, stops - starts, energies, profiles
+
+
+def k_medoids(distances, count, max_iter=100):
+    """
+    k-medoids (greedy BUILD start, then alternating assignment and medoid update).
+
+    Args:
+        distances: (W, W) symmetric distance matrix
+        count: Number of medoids (clipped to W)
+        max_iter: Largest number of update rounds
+
+    Returns:
+        tuple: (medoid indices (k,), cluster of every item (W,) as an index into the medoids)
+    """
+    n = len(distances)
+    count = max(1, min(int(count), n))
+    # BUILD: the most central item, then the item that lowers the total distance most
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    nearest = distances[medoids[0]].copy()
+    while len(medoids) < count:
+        gain = np.maximum(nearest[None, :] - distances, 0).sum(axis=1)
+        gain[medoids] = -1
+        medoids.append(int(np.argmax(gain)))
+        nearest = np.minimum(nearest, distances[medoids[-1]])
+
+    medoids = np.array(medoids)
+    for _ in range(max_iter):
+        clusters = np.argmin(distances[medoids], axis=0)
+        updated = medoids.copy()
+        for c in range(count):
+            members = np.flatnonzero(clusters == c)
+            if len(members):
+                updated[c] = members[np.argmin(distances[np.ix_(members, members)].sum(axis=1))]
+        if np.array_equal(updated, medoids):
+            break
+        medoids = updated
+    return medoids, np.argmin(distances[medoids], axis=0)
+
+
+def representative_windows(table, window_s=86400, count=2, samples=WINDOW_SAMPLES):
+    """
+    Pick count full-length windows of a duty cycle that stand for all of it,
+    by k-medoids over the windows' power profiles. Each window is weighted by
+    the number of windows it stands for (a short last window counts by its
+    length), so a quantity of the mission is estimated as the weighted sum of
+    the same quantity over the representative windows.
+
+    Error bounds use the demand energy: energy_error_rel is the error of the
+    extrapolated mission energy, energy_bound_rel the sum of every window's
+    deviation from its representative, which bounds the error of any quantity
+    that scales with a window's energy (e.g. fuel at a constant specific
+    consumption).
+
+    Args:
+        table: (N, 2) time (s) and power (kW) rows
+        window_s: Window length in seconds (86400: days, 3600: hours)
+        count: Number of representative windows
+        samples: Power samples per window used to compare windows
+
+    Returns:
+        dict: windows (start_time, stop_time, weight, members, energy_kwh, rms_deviation_kw),
+        mission and simulated durations, speedup and the energy errors
+
+    Raises:
+        ValueError: window_s or count not positive, or no full-length window in the duty cycle
+    """
+    if int(count) < 1:
+        raise ValueError("count must be at least 1")
+    starts, durations, energies, profiles = window_profiles(table, window_s, samples)
+    full = np.flatnonzero(durations >= window_s - 1e-9 * window_s)
+    if not len(full):
+        raise ValueError("The duty cycle is shorter than one window")
+
+    # RMS power difference (kW) between window profiles
+    squares = np.einsum("ij,ij->i", profiles, profiles)
+    distances = np.sqrt(np.maximum(squares[:, None] + squares[None, :] - 2 * profiles @ profiles.T, 0) / samples)
+    medoids, clusters = k_medoids(distances[np.ix_(full, full)], count)
+    medoids = full[medoids]
+    # Every window, also a short last one, is represented by its closest medoid
+    clusters = np.argmin(distances[medoids], axis=0)
+
+    fraction = durations / window_s
+    weights = np.bincount(clusters, weights=fraction, minlength=len(medoids))
+    estimates = fraction * energies[medoids][clusters]
+    total = float(energies.sum())
+    extrapolated = float(estimates.sum())
+    deviation = float(np.abs(energies - estimates).sum())
+
+    windows = []
+    for c, m in enumerate(medoids.tolist()):
+        members = np.flatnonzero(clusters == c)
+        windows.append({
+            "index": m,
+            "start_time": float(starts[m]),
+            "stop_time": float(starts[m] + durations[m]),
+            "weight": float(weights[c]),
+            "members": members.tolist(),
+            "energy_kwh": float(energies[m]),
+            "rms_deviation_kw": float(np.sqrt(np.mean(distances[m, members] ** 2))),
+        })
+    windows.sort(key=lambda w: w["start_time"])
+
+    mission_s = float(durations.sum())
+    simulated_s = float(len(windows) * window_s)
+    return {
+        "window_s": float(window_s),
+        "count": len(windows),
+        "windows": windows,
+        "mission_s": mission_s,
+        "simulated_s": simulated_s,
+        "speedup": mission_s / simulated_s,
+        "energy_kwh": total,
+        "extrapolated_energy_kwh": extrapolated,
+        "energy_error_rel": (extrapolated - total) / total if total else 0.0,
+        "energy_bound_rel": deviation / abs(total) if total else 0.0,
+    }
+
+
+def extrapolate_window_results(results, weights, totals, peaks=()):
+    """
+    Combine the results of the representative windows into mission results.
+
+    Args:
+        results: Processed results of the windows, in time order
+        weights: Weight of every window (see representative_windows)
+        totals: Keys summed over a window (energies, fuel), extrapolated as the weighted sum
+        peaks: Keys taken as the largest value of any window
+
+    Returns:
+        dict: Totals extrapolated, peaks the largest, series joined in window
+        order, any other key from the first window
+    """
+    combined = dict(results[0])
+    for key, value in combined.items():
+        if isinstance(value, np.ndarray):
+            combined[key] = np.concatenate([r[key] for r in results])
+    for key in totals:
+        combined[key] = float(sum(w * r[key] for w, r in zip(weights, results)))
+    for key in peaks:
+        combined[key] = max(r[key] for r in results)
+    return combined
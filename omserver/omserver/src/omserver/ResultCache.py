@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    In-memory cache shared by all requests of one ResultStore.
+
+    Catalog lookups (batch lists, KPI rows, query results) are kept until
+    the catalog's signature changes, i.e. until anything, in this or another
+    process, writes to it. Series arrays come from write-once .npz files, so
+    they never go stale; they are kept least recently used first out within
+    max_bytes.
+
+    Cached values are shared between callers and must not be modified.
+
+    Args:
+        max_bytes: Memory limit of the cached series arrays
+        max_entries: Number of catalog lookups kept
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, max_entries=512):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._signature = None
+        self._entries = OrderedDict()
+        self._arrays = OrderedDict()
+        self._array_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, signature, key, compute):
+        """
+        Cached result of compute() for key, recomputed once the signature changes.
+
+        Args:
+            signature: Current catalog signature (any comparable value)
+            key: Hashable description of the lookup
+            compute: Function returning the value
+        """
+        with self._lock:
+            if signature != self._signature:
+                self._entries.clear()
+                self._signature = signature
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            # A write that happened meanwhile makes the value stale: return it, but do not keep it
+            if signature == self._signature:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def get_array(self, key):
+        """A cached series array, or None."""
+        with self._lock:
+            value = self._arrays.get(key)
+            if value is not None:
+                self._arrays.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def put_array(self, key, value):
+        """Keep a series array (made read-only), evicting the least recently used beyond max_bytes."""
+        value.setflags(write=False)
+        if value.nbytes > self.max_bytes:
+            return value
+        with self._lock:
+            old = self._arrays.pop(key, None)
+            if old is not None:
+                self._array_bytes -= old.nbytes
+            self._arrays[key] = value
+            self._array_bytes += value.nbytes
+            while self._array_bytes > self.max_bytes:
+                _, evicted = self._arrays.popitem(last=False)
+                self._array_bytes -= evicted.nbytes
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._arrays.clear()
+            self._array_bytes = 0
+            self._signature = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "catalog_entries": len(self._entries),
+                "series_arrays": len(self._arrays),
+                "series_bytes": self._array_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+import numpy as np
+
+from .ResultReader import open_result
+
+SERIES = "series"
+LAST = "last"
+MAX = "max"
+
+# key: output key, column: result variable, reducer: SERIES/LAST/MAX,
+# divisor: converts the column into the output unit (1000 for W -> kW), digits: round scalars
+ResultField = namedtuple("ResultField", ["key", "column", "reducer", "divisor", "digits"],
+                         defaults=[SERIES, 1, None])
+
+
+class ResultExtractionPlan:
+    """
+    Declarative description of how a simulation result becomes a processed
+    result: every output key names its source column, unit divisor and
+    reducer. Series stay NumPy arrays (converted to lists only when written
+    as JSON, see json_default); LAST and MAX give Python floats.
+
+    Args:
+        fields: ResultField or (key, column, reducer, divisor, digits) tuples
+        dtype: dtype of the series arrays
+    """
+
+    def __init__(self, fields, dtype=np.float64):
+        self.fields = [ResultField(*f) for f in fields]
+        self.dtype = np.dtype(dtype)
+        for f in self.fields:
+            if f.reducer not in (SERIES, LAST, MAX):
+                raise ValueError(f"Unknown reducer {f.reducer!r} for {f.key}")
+
+    @property
+    def columns(self):
+        """Source columns in plan order, each once (always including time)."""
+        return list(dict.fromkeys(["time"] + [f.column for f in self.fields]))
+
+    def apply(self, data, strict=True):
+        """
+        Args:
+            data: {column: np.ndarray}
+            strict: Raise KeyError for missing columns; otherwise series are empty and scalars 0
+
+        Returns:
+            dict: {key: np.ndarray or float} in plan order
+        """
+        out = {}
+        for f in self.fields:
+            values = data.get(f.column)
+            if values is None:
+                if strict:
+                    raise KeyError(f.column)
+                out[f.key] = np.empty(0, dtype=self.dtype) if f.reducer == SERIES else 0
+                continue
+            if f.reducer == SERIES:
+                values = np.asarray(values, dtype=self.dtype)
+                out[f.key] = values / f.divisor if f.divisor != 1 else values
+                continue
+            if f.reducer == LAST:
+                present = np.flatnonzero(~np.isnan(values))
+                if not len(present):
+                    if strict:
+                        raise ValueError(f"{f.column} has no values")
+                    out[f.key] = 0
+                    continue
+                value = float(values[present[-1]]) / f.divisor
+            else:
+                value = float(np.nanmax(values)) / f.divisor
+            out[f.key] = round(value, f.digits) if f.digits is not None else value
+        return out
+
+    def extract(self, result_path, strict=True):
+        """Read the plan's columns from a result file (mat or csv) and apply the plan."""
+        with open_result(result_path) as reader:
+            data = reader.read(self.columns)
+        return self.apply(data, strict=strict)
+
+
+def json_default(value):
+    """json.dumps default= hook: arrays become lists only when they are written out."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,185 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# MAT v4 precision digit -> little-endian numpy type
+_MAT_TYPES = {0: "<f8", 1: "<f4", 2: "<i4", 3: "<i2", 4: "<u2", 5: "<u1"}
+
+RESULT_FORMATS = ("mat", "csv")
+
+
+class MatResultReader:
+    """
+    Reads variables from an OpenModelica result file in MAT v4 format
+    (outputFormat="mat", binTrans or binNormal layout).
+
+    Only the headers, names and dataInfo are read up front; the trajectories
+    are memory mapped and a variable is copied out when it is asked for, so
+    nothing is converted to or from text.
+
+    Args:
+        path: The <model>_res.mat file
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._matrices = {}
+        size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(20)
+                if len(header) < 20:
+                    break
+                mopt, mrows, ncols, imagf, namelen = struct.unpack("<5i", header)
+                if mopt // 1000 != 0 or imagf or (mopt % 100) // 10 not in _MAT_TYPES:
+                    raise ValueError(f"{self.path.name}: unsupported MAT v4 matrix type {mopt}")
+                name = f.read(namelen).rstrip(b"\0").decode("ascii")
+                dtype = np.dtype(_MAT_TYPES[(mopt % 100) // 10])
+                offset = f.tell()
+                # A run that was killed leaves data_2 shorter than its header says
+                if mrows and offset + dtype.itemsize * mrows * ncols > size:
+                    ncols = (size - offset) // (dtype.itemsize * mrows)
+                self._matrices[name] = (dtype, mrows, ncols, offset)
+                f.seek(offset + dtype.itemsize * mrows * ncols)
+
+        for required in ("Aclass", "name", "dataInfo", "data_2"):
+            if required not in self._matrices:
+                raise ValueError(f"{self.path.name}: not an OpenModelica result file (no {required})")
+
+        aclass = self._strings("Aclass", by_row=True)
+        transposed = len(aclass) > 3 and aclass[3] == "binTrans"
+        # Put the variable on axis 0 of every matrix
+        self._names = self._strings("name", by_row=not transposed)
+        self._index = {name: i for i, name in enumerate(self._names)}
+        info = self._matrix("dataInfo")
+        self._info = np.array(info.T if transposed else info)
+        self._data = {}
+        for block in (1, 2):
+            if f"data_{block}" in self._matrices:
+                data = self._matrix(f"data_{block}")
+                self._data[block] = data if transposed else data.T
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self._index
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    @property
+    def n_rows(self):
+        return self._data[2].shape[1]
+
+    def get(self, name):
+        """
+        Args:
+            name: Variable name as it appears in the CSV header
+
+        Returns:
+            np.ndarray: float64 trajectory (parameters are repeated for every time point)
+        """
+        block, column = int(self._info[self._index[name]][0]), int(self._info[self._index[name]][1])
+        # Block 0 is the abscissa (time), stored in data_2
+        values = np.array(self._data[block or 2][abs(column) - 1], dtype=np.float64)
+        if column < 0:
+            values = -values
+        if block == 1:
+            values = np.full(self.n_rows, values[0])
+        return values
+
+    def read(self, columns):
+        """{name: trajectory} for the requested columns present in the file."""
+        return {name: self.get(name) for name in columns if name in self._index}
+
+    def close(self):
+        # Drop the maps so the file can be removed (required on Windows)
+        self._data = {}
+
+    def _matrix(self, name):
+        dtype, mrows, ncols, offset = self._matrices[name]
+        if mrows * ncols == 0:
+            return np.zeros((mrows, ncols), dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=(mrows, ncols), order="F")
+
+    def _strings(self, name, by_row):
+        chars = np.array(self._matrix(name))
+        rows = chars if by_row else chars.T
+        return [bytes(row).split(b"\0", 1)[0].decode("latin-1").rstrip() for row in rows]
+
+
+class CsvResultReader:
+    """
+    Same interface as MatResultReader for results written with
+    outputFormat="csv"; only the requested columns are parsed.
+
+    Args:
+        path: The <model>_res.csv file
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "r", encoding="utf-8") as f:
+            header = f.readline()
+        self._names = [name.strip().strip('"') for name in header.rstrip("\r\n").split(",")]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self._names
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    def get(self, name):
+        return self.read([name])[name]
+
+    def read(self, columns):
+        wanted = [name for name in dict.fromkeys(columns) if name in self._names]
+        if not wanted:
+            return {}
+        df = pd.read_csv(self.path, usecols=wanted)
+        return {name: df[name].to_numpy(dtype=np.float64) for name in wanted}
+
+    def close(self):
+        pass
+
+
+def result_file_path(output_dir, model_name, result_format="csv"):
+    """Where OpenModelica writes the result of model_name for the given outputFormat."""
+    return Path(output_dir) / f"{model_name}_res.{result_format}"
+
+
+def open_result(path):
+    """
+    Open a simulation result with the reader matching its format. A .mat file
+    that is missing or cannot be parsed falls back to the .csv next to it.
+
+    Raises:
+        FileNotFoundError: Neither the file nor its CSV fallback exists
+    """
+    path = Path(path)
+    csv_path = path.with_suffix(".csv")
+    if path.suffix.lower() == ".mat":
+        try:
+            return MatResultReader(path)
+        except (OSError, ValueError) as e:
+            if not csv_path.exists():
+                raise
+            print(f"[ResultReader] {path.name} unreadable ({e}), falling back to {csv_path.name}")
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Result not found: {csv_path}")
+    return CsvResultReader(csv_path)
+
@@ -0,0 +1,496 @@
+import json
+import math
+import numbers
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from flask import current_app
+
+from .ResultCache import ResultCache
+from .ResultExtractionPlan import json_default
+
+# Iteration KPIs kept as typed, indexed catalog columns:
+# column -> (SQL type, [(result key, divisor), ...], value when no key is present).
+# The first key present in an iteration wins, so results from every blueprint map onto the same columns.
+KPI_COLUMNS = {
+    "iteration_id": ("INTEGER", [("iteration_id", 1)], None),
+    "diesel_count": ("INTEGER", [("diesel_count", 1), ("die_count", 1)], 0),
+    "meth_count": ("INTEGER", [("meth_count", 1), ("Meth_Count", 1)], 0),
+    "bat_count": ("INTEGER", [("bat_count", 1), ("battery_count", 1)], 0),
+    "diesel_usage_t": ("REAL", [("diesel_usage (Ton)", 1), ("diesel_usage (KG)", 1000)], None),
+    "meth_usage_t": ("REAL", [("meth_usage (Ton)", 1), ("methanol_usage (KG)", 1000)], None),
+    "hydrogen_usage_t": ("REAL", [("hydrogen_usage (Ton)", 1)], None),
+    "co2_t": ("REAL", [("CO2_emission (Ton)", 1), ("CO2_emission", 1)], None),
+    "penalty_eur": ("REAL", [("penalty (EUR)", 1), ("penalty", 1)], None),
+    "capital_cost": ("REAL", [("captital_cost(£)", 1), ("capital_cost (£)", 1)], None),
+    "energy_demand_kwh": ("REAL", [("Total Energy Deamand (kWh)", 1)], None),
+    "energy_wasted_kwh": ("REAL", [("Total Energy Wasted (kWh)", 1)], None),
+    "peak_power_demand_kw": ("REAL", [("peak_power_demand (KW)", 1)], None),
+    "max_pwr_potential_kw": ("REAL", [("max_pwr_potential (KW)", 1)], None),
+}
+
+
+def _covers_peak(scalars, kpis):
+    if kpis["max_pwr_potential_kw"] is None or kpis["peak_power_demand_kw"] is None:
+        return None
+    return int(kpis["max_pwr_potential_kw"] >= kpis["peak_power_demand_kw"])
+
+
+def _slot_total(key):
+    # Sum over the generator slots that have a number (empty slots hold "None")
+    def total(scalars, kpis):
+        values = [_to_number(v, float) for v in scalars.get(key) or []]
+        values = [v for v in values if v is not None]
+        return sum(values) if values else None
+    return total
+
+
+def _battery_total(spec_index):
+    # "Battery Specs" is [power, cost, cycle limit, volume, mass] of one battery
+    def total(scalars, kpis):
+        specs = scalars.get("Battery Specs") or []
+        value = _to_number(specs[spec_index], float) if len(specs) > spec_index else None
+        if not kpis["bat_count"]:
+            return 0.0 if specs else None
+        return None if value is None else value * kpis["bat_count"]
+    return total
+
+
+def _sum_of(*columns):
+    def total(scalars, kpis):
+        values = [kpis[c] for c in columns if kpis[c] is not None]
+        return sum(values) if values else None
+    return total
+
+
+# KPIs computed from other fields, in dependency order: column -> (SQL type, function(scalars, kpis))
+DERIVED_KPI_COLUMNS = {
+    "covers_peak": ("INTEGER", _covers_peak),
+    "engine_mass_total": ("REAL", _slot_total("Gen Mass")),
+    "engine_volume_total": ("REAL", _slot_total("Gen Volumes")),
+    "battery_mass_total": ("REAL", _battery_total(4)),
+    "battery_volume_total": ("REAL", _battery_total(3)),
+    "total_mass": ("REAL", _sum_of("engine_mass_total", "battery_mass_total")),
+    "total_volume": ("REAL", _sum_of("engine_volume_total", "battery_volume_total")),
+}
+
+# Columns query() can filter and sort on
+QUERY_COLUMNS = ["position", "sim_name", *KPI_COLUMNS, *DERIVED_KPI_COLUMNS]
+
+# Filter operators; == and != also match unknown (NULL) values
+QUERY_OPERATORS = {"==": "IS", "!=": "IS NOT", "<": "<", "<=": "<=", ">": ">", ">=": ">=", "in": "IN"}
+
+# Lists shorter than this (optimal zones, per-slot costs, ...) stay with the scalars
+MIN_SERIES_LENGTH = 16
+
+_BATCH_FIELDS = ("batch_sim_title", "batch_sim_time_stamp", "vessel_name", "batch_size", "batch_sim_res_collection")
+
+
+class ResultStore:
+    """
+    Batch results on disk: a SQLite catalog of batches and per-iteration
+    scalars (with the KPI columns indexed per batch), and one .npz per
+    batch holding its time series. Listing batches or ranking iterations
+    only touches the catalog; series are loaded per iteration on demand.
+    Lookups and loaded series are kept in a ResultCache, so repeated reads
+    (dashboard polling) do not go to disk until the catalog changes.
+
+    Args:
+        root: Directory of the store (instance/results)
+        cache_bytes: Memory limit of the cached series (default 256 MB)
+    """
+
+    CATALOG = "catalog.sqlite3"
+
+    def __init__(self, root, cache_bytes=256 * 1024 * 1024):
+        self.root = Path(root)
+        self.cache = ResultCache(cache_bytes)
+        self._version = 0
+        self.series_dir = self.root / "series"
+        self.series_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.root / self.CATALOG
+        with self._connect() as db:
+            kpis = "".join(f"    {name} {sql_type},\n" for name, sql_type in _kpi_types().items())
+            db.executescript(f"""
+                CREATE TABLE IF NOT EXISTS batches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    time_stamp TEXT,
+                    vessel_name TEXT,
+                    batch_size INTEGER,
+                    iteration_count INTEGER NOT NULL,
+                    series_file TEXT,
+                    info TEXT NOT NULL,
+                    created REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS batches_title ON batches (title);
+                CREATE TABLE IF NOT EXISTS iterations (
+                    batch_id INTEGER NOT NULL REFERENCES batches (id) ON DELETE CASCADE,
+                    position INTEGER NOT NULL,
+                    sim_name TEXT,
+{kpis}                    scalars TEXT NOT NULL,
+                    series TEXT NOT NULL,
+                    keys TEXT NOT NULL,
+                    PRIMARY KEY (batch_id, position)
+                );
+            """)
+            self._migrate(db)
+
+    def _migrate(self, db):
+        # Catalogs written before a KPI existed get the column, filled in once from the stored scalars
+        existing = {r["name"] for r in db.execute("PRAGMA table_info(iterations)")}
+        missing = [name for name in _kpi_types() if name not in existing]
+        for name in missing:
+            db.execute(f"ALTER TABLE iterations ADD COLUMN {name} {_kpi_types()[name]}")
+        if missing:
+            rows = db.execute("SELECT batch_id, position, scalars FROM iterations").fetchall()
+            db.executemany(
+                f"UPDATE iterations SET {', '.join(f'{name} = ?' for name in _kpi_types())}"
+                " WHERE batch_id = ? AND position = ?",
+                [(*_kpis(json.loads(r["scalars"])).values(), r["batch_id"], r["position"]) for r in rows])
+            print(f"[ResultStore] added KPI columns {', '.join(missing)} to {len(rows)} iterations")
+        # Per-batch index on every KPI, so ranking a batch reads only the rows it returns
+        for name in _kpi_types():
+            db.execute(f"CREATE INDEX IF NOT EXISTS iterations_{name} ON iterations (batch_id, {name})")
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction: committed on success, always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def append_batch(self, batch_record):
+        """
+        Store one batch (the batch_sim_* dict the simulate_batch routes build).
+
+        Returns:
+            int: The new batch id
+        """
+        iterations = batch_record.get("batch_sim_res_collection", []) or []
+        arrays = {}
+        rows = []
+        for position, it in enumerate(iterations):
+            scalars, series = {}, {}
+            for key, value in (it or {}).items():
+                if _is_series(value):
+                    member = f"a{len(arrays)}"
+                    arrays[member] = np.asarray(value, dtype=np.float64)
+                    series[key] = member
+                else:
+                    scalars[key] = value
+            rows.append((position, scalars, series, list((it or {}).keys())))
+
+        series_file = None
+        if arrays:
+            # Write the sidecar first; a crash before the catalog insert only leaves an unreferenced file
+            fd, tmp = tempfile.mkstemp(prefix=".batch-", suffix=".npz", dir=self.series_dir)
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            series_file = f"{Path(tmp).stem.lstrip('.')}.npz"
+            os.replace(tmp, self.series_dir / series_file)
+
+        info = {k: v for k, v in batch_record.items() if k not in _BATCH_FIELDS}
+        kpi_names = list(_kpi_types())
+        with self._connect() as db:
+            cur = db.execute(
+                "INSERT INTO batches (title, time_stamp, vessel_name, batch_size, iteration_count, series_file, info, created)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (batch_record.get("batch_sim_title", "unknown"), batch_record.get("batch_sim_time_stamp"),
+                 batch_record.get("vessel_name"), _to_number(batch_record.get("batch_size"), int),
+                 len(iterations), series_file, _dumps(info), time.time()))
+            batch_id = cur.lastrowid
+            db.executemany(
+                f"INSERT INTO iterations (batch_id, position, sim_name, {', '.join(kpi_names)}, scalars, series, keys)"
+                f" VALUES ({', '.join('?' * (len(kpi_names) + 6))})",
+                [(batch_id, position, scalars.get("sim_name"), *_kpis(scalars).values(),
+                  _dumps(scalars), _dumps(series), _dumps(keys))
+                 for position, scalars, series, keys in rows])
+        self._version += 1
+        return batch_id
+
+    def _signature(self):
+        # Changes with every write: our own counter, plus the catalog and WAL files for other processes
+        signature = [self._version]
+        for path in (self.path, self.path.with_name(self.CATALOG + "-wal")):
+            try:
+                st = path.stat()
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _cached(self, key, compute):
+        return self.cache.lookup(self._signature(), key, compute)
+
+    def list_batches(self):
+        """Catalog entries of all batches, oldest first."""
+        def load():
+            with self._connect() as db:
+                rows = db.execute(
+                    "SELECT id, title, time_stamp, vessel_name, batch_size, iteration_count FROM batches ORDER BY id"
+                ).fetchall()
+            return [dict(r) for r in rows]
+        return self._cached(("list_batches",), load)
+
+    def find_batch(self, title):
+        """Id of the first batch stored under title, or None."""
+        return next((b["id"] for b in self.list_batches() if b["title"] == title), None)
+
+    def batch_info(self, batch_id):
+        """Catalog entry of one batch, or None."""
+        return next((b for b in self.list_batches() if b["id"] == batch_id), None)
+
+    def iterations(self, batch_id, where="", params=(), order_by="position", limit=None):
+        """
+        Scalar rows of a batch's iterations; series are not loaded.
+
+        Args:
+            batch_id: Batch to query
+            where: Extra SQL condition over the KPI columns (optional)
+            params: Parameters of where
+            order_by: SQL ORDER BY over the KPI columns
+            limit: Maximum number of rows (optional)
+
+        Returns:
+            list[dict]: position, KPI columns and "scalars" (every non-series field)
+        """
+        return self._cached(("iterations", batch_id, where, tuple(params), order_by, limit),
+                            lambda: self._iterations(batch_id, where, params, order_by, limit))
+
+    def _iterations(self, batch_id, where, params, order_by, limit):
+        sql = f"SELECT * FROM iterations WHERE batch_id = ?{f' AND ({where})' if where else ''} ORDER BY {order_by}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as db:
+            rows = db.execute(sql, (batch_id, *params)).fetchall()
+        out = []
+        for r in rows:
+            row = dict(r)
+            row["scalars"] = json.loads(row["scalars"])
+            row["series"] = json.loads(row["series"])
+            row["keys"] = json.loads(row["keys"])
+            out.append(row)
+        return out
+
+    def query(self, batch_id, filters=(), sort=(), limit=None):
+        """
+        Filter and rank a batch's iterations on the catalog columns.
+
+        Args:
+            batch_id: Batch to query
+            filters: (column, operator, value) triples; operators are QUERY_OPERATORS
+            sort: Column names, "-column" for descending; unknown values sort last
+            limit: Maximum number of rows (optional)
+
+        Returns:
+            tuple: (number of matching iterations, rows as returned by iterations())
+
+        Raises:
+            ValueError: Unknown column or operator, or a value of the wrong shape
+        """
+        where, params = [], []
+        for column, op, value in filters:
+            _check_column(column)
+            if op not in QUERY_OPERATORS:
+                raise ValueError(f"Unknown operator {op!r}, use one of {', '.join(QUERY_OPERATORS)}")
+            if op == "in":
+                if not isinstance(value, (list, tuple)) or not value:
+                    raise ValueError(f"'in' on {column} needs a non-empty list")
+                where.append(f"{column} IN ({', '.join('?' * len(value))})")
+                params.extend(_sql_value(v) for v in value)
+            else:
+                if isinstance(value, (list, tuple, dict)):
+                    raise ValueError(f"{op!r} on {column} needs a single value")
+                where.append(f"{column} {QUERY_OPERATORS[op]} ?")
+                params.append(_sql_value(value))
+
+        order = []
+        for key in sort:
+            column = key[1:] if key.startswith("-") else key
+            _check_column(column)
+            order.append(f"{column} IS NULL, {column} {'DESC' if key.startswith('-') else 'ASC'}")
+        order.append("position")
+
+        where_sql = " AND ".join(where)
+
+        def count():
+            with self._connect() as db:
+                return db.execute(
+                    f"SELECT COUNT(*) FROM iterations WHERE batch_id = ?{f' AND {where_sql}' if where_sql else ''}",
+                    (batch_id, *params)).fetchone()[0]
+        matched = self._cached(("count", batch_id, where_sql, tuple(params)), count)
+        rows = self.iterations(batch_id, where=where_sql, params=params, order_by=", ".join(order), limit=limit)
+        return matched, rows
+
+    def series(self, batch_id, rows, keys=None):
+        """
+        Load the series of the given iteration rows (from iterations()).
+
+        Returns:
+            list[dict]: {key: np.ndarray} per row (read-only, shared through the cache)
+        """
+        name = self._series_file(batch_id)
+        if not name:
+            return [{} for _ in rows]
+
+        # The .npz is only opened for members that are not cached yet
+        out = [{key: self.cache.get_array((name, member))
+                for key, member in row["series"].items() if keys is None or key in keys} for row in rows]
+        missing = [(i, key) for i, values in enumerate(out) for key, value in values.items() if value is None]
+        if missing:
+            with np.load(self.series_dir / name) as npz:
+                for i, key in missing:
+                    member = rows[i]["series"][key]
+                    out[i][key] = self.cache.put_array((name, member), npz[member])
+        return out
+
+    def _series_file(self, batch_id):
+        def load():
+            with self._connect() as db:
+                batch = db.execute("SELECT series_file FROM batches WHERE id = ?", (batch_id,)).fetchone()
+            return batch["series_file"] if batch else None
+        return self._cached(("series_file", batch_id), load)
+
+    def iter_batch(self, batch_id):
+        """
+        The iterations of a batch as they were appended, one at a time: each
+        iteration's series are read when it is reached and bypass the cache,
+        so walking a whole batch (e.g. for an export) holds one iteration in memory.
+
+        Yields:
+            dict: Iteration fields in their original order (series as NumPy arrays)
+        """
+        rows = self.iterations(batch_id)
+        name = self._series_file(batch_id)
+        npz = np.load(self.series_dir / name) if name else None
+        try:
+            for row in rows:
+                values = dict(row["scalars"])
+                for key, member in row["series"].items():
+                    values[key] = npz[member]
+                yield {key: values[key] for key in row["keys"] if key in values}
+        finally:
+            if npz is not None:
+                npz.close()
+
+    def get_batch(self, batch_id, load_iterations=True):
+        """
+        The full batch record, as it was appended (series as NumPy arrays).
+
+        Args:
+            batch_id: Batch to load
+            load_iterations: False leaves batch_sim_res_collection empty (use iter_batch to stream it)
+        """
+        with self._connect() as db:
+            batch = db.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        if batch is None:
+            return None
+        collection = list(self.iter_batch(batch_id)) if load_iterations else []
+        record = {
+            "batch_sim_title": batch["title"],
+            "batch_sim_time_stamp": batch["time_stamp"],
+            "vessel_name": batch["vessel_name"],
+            "batch_size": batch["batch_size"],
+        }
+        record.update(json.loads(batch["info"]))
+        record["batch_sim_res_collection"] = collection
+        return record
+
+    def import_json(self, db_path):
+        """
+        Move batches from a legacy res_db.json into the store, once: the file
+        is renamed to res_db.json.imported afterwards.
+
+        Returns:
+            int: Number of batches imported
+        """
+        db_path = Path(db_path)
+        if not db_path.exists():
+            return 0
+        try:
+            data = json.loads(db_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            print(f"[ResultStore] could not import {db_path.name}: {e}")
+            return 0
+        batches = data if isinstance(data, list) else []
+        for batch in batches:
+            if isinstance(batch, dict):
+                self.append_batch(batch)
+        os.replace(db_path, db_path.with_name(db_path.name + ".imported"))
+        print(f"[ResultStore] imported {len(batches)} batches from {db_path.name}")
+        return len(batches)
+
+
+def get_result_store() -> ResultStore:
+    """The store created for the running Flask app in create_app()."""
+    return current_app.extensions["result_store"]
+
+
+def _is_series(value):
+    if isinstance(value, np.ndarray):
+        return value.ndim == 1 and value.dtype.kind in "fiu"
+    return (isinstance(value, list) and len(value) >= MIN_SERIES_LENGTH
+            and all(isinstance(v, numbers.Real) and not isinstance(v, bool) for v in value))
+
+
+def _to_number(value, cast):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        try:
+            return cast(float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+def _kpi_types():
+    types = {name: sql_type for name, (sql_type, _, _) in KPI_COLUMNS.items()}
+    types.update({name: sql_type for name, (sql_type, _) in DERIVED_KPI_COLUMNS.items()})
+    return types
+
+
+def _kpis(scalars):
+    out = {}
+    for name, (sql_type, sources, default) in KPI_COLUMNS.items():
+        out[name] = default
+        for key, divisor in sources:
+            if scalars.get(key) is not None:
+                value = _to_number(scalars[key], float)
+                if value is not None and sql_type == "INTEGER":
+                    value = int(value) if math.isfinite(value) else None
+                elif value is not None:
+                    value = value / divisor
+                out[name] = value
+                break
+    for name, (_, derive) in DERIVED_KPI_COLUMNS.items():
+        out[name] = derive(scalars, out)
+    return out
+
+
+def _check_column(column):
+    if column not in QUERY_COLUMNS:
+        raise ValueError(f"Unknown column {column!r}, use one of {', '.join(QUERY_COLUMNS)}")
+
+
+def _sql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    raise ValueError(f"Unsupported filter value {value!r}")
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, default=json_default)
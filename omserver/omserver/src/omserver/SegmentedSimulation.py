@@ -0,0 +1,127 @@
+import numpy as np
+
+
+def segment_bounds(start_time, stop_time, count):
+    """
+    Args:
+        start_time: Mission start (s)
+        stop_time: Mission stop (s)
+        count: Number of segments
+
+    Returns:
+        list: (start, stop) of count consecutive segments of equal length
+
+    Raises:
+        ValueError: count below 1 or stop_time not after start_time
+    """
+    if int(count) < 1:
+        raise ValueError("segments must be at least 1")
+    if not stop_time > start_time:
+        raise ValueError("stop_time must be after start_time")
+    edges = np.linspace(float(start_time), float(stop_time), int(count) + 1).tolist()
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def parareal_starts(starts, ends, lower=0.0, upper=1.0):
+    """
+    Parareal update of the segments' initial state from their last runs.
+
+    The coarse propagator is "the segment shifts the state by the change of
+    its last run", so a segment's corrected end is its simulated end plus
+    the correction of its own start. The first segment keeps its start.
+
+    Args:
+        starts: Initial state each segment was last simulated from (S,)
+        ends: Final state of those runs (S,)
+        lower: Smallest possible state
+        upper: Largest possible state
+
+    Returns:
+        np.ndarray: Corrected initial state of every segment (S,)
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    corrected = starts.copy()
+    for k in range(len(starts) - 1):
+        corrected[k + 1] = np.clip(ends[k] + (corrected[k] - starts[k]), lower, upper)
+    return corrected
+
+
+def coarse_soc_starts(table, bounds, soc_start, capacity, battery_power, generator_power, lower=0.0, upper=1.0):
+    """
+    Coarse estimate of the battery SOC at the start of every segment, from
+    the duty cycle energy: the battery supplies the demand above the running
+    generators' rating and takes their spare rating as charge, within its
+    power limit. Losses and the controller's SOC thresholds are ignored.
+
+    Args:
+        table: (N, 2) duty cycle time (s) and power (kW) rows
+        bounds: (start, stop) of every segment
+        soc_start: SOC at the start of the first segment
+        capacity: Battery capacity (J)
+        battery_power: Largest battery charge and discharge power (W)
+        generator_power: Rated power of the running generators together (W)
+        lower: Smallest possible SOC
+        upper: Largest possible SOC
+
+    Returns:
+        np.ndarray: Estimated SOC at the start of every segment (S,), the first is soc_start
+    """
+    t = np.asarray(table[:, 0], dtype=np.float64)
+    # Battery output (W, discharge positive) and the energy it delivered up to every sample
+    battery = np.clip(np.asarray(table[:, 1], dtype=np.float64) * 1000 - generator_power, -battery_power, battery_power)
+    delivered = np.r_[0.0, np.cumsum(np.diff(t) * (battery[1:] + battery[:-1]) / 2)]
+    at_starts = np.interp([start for start, _ in bounds], t, delivered)
+    starts = np.empty(len(bounds))
+    starts[0] = soc_start
+    for k in range(1, len(bounds)):
+        starts[k] = np.clip(starts[k - 1] - (at_starts[k] - at_starts[k - 1]) / capacity, lower, upper)
+    return starts
+
+
+def boundary_values(values):
+    """
+    Returns:
+        tuple: First and last value of a result column that are not NaN (NaN if there are none)
+    """
+    present = np.flatnonzero(~np.isnan(values))
+    if not len(present):
+        return float("nan"), float("nan")
+    return float(values[present[0]]), float(values[present[-1]])
+
+
+def stitch_segments(segments, cumulative=()):
+    """
+    Join the result columns of consecutive segments into one continuous result.
+
+    Args:
+        segments: {column: np.ndarray} of every segment in time order, each with "time"
+        cumulative: Columns that count up from 0 in every segment (energy and fuel
+            totals); later segments are offset by the total at the end of the previous ones
+
+    Returns:
+        dict: {column: np.ndarray} over the whole mission; samples a segment
+        repeats at or before the end time of the previous one are dropped
+    """
+    stitched = {column: [np.asarray(values)] for column, values in segments[0].items()}
+    totals = {column: _total(stitched[column][0]) for column in cumulative if column in stitched}
+    end_time = stitched["time"][0][-1]
+    for segment in segments[1:]:
+        keep = np.asarray(segment["time"]) > end_time
+        for column, values in segment.items():
+            if column in totals:
+                # The segment's own final total, before dropping repeated samples
+                segment_total = _total(np.asarray(values))
+                values = np.asarray(values)[keep] + totals[column]
+                totals[column] += segment_total
+            else:
+                values = np.asarray(values)[keep]
+            stitched[column].append(values)
+        if keep.any():
+            end_time = np.asarray(segment["time"])[keep][-1]
+    return {column: np.concatenate(parts) for column, parts in stitched.items()}
+
+
+def _total(values):
+    last = boundary_values(values)[1]
+    return 0.0 if np.isnan(last) else last
@@ -0,0 +1,109 @@
+import numpy as np
+
+LTTB = "lttb"
+MINMAX = "minmax"
+NONE = "none"
+
+DOWNSAMPLE_METHODS = (LTTB, MINMAX, NONE)
+
+# Smallest point budget: the first and last sample plus one min/max bucket
+MIN_POINTS = 4
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: pick n_out samples that keep the visual
+    shape of the line, including its peaks.
+
+    Args:
+        x: Sample times (ascending)
+        y: Sample values
+        n_out: Number of samples to keep (at least 3)
+
+    Returns:
+        np.ndarray: Indices of the kept samples, ascending, first and last included
+
+    Raises:
+        ValueError: n_out below 3
+    """
+    if n_out < 3:
+        raise ValueError(f"LTTB needs a budget of at least 3 points, got {n_out}")
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 buckets between the fixed first and last sample
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        # The third corner is the average of the next bucket (the last sample for the final bucket)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        cx = x[end:next_end].mean() if next_end > end else x[-1]
+        cy = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[a] - cx) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(x, y, n_out):
+    """
+    Min/max envelope: split the samples into (n_out - 2) // 2 buckets and keep the
+    lowest and highest sample of each, so no extreme is ever dropped.
+
+    Returns:
+        np.ndarray: Indices of the kept samples, ascending, first and last included
+
+    Raises:
+        ValueError: n_out below 4
+    """
+    if n_out < 4:
+        raise ValueError(f"The min/max envelope needs a budget of at least 4 points, got {n_out}")
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    bucket = np.arange(n) * ((n_out - 2) // 2) // n
+    # Within each bucket the sort puts the minimum first and the maximum last
+    order = np.lexsort((np.nan_to_num(y, nan=-np.inf), bucket))
+    starts = np.flatnonzero(np.r_[True, bucket[order][1:] != bucket[order][:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    return np.unique(np.r_[0, order[starts], order[ends], n - 1])
+
+
+def window_indices(x, start=None, end=None):
+    """Slice of the samples with start <= x <= end (either bound optional)."""
+    lo = 0 if start is None else int(np.searchsorted(x, start, side="left"))
+    hi = len(x) if end is None else int(np.searchsorted(x, end, side="right"))
+    return slice(lo, max(lo, hi))
+
+
+def downsample(x, y, n_out, method=LTTB):
+    """
+    Args:
+        x: Sample times (ascending)
+        y: Sample values, same length as x
+        n_out: Point budget, at least MIN_POINTS
+        method: LTTB, MINMAX or NONE
+
+    Returns:
+        tuple: (x, y) of at most n_out samples (NONE returns them all)
+
+    Raises:
+        ValueError: Unknown method or a budget below MIN_POINTS
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}, use one of {', '.join(DOWNSAMPLE_METHODS)}")
+    if n_out < MIN_POINTS:
+        raise ValueError(f"points must be at least {MIN_POINTS}, got {n_out}")
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if method == NONE:
+        return x, y
+    keep = lttb_indices(x, y, n_out) if method == LTTB else minmax_indices(x, y, n_out)
+    return x[keep], y[keep]
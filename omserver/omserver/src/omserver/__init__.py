@@ -1,3 +1,4 @@
+import atexit
 import os
 
 from flask import Flask
@@ -18,10 +19,48 @@ def create_app(test_config=None):
     except OSError:
         pass
 
+    from .OMCSessionPool import OMCSessionPool
+    omc_pool = OMCSessionPool(
+        max_sessions=app.config.get("OMC_POOL_MAX_SESSIONS", 4),
+        idle_timeout_s=app.config.get("OMC_POOL_IDLE_TIMEOUT_S", 600),
+        health_check_interval_s=app.config.get("OMC_POOL_HEALTH_CHECK_S", 30),
+    )
+    app.extensions["omc_pool"] = omc_pool
+    atexit.register(omc_pool.close)
+
+    from .OMCModelBuilder import OMCModelBuilder
+    cache_mb = app.config.get("OMC_BUILD_CACHE_MAX_MB", 2048)
+    app.extensions["model_builder"] = OMCModelBuilder(
+        os.path.join(app.instance_path, "build_cache"),
+        max_cache_bytes=None if cache_mb is None else int(cache_mb) * 1024 * 1024,
+    )
+
+    from .ResultStore import ResultStore
+    cache_mb = app.config.get("RESULT_CACHE_MAX_MB", 256)
+    result_store = ResultStore(os.path.join(app.instance_path, "results"), cache_bytes=int(cache_mb) * 1024 * 1024)
+    # One-time move of the old single-file result database into the store
+    result_store.import_json(os.path.join(app.instance_path, "res_db.json"))
+    app.extensions["result_store"] = result_store
+
+    from .ExportJobs import ExportJobManager
+    export_jobs = ExportJobManager(os.path.join(app.instance_path, "exports"),
+                                   max_workers=app.config.get("EXPORT_MAX_WORKERS", 1))
+    app.extensions["export_jobs"] = export_jobs
+    atexit.register(export_jobs.close)
+
+    from .DutyCycleLibrary import DutyCycleLibrary
+    app.extensions["duty_cycles"] = DutyCycleLibrary(os.path.join(app.instance_path, "dutycycles"))
+
     from . import model
     app.register_blueprint(model.bp)
 
     from . import seq_model
     app.register_blueprint(seq_model.bp)
 
+    from . import seq_paralle_model
+    app.register_blueprint(seq_paralle_model.bp)
+
+    from . import results
+    app.register_blueprint(results.bp)
+
     return app
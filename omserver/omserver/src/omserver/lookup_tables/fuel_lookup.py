@@ -1,35 +1,18 @@
-import pandas as pd
-import os
-from pathlib import Path
+from ..FuelRegistry import get_fuel_registry
 
 class FuelPropertiesLookup:
     """
-    Utility class to load and query fuel properties from CSV lookup tables.
+    Utility class to query fuel properties from the CSV lookup tables.
     Handles fuel property lookups for emission calculations based on EU regulations.
+    The tables are read once per process by the shared FuelRegistry, on first use.
     """
     
-    def __init__(self):
-        self.base_path = Path(__file__).parent
-        self.fuel_properties_df = None
-        self.load_tables()
+    def __init__(self, registry=None):
+        self._registry = registry
     
-    def load_tables(self):
-        """Load all CSV lookup tables into pandas DataFrames"""
-        try:
-            # Load fuel properties table
-            fuel_properties_path = self.base_path / 'fuel_properties.csv'
-            if fuel_properties_path.exists():
-                self.fuel_properties_df = pd.read_csv(fuel_properties_path)
-                # Set pathway_name as index for faster lookups
-                self.fuel_properties_df.set_index('pathway_name', inplace=True)
-                print(f"Loaded fuel properties table with {len(self.fuel_properties_df)} fuel types")
-            else:
-                raise FileNotFoundError(f"Fuel properties CSV not found at {fuel_properties_path}")
-                
-        except Exception as e:
-            print(f"Error loading lookup tables: {e}")
-            # Initialize empty DataFrame as fallback
-            self.fuel_properties_df = pd.DataFrame()
+    @property
+    def registry(self):
+        return self._registry if self._registry is not None else get_fuel_registry()
     
     def get_fuel_properties(self, pathway_name):
         """
@@ -41,23 +24,10 @@ class FuelPropertiesLookup:
         Returns:
             dict: Dictionary containing all fuel properties, or None if not found
         """
-        if self.fuel_properties_df is None or self.fuel_properties_df.empty:
-            return None
-            
-        try:
-            if pathway_name in self.fuel_properties_df.index:
-                properties = self.fuel_properties_df.loc[pathway_name].to_dict()
-                # Convert any NaN values to 0 or appropriate defaults
-                for key, value in properties.items():
-                    if pd.isna(value):
-                        properties[key] = 0.0
-                return properties
-            else:
-                print(f"Fuel pathway '{pathway_name}' not found in lookup table")
-                return None
-        except Exception as e:
-            print(f"Error retrieving fuel properties for '{pathway_name}': {e}")
-            return None
+        properties = self.registry.properties(pathway_name)
+        if properties is None:
+            print(f"Fuel pathway '{pathway_name}' not found in lookup table")
+        return properties
     
     def get_available_fuels(self):
         """
@@ -66,9 +36,7 @@ class FuelPropertiesLookup:
         Returns:
             list: List of available fuel pathway names
         """
-        if self.fuel_properties_df is None or self.fuel_properties_df.empty:
-            return []
-        return self.fuel_properties_df.index.tolist()
+        return list(self.registry.names)
     
     def get_fuel_property(self, pathway_name, property_name):
         """
@@ -96,14 +64,7 @@ class FuelPropertiesLookup:
         Returns:
             list: List of matching fuel pathway names
         """
-        if self.fuel_properties_df is None or self.fuel_properties_df.empty:
-            return []
-            
-        matching_fuels = []
-        for fuel_name in self.fuel_properties_df.index:
-            if search_term.lower() in fuel_name.lower():
-                matching_fuels.append(fuel_name)
-        return matching_fuels
+        return self.registry.search(search_term)
 
 # Global instance for easy access
 fuel_lookup = FuelPropertiesLookup()
@@ -1,22 +1,24 @@
 import base64
 from itertools import product
 import json
-import  pandas as pd
 from datetime import datetime
 import shutil
 import os
-import numpy as np
 from pathlib import Path
 from multiprocessing  import Pool, Process
 from flask_cors import CORS
 from flask import Blueprint, current_app, request, jsonify
-from omserver.EUEmissionCalculator import EUMarineEmissionCalculator
+from omserver.EUEmissionCalculator import get_emission_calculator
 from omserver.ModelicaParamParser import ModelicaParamParser
 from concurrent.futures import ProcessPoolExecutor, as_completed
-from .OMCConnection import OMCConnection
+from .OMCSessionPool import get_omc_pool, get_worker_pool
+from .OMCModelBuilder import get_model_builder, modelica_string, variable_filter
+from .JobWorkspace import replace_file_atomic
+from .ResultReader import RESULT_FORMATS, result_file_path
+from .ResultExtractionPlan import LAST, MAX, SERIES, ResultExtractionPlan
+from .ResultStore import get_result_store
+from .ExportJobs import EXPORT_SERIES, get_export_jobs
 import re
-from openpyxl import Workbook
-from openpyxl.utils import get_column_letter
 
 bp = Blueprint("model", __name__, url_prefix="/model")
 CORS(bp)
@@ -29,17 +31,14 @@ PROGRESS = {
     "last_error": None,
 }
 
-ILLEGAL_SHEET_CHARS = re.compile(r"[\[\]\:\*\?\/\\']")
-MAX_SHEET_NAME_LEN = 31
 @bp.route("/upload", methods=["POST"])
 def upload():
     try:
         model_path = Path(current_app.instance_path) / f"{request.json['model_name']}.mo"
         # Ensure instance directory exists
         model_path.parent.mkdir(parents=True, exist_ok=True)
-        # Write in binary mode to handle Unicode properly
-        with open(model_path, "wb") as model_file:
-            model_file.write(base64.b64decode(request.json['model_data']))
+        # Write in binary mode to handle Unicode properly, atomically so running batches never copy half a file
+        replace_file_atomic(model_path, base64.b64decode(request.json['model_data']))
         print(f"Decoded model to {model_path}")
     except Exception as e:
         print(f"Error writing model file: {e}")
@@ -67,19 +66,18 @@ def delete():
 
 @bp.route("/simulate", methods=["POST"])
 def simulate():
-    omc = OMCConnection()
-    omc.request(
-        f"loadFile(\"{current_app.instance_path}/{request.json['model_name']}.mo\")"
-    )   
-
-    overrides = " -override "
-    for override in request.json["overrides"]:
-        overrides += f"{override['param']}={override['value']},"
-    if overrides[-1] == ",":
-        overrides = overrides[:-1]
-    omc.request(
-        f"simulate({request.json['model_name']}, outputFormat=\"csv\", startTime={request.json['start_time']}, stopTime={request.json['stop_time']}, simflags=\"-outputPath {current_app.instance_path}{overrides if len(overrides) > 11 else ''}\")"
-    )
+    model_path = f"{current_app.instance_path}/{request.json['model_name']}.mo"
+    with get_omc_pool().session(model_path) as omc:
+        omc.load_file(model_path)
+
+        overrides = " -override "
+        for override in request.json["overrides"]:
+            overrides += f"{override['param']}={override['value']},"
+        if overrides[-1] == ",":
+            overrides = overrides[:-1]
+        omc.request(
+            f"simulate({request.json['model_name']}, outputFormat=\"csv\", startTime={request.json['start_time']}, stopTime={request.json['stop_time']}, simflags=\"-outputPath {current_app.instance_path}{overrides if len(overrides) > 11 else ''}\")"
+        )
 
     result_string = "No result"
     with current_app.open_instance_resource(
@@ -100,14 +98,24 @@ def simulate_batch():
     start_time  = data["start_time"]
     stop_time   = data["stop_time"]
     combos      = data["list_of_config_combinations"]
+    # Build the model once per distinct source and run the executable directly
+    compile_once = bool(data.get("compile_once", False))
+    # Only write the columns process_simmultion_result reads; "variable_filter": false keeps all of them
+    result_filter = variable_filter(BATCH_RESULT_COLUMNS) if data.get("variable_filter", True) else None
+    filter_option = f'variableFilter={modelica_string(result_filter)}, ' if result_filter else ""
+    # Binary results are read straight into arrays; "csv" is the text fallback
+    result_format = data.get("result_format", "mat")
+    if result_format not in RESULT_FORMATS:
+        return jsonify({"status": "error", "error": f"result_format must be one of {', '.join(RESULT_FORMATS)}"}), 400
 
     # Log General Batch Simulation Info
     print(f"[simulate_batch] model={model_name}, combos={len(combos)}, "
           f"start={start_time}, stop={stop_time}")
 
-    # Connect OMC 
-    omc = OMCConnection()
-    
+    # Borrow a warm OMC session from the app pool
+    omc_pool = get_omc_pool()
+    path_to_mo = Path(current_app.instance_path) / f"{model_name}.mo"
+    omc = omc_pool.acquire(path_to_mo)
     
     # Tracking Progress, Update the Global Status tracker  
     PROGRESS.update({
@@ -119,11 +127,6 @@ def simulate_batch():
         "last_error": None,
     })
 
-    # Check if the result collection db exist, if not , make one
-    # This only Applied to First Time 
-    path_to_db = Path(current_app.instance_path) / "res_db.json"
-    path_to_db.parent.mkdir(parents=True, exist_ok=True)
-
     # Form Current Time
     current_time = datetime.now().strftime("%d/%m/%Y %H:%M")
     
@@ -174,7 +177,6 @@ def simulate_batch():
             overrides_list = cfg.get("changed_parameters", [])
             ov = " -override " + ",".join(f"{o['param']}={o['value']}" for o in overrides_list)
             simflags = f'-outputPath {current_app.instance_path}{ov if len(ov) > 20 else ""}'
-            path_to_mo = Path(current_app.instance_path) / f"{model_name}.mo"
             
             with path_to_mo.open("r", encoding="utf-8") as f:
                 for lineno, line in enumerate(f, start=1):
@@ -184,15 +186,28 @@ def simulate_batch():
                         print(f"{lineno}: {line.strip()}")
             # Make request to  OMC, set over the Model, Model Name, etc
             try:
-                omc.request(f'loadFile("{current_app.instance_path}/{model_name}.mo")')  
-                omc.request(
-                    f'simulate({model_name}, '
-                    f'outputFormat="csv", '
-                    f'startTime={start_time}, '
-                    f'stopTime={stop_time}, '
-                    f'numberOfIntervals = 7500, '
-                    f'simflags="{simflags}")'
-                )
+                if compile_once:
+                    # Reuses the executable when the parser left the .mo unchanged
+                    compiled = get_model_builder().build(
+                        omc, path_to_mo, model_name,
+                        start_time=start_time,
+                        stop_time=stop_time,
+                        number_of_intervals=7500,
+                    )
+                    compiled.run(current_app.instance_path,
+                                 [f"{o['param']}={o['value']}" for o in overrides_list],
+                                 variable_filter=result_filter, output_format=result_format)
+                else:
+                    omc.load_file(path_to_mo)
+                    omc.request(
+                        f'simulate({model_name}, '
+                        f'outputFormat="{result_format}", '
+                        f'startTime={start_time}, '
+                        f'stopTime={stop_time}, '
+                        f'numberOfIntervals = 7500, '
+                        f'{filter_option}'
+                        f'simflags="{simflags}")'
+                    )
 
                 # Log if the simulation has finished 
                 print(f"[simulate_batch] ✓ finished {idx+1}")
@@ -209,7 +224,8 @@ def simulate_batch():
                     f"{cfg.get("instance").get("Battery").get("battery_name")}",
                     f"{cfg.get("instance").get("Battery_Count")}",
                     cost,
-                    max_potential_gen
+                    max_potential_gen,
+                    result_path=result_file_path(current_app.instance_path, model_name, result_format),
                 )
                 temp_result_collection["batch_sim_res_collection"].append(simResult)
 
@@ -235,6 +251,7 @@ def simulate_batch():
         print(f"[simulate_batch] ERROR: {e}")
         return jsonify({"status": "error", "error": str(e)}), 500
     finally:
+        omc_pool.release(omc)
         PROGRESS["running"] = False
         PROGRESS["current"] = None
 
@@ -255,6 +272,10 @@ def simulate_batch_mp():
     start_time  = data["start_time"]
     stop_time   = data["stop_time"]
     combos      = data["list_of_config_combinations"]
+    result_filter = variable_filter(MP_RESULT_COLUMNS) if data.get("variable_filter", True) else None
+    result_format = data.get("result_format", "mat")
+    if result_format not in RESULT_FORMATS:
+        return jsonify({"status": "error", "error": f"result_format must be one of {', '.join(RESULT_FORMATS)}"}), 400
 
     print(f"[simulate_batch_mp] model={model_name}, combos={len(combos)}, start={start_time}, stop={stop_time}")
 
@@ -279,7 +300,7 @@ def simulate_batch_mp():
     # Submit all tasks first; then gather as they complete
     with ProcessPoolExecutor(max_workers=max_workers) as ex:
         futures = [
-            ex.submit(single_simulation, model_name, start_time, stop_time, idx, cfg, instance_path)
+            ex.submit(single_simulation, model_name, start_time, stop_time, idx, cfg, instance_path, result_filter, result_format)
             for idx, cfg in enumerate(combos)
         ]
 
@@ -315,9 +336,10 @@ def simulate_batch_mp():
 @bp.route("/export_an_excel_file", methods=["POST"])
 def export_as_excel():
     """POST JSON:
-       { "batch_name": "<exact batch_sim_title>" }
+       { "batch_name": "<exact batch_sim_title>", "wait": true }
 
-       Saves an Excel file beside res_db.json and returns its filename and path.
+       Exports the batch to an Excel file (instance/exports) and returns its filename and path.
+       With "wait": false the export job is returned right away (poll /results/export/<id>).
     """
     print("Export Starting ")
     try:
@@ -326,109 +348,29 @@ def export_as_excel():
         if not batch_name:
             return jsonify({"status": "error", "error": "missing batch_name"}), 400
 
-        # Locate DB
-        db_path = Path(current_app.instance_path) / "res_db.json"
-        if not db_path.exists():
-            return jsonify({"status": "error", "error": "db_non_exist"}), 200
-        print("DB Located")
-        try:
-            data = json.loads(db_path.read_text(encoding="utf-8"))
-        except Exception as e:
-            current_app.logger.exception("Failed to read/parse res_db.json")
-            return jsonify({"status": "error", "error": "db_read_failed", "detail": str(e)}), 500
-
-        if not isinstance(data, list) or not data:
-            return jsonify({"status": "error", "error": "db_empty"}), 200
-
-        # Find the batch by title
-        batch = next((b for b in data if b.get("batch_sim_title") == batch_name), None)
-        if not batch:
+        # Locate the batch in the results store
+        store = get_result_store()
+        batch_id = store.find_batch(batch_name)
+        if batch_id is None:
+            if not store.list_batches():
+                return jsonify({"status": "error", "error": "db_empty"}), 200
             return jsonify({"status": "error", "error": "batch_not_found"}), 404
 
-        # Build workbook
-        wb = Workbook()
-        # openpyxl creates a default sheet; we'll reuse it as Batch_Summary
-        ws_summary = wb.active
-        ws_summary.title = "Batch_Summary"
-        print("Batch Summary Build Start ")
-        # Batch summary (key/value style)
-        row = 1
-        _write_key_value_row(ws_summary, row, "batch_sim_title", batch.get("batch_sim_title", "")); row += 1
-        _write_key_value_row(ws_summary, row, "batch_sim_time_stamp", batch.get("batch_sim_time_stamp", "")); row += 1
-        _write_key_value_row(ws_summary, row, "vessel_name", batch.get("vessel_name", "")); row += 1
-        _write_key_value_row(ws_summary, row, "batch_size", batch.get("batch_size", "")); row += 1
-        _write_key_value_row(ws_summary, row, "actual_iterations", len(batch.get("batch_sim_res_collection", []) or [])); row += 1
-        _autosize_columns(ws_summary)
-        print("Batch Summary Build Ends")
-        # Iterations_Summary (immediately after)
-        ws_iter_summary = wb.create_sheet(title="Iterations_Summary", index=1)
-        iterations = batch.get("batch_sim_res_collection", []) or []
-        print("Iteration Summary Build Starts")
-        # Create scalar rows
-        scalar_rows = []
-        for idx, it in enumerate(iterations):
-            series, scalars = _split_iteration_fields(it)
-            row_obj = {"iteration_idx": idx}
-            row_obj.update(scalars)
-            scalar_rows.append(row_obj)
-        
-        # Write Iterations_Summary as table
-        if scalar_rows:
-            headers = list(scalar_rows[0].keys())
-            ws_iter_summary.append(headers)
-            for r in scalar_rows:
-                ws_iter_summary.append([r.get(h) for h in headers])
-        else:
-            ws_iter_summary.append(["note"])
-            ws_iter_summary.append(["No iterations"])
-        _autosize_columns(ws_iter_summary)
-        print("Iteration Summary Build Ends")
-        print("Iteration Sheets Build Starts")
-        # Iteration sheets (one per iteration), start from index=2 to keep ordering
-        used_names = set()
-        for idx, it in enumerate(iterations):
-            series, _scalars = _split_iteration_fields(it)
-
-            # Base name: prefer sim_name; otherwise D/M/B counts
-            base = idx
-            if not base:
-                d = it.get("die_count", it.get("Diesel_Engine_Count", "?"))
-                m = it.get("meth_count", it.get("Meth_Count", "?"))
-                b = it.get("bat_count", it.get("Battery_Count", "?"))
-                base = "00"
-                #base = f"D{d}_M{m}_B{b}"
-
-            base = _sanitize_sheet_name(base)
-
-            name = base
-            n = 1
-            while name in used_names or not name:
-                suffix = f"_{n}"
-                head = base[: MAX_SHEET_NAME_LEN - len(suffix)]
-                name = _sanitize_sheet_name(head + suffix)
-                n += 1
-            used_names.add(name)
-
-            ws = wb.create_sheet(title=name)
-            rows = _series_to_rows(series)
-            for r in rows:
-                ws.append(r)
-            _autosize_columns(ws)
-        print("Iteration Sheets Build Ends")
-        # Save beside the DB
-        print("Saving Starts")
-        safe_title = _sanitize_sheet_name(batch.get("batch_sim_title") or "batch")
-        filename = f"{safe_title}.xlsx"
-        out_path = db_path.parent / filename
-        wb.save(out_path)
-        print("Saving Done")
-        # If you want to send the file directly, use:
-        # return send_file(out_path, as_attachment=True, download_name=filename)
+        # Built by a background export job; a batch exported before comes straight from the cache
+        jobs = get_export_jobs()
+        job = jobs.submit(store, batch_id, EXPORT_SERIES)
+        if not body.get("wait", True):
+            return jsonify({"status": "ok", "job": job}), 202
+        job = jobs.wait(job["id"])
+        if job["state"] != "done":
+            return jsonify({"status": "error", "error": job["error"], "job": job}), 500
+        print("Export Done" + (" (cached)" if job["cached"] else ""))
 
         return jsonify({
             "status": "ok",
-            "excel_filename": filename,
-            "excel_path": str(out_path)
+            "excel_filename": job["filename"],
+            "excel_path": job["path"],
+            "job": job,
         }), 200
 
     except Exception as e:
@@ -436,24 +378,13 @@ def export_as_excel():
         return jsonify({"status": "error", "error": str(e)}), 500
 @bp.route("/return_all_batch_names", methods=["GET"])
 def retrive_allbatch_names():
-    # Link DataBase 
-    db_path = Path(current_app.instance_path) / "res_db.json"
     db_non_exist_payload = "db_non_exist"
 
-    # Check if database exist 
-    if not db_path.exists():
-        return jsonify({"result": db_non_exist_payload})
-
-    # read into the database
+    # Titles come from the catalog only, no iteration data is read
     try:
-        with open(db_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        if not isinstance(data, list) or len(data) == 0:
+        batch_name_array = [batch["title"] for batch in get_result_store().list_batches()]
+        if not batch_name_array:
             return jsonify({"result": db_non_exist_payload})
-
-        # Extract batch_sim_title from each batch entry
-        batch_name_array = [batch.get("batch_sim_title", "unknown") for batch in data]
         print(batch_name_array)
         return jsonify({"result": batch_name_array})
 
@@ -461,102 +392,91 @@ def retrive_allbatch_names():
         current_app.logger.error(f"[return_all_batch_names] ERROR: {e}")
         return jsonify({"result": db_non_exist_payload})
 
-@bp.route("/return_best_co2_cases", methods=["GET"])
-def retrive_best_co2_cases():
-    try:
-        # Receive Batch Name from front end
-        batch_name = request.args.get("batch_name", type=str)
-        if not batch_name:
-            current_app.logger.warning("[return_best_co2_cases] missing batch_name")
-            return jsonify({"result": "missing_batch_name"}), 400
+# Series attached to every best case: response key -> result key
+BEST_CASE_SERIES = {
+    "time": "time (h)",
+    "power_demand": "power_demand (KW)",
+    "gen_1_power": "gen_1_power (KW)",
+    "gen_2_power": "gen_2_power (KW)",
+    "gen_3_power": "gen_3_power (KW)",
+    "alt_gen_1_power": "alt_gen_1_power (KW)",
+    "alt_gen_2_power": "alt_gen_2_power (KW)",
+    "alt_gen_3_power": "alt_gen_3_power (KW)",
+    "bat_power": "battery_discharge (W)",
+    "node_tracker": "node_tracker",
+}
 
-        # Attemps to search JSON database Path 
-        db_path = Path(current_app.instance_path) / "res_db.json"
-        if not db_path.exists():
-            return jsonify({"result": "db_non_exist"}), 200
+# Capable of meeting peak demand (where both are known) AND diesel-only (meth_count == 0)
+BEST_CASE_FILTERS = [("meth_count", "==", 0), ("covers_peak", "!=", 0)]
 
-        # Attemp to load the database content
-        try:
-            data = json.loads(db_path.read_text(encoding="utf-8"))
-        except Exception as e:
-            current_app.logger.error("[return_best_co2_cases] JSON read error: %s", e)
-            return jsonify({"result": "db_non_exist"}), 200
-
-        # In case database is empty or the data is not a list 
-        if not isinstance(data, list) or not data:
+def _best_cases(batch_name, sort, log_name, limit=3):
+    """
+    Top iterations of a batch ranked in the results catalog; only the
+    returned iterations have their series loaded, and none with
+    ?include_series=false (the UI then fetches them from /results/series).
+
+    Args:
+        batch_name: Exact batch_sim_title
+        sort: Catalog columns to rank by (see ResultStore.query)
+        log_name: Route name used in log messages
+        limit: Number of iterations returned
+
+    Returns:
+        tuple: (response, status)
+    """
+    if not batch_name:
+        current_app.logger.warning("[%s] missing batch_name", log_name)
+        return jsonify({"result": "missing_batch_name"}), 400
+
+    store = get_result_store()
+    batch_id = store.find_batch(batch_name)
+    if batch_id is None:
+        if not store.list_batches():
             return jsonify({"result": "db_non_exist"}), 200
+        current_app.logger.info("[%s] batch not found: %s", log_name, batch_name)
+        return jsonify({"result": "batch_not_found"}), 200
+
+    _, rows = store.query(batch_id, filters=BEST_CASE_FILTERS, sort=sort, limit=limit)
+    include_series = request.args.get("include_series", "true").lower() not in ("0", "false", "no")
+    if include_series:
+        series = store.series(batch_id, rows, keys=set(BEST_CASE_SERIES.values()))
+    else:
+        series = [{} for _ in rows]
+
+    top = []
+    for row, row_series in zip(rows, series):
+        it = row["scalars"]
+        case = {
+            "position": row["position"],
+            "iteration_id": row["iteration_id"] if row["iteration_id"] is not None else -1,
+            "sim_name": it.get("sim_name", ""),
+            "diesel_gen_name": it.get("diesel_gen_name", ""),
+            "diesel_count": row["diesel_count"] or 0,
+            "meth_gen_name": it.get("meth_gen_name", ""),
+            "meth_count": row["meth_count"] or 0,
+            "bat_name": it.get("bat_name", ""),
+            "bat_count": row["bat_count"] or 0,
+            "diesel_usage" : row["diesel_usage_t"] or 0.0,
+            "meth_usage"  : row["meth_usage_t"] or 0.0,
+            "cost" : row["capital_cost"] or 0.0,
+            "CO2_emission": row["co2_t"] if row["co2_t"] is not None else float("inf"),
+            "penalty": row["penalty_eur"] or 0.0,
+            "peak_power_demand": (row["peak_power_demand_kw"] or 0.0) * 1000.0,
+            "max_pwr_potential_w": (row["max_pwr_potential_kw"] or 0.0) * 1000.0,
+        }
+        for out_key, key in (BEST_CASE_SERIES.items() if include_series else ()):
+            # Small lists are kept with the scalars, longer ones come from the batch's .npz
+            values = row_series[key].tolist() if key in row_series else it.get(key, [1,2,3])
+            case[out_key] = values
+        top.append(case)
+    return jsonify({"result": top}), 200
 
-        # Find the batch by exact title, target batch
-        batch = next((b for b in data if b.get("batch_sim_title") == batch_name), None)
-        if not batch:
-            current_app.logger.info("[return_best_co2_cases] batch not found: %s", batch_name)
-            return jsonify({"result": "batch_not_found"}), 200
-
-        # Find  all iteration within the batch 
-        iters = batch.get("batch_sim_res_collection", []) or []
-
-        # Helper function to parse float 
-        def to_float(x, default=0.0):
-            try:
-                if x is None:
-                    return default
-                return float(x)
-            except Exception:
-                return default
-
-        # Helper to convert to int
-        def to_int(x, default=0):
-            try:
-                return int(x)
-            except Exception:
-                try:
-                    return int(float(x))
-                except Exception:
-                    return default
-
-        # Filter: capable of meeting peak demand AND diesel-only (meth_count == 0)
-        filtered = []
-        
-        for it in iters:
-            max_pwr_potential_kw = to_float(it.get("max_pwr_potential"), 0.0)   # kW
-            peak_power_demand_w  = to_float(it.get("peak_power_demand"), 0.0)   # W
-            max_potential_w      = max_pwr_potential_kw * 1000.0                # temp conversion
-            meth_count = to_int(it.get("meth_count", it.get("Meth_Count", 0)), 0)
-            if max_potential_w >= peak_power_demand_w and meth_count == 0:
-                filtered.append({
-                    "iteration_id": to_int(it.get("iteration_id"), -1),
-                    "sim_name": it.get("sim_name", ""),
-                    "diesel_gen_name": it.get("diesel_gen_name", ""),
-                    "diesel_count": to_int(it.get("diesel_count", it.get("die_count", 0)), 0),
-                    "meth_gen_name": it.get("meth_gen_name", ""),
-                    "meth_count": meth_count,
-                    "bat_name": it.get("bat_name", ""),
-                    "bat_count": to_int(it.get("bat_count", 0), 0),
-                    "diesel_usage" : to_float(it.get("diesel_usage (Ton)"), 0.0),
-                    "meth_usage"  : to_float(it.get("meth_usage (Ton)"), 0.0),
-                    "cost" : to_float(it.get("captital_cost(£)"), 0.0),  
-                    "CO2_emission": to_float(it.get("CO2_emission (Ton)"), float("inf")),
-                    "penalty": to_float(it.get("penalty (EUR)"), 0.0),
-                    "peak_power_demand": peak_power_demand_w,
-                    "max_pwr_potential_w": max_potential_w,
-                    "time" : it.get("time (h)", [1,2,3]),
-                    "power_demand" : it.get("power_demand (KW)", [1,2,3]),
-                    "gen_1_power" : it.get("gen_1_power (KW)",[1,2,3]),
-                    "gen_2_power" : it.get("gen_2_power (KW)",[1,2,3]),
-                    "gen_3_power" : it.get("gen_3_power (KW)",[1,2,3]),
-                    "alt_gen_1_power" : it.get("alt_gen_1_power (KW)", [1,2,3]),
-                    "alt_gen_2_power" : it.get("alt_gen_2_power (KW)", [1,2,3]),
-                    "alt_gen_3_power" : it.get("alt_gen_3_power (KW)", [1,2,3]),
-                    "bat_power" : it.get("battery_discharge (W)",[1,2,3]),
-                    "node_tracker":it.get("node_tracker", [1,2,3])
-                })
-
-        # Sort ascending by CO2 and take up to 3
-        filtered.sort(key=lambda x: x["CO2_emission"])
-        top = filtered[:3]
-
-        return jsonify({"result": top}), 200
-
+@bp.route("/return_best_co2_cases", methods=["GET"])
+def retrive_best_co2_cases():
+    try:
+        # Sort ascending by CO2 (unknown last) and take up to 3
+        return _best_cases(request.args.get("batch_name", type=str),
+                           ["co2_t"], "return_best_co2_cases")
     except Exception as e:
         current_app.logger.exception("[return_best_co2_cases] unexpected error: %s", e)
         # Ensure we *always* return something
@@ -565,213 +485,22 @@ def retrive_best_co2_cases():
 @bp.route("/return_best_diesel_consump_cases", methods=["GET"])
 def retrive_best_diesel_consump_cases():
     try:
-        # Retrive target batch name fomr frontend 
-        print("received request")
-        batch_name = request.args.get("batch_name", type = str)
-        if not  batch_name: 
-            current_app.logger.warning("[return best diesel case] missing batch_name")
-            return jsonify({"result": "missing_batch_name"}), 400
-        print("linking database")
-        # Attemps to search JSON database path 
-        db_path = Path(current_app.instance_path) / "res_db.json"
-        if not db_path.exists():
-            return jsonify({"result": "db_non_exist"}), 200
-
-        # Attemps to load the database content
-        try:
-            print("loading database")
-            data = json.loads(db_path.read_text(encoding="utf-8"))
-        except Exception as e:
-            print("[return best diesel case] JSON read error: %s", e)
-            return jsonify({"result": "db_non_exist"}), 200
-        
-        # In case database is empty or the data is not a list 
-        if not isinstance(data, list) or not data:
-            print("database is empty")
-            return jsonify({"result": "db_non_exist"}), 200
-
-        # Find the batch by exact title, target batch
-        print("finding batch title")
-        batch = next((b for b in data if b.get("batch_sim_title") == batch_name), None)
-        if not batch:
-            print("[return best diesel case] batch not found: %s", batch_name)
-            return jsonify({"result": "batch_not_found"}), 200
-        
-        # Find  all iteration within the batch 
-        iters = batch.get("batch_sim_res_collection", []) or []
-
-        # Helper function to parse float 
-        def to_float(x, default=0.0):
-            try:
-                if x is None:
-                    return default
-                return float(x)
-            except Exception:
-                return default
-
-        # Helper to convert to int
-        def to_int(x, default=0):
-            try:
-                return int(x)
-            except Exception:
-                try:
-                    return int(float(x))
-                except Exception:
-                    return default
-
-        # Filter: capable of meeting peak demand AND diesel-only (meth_count == 0)
-        filtered = []
-        print("filtering  list")
-        for it in iters:
-            max_pwr_potential_kw = to_float(it.get("max_pwr_potential"), 0.0)   # kW
-            peak_power_demand_w  = to_float(it.get("peak_power_demand"), 0.0)   # W
-            max_potential_w      = max_pwr_potential_kw * 1000.0                # temp conversion
-
-            meth_count = to_int(it.get("meth_count", it.get("Meth_Count", 0)), 0)
-            if max_potential_w >= peak_power_demand_w and meth_count == 0:
-                filtered.append({
-                    "iteration_id": to_int(it.get("iteration_id"), -1),
-                    "sim_name": it.get("sim_name", ""),
-                    "diesel_gen_name": it.get("diesel_gen_name", ""),
-                    "diesel_count": to_int(it.get("diesel_count", it.get("die_count", 0)), 0),
-                    "meth_gen_name": it.get("meth_gen_name", ""),
-                    "meth_count": meth_count,
-                    "bat_name": it.get("bat_name", ""),
-                    "bat_count": to_int(it.get("bat_count", 0), 0),
-                    "diesel_usage" : to_float(it.get("diesel_usage (Ton)"), 0.0),
-                    "meth_usage"  : to_float(it.get("meth_usage (Ton)"), 0.0),
-                    "cost" : to_float(it.get("captital_cost(£)"), 0.0),  
-                    "CO2_emission": to_float(it.get("CO2_emission (Ton)"), float("inf")),
-                    "penalty": to_float(it.get("penalty (EUR)"), 0.0),
-                    "peak_power_demand": peak_power_demand_w,
-                    "max_pwr_potential_w": max_potential_w,
-                    "time" : it.get("time (h)", [1,2,3]),
-                    "power_demand" : it.get("power_demand (KW)", [1,2,3]),
-                    "gen_1_power" : it.get("gen_1_power (KW)",[1,2,3]),
-                    "gen_2_power" : it.get("gen_2_power (KW)",[1,2,3]),
-                    "gen_3_power" : it.get("gen_3_power (KW)",[1,2,3]),
-                    "alt_gen_1_power" : it.get("alt_gen_1_power (KW)", [1,2,3]),
-                    "alt_gen_2_power" : it.get("alt_gen_2_power (KW)", [1,2,3]),
-                    "alt_gen_3_power" : it.get("alt_gen_3_power (KW)", [1,2,3]),
-                    "bat_power" : it.get("battery_discharge (W)",[1,2,3]),
-                    "node_tracker":it.get("node_tracker", [1,2,3])
-                })
-
-        # Sort ascending by diesel usage and take up to 3
-        filtered.sort(key=lambda x: x["diesel_usage"])
-        top = filtered[:3]
-
-        print("process end")
-        return jsonify({"result": top}), 200
-
+        # Sort ascending by diesel usage (unknown last) and take up to 3
+        return _best_cases(request.args.get("batch_name", type=str),
+                           ["diesel_usage_t"], "return_best_diesel_consump_cases")
     except Exception as e:
-        current_app.logger.exception("[return_best_co2_cases] unexpected error: %s", e)
+        current_app.logger.exception("[return_best_diesel_consump_cases] unexpected error: %s", e)
         # Ensure we *always* return something
         return jsonify({"result": "internal_error", "detail": str(e)}), 500
     
 @bp.route("/return_best_penalty_cases", methods =["GET"])
 def retrive_best_penalty_cases():
     try:
-        # Retrive target batch name fomr frontend 
-        batch_name = request.args.get("batch_name", type = str)
-        if not  batch_name: 
-            current_app.logger.warning("[return_best_co2_cases] missing batch_name")
-            return jsonify({"result": "missing_batch_name"}), 400
-
-        # Attemps to search JSON database path 
-        db_path = Path(current_app.instance_path) / "res_db.json"
-        if not db_path.exists():
-            return jsonify({"result": "db_non_exist"}), 200
-
-        # Attemps to load the database content
-        try:
-            data = json.loads(db_path.read_text(encoding="utf-8"))
-        except Exception as e:
-            current_app.logger.error("[return_best_co2_cases] JSON read error: %s", e)
-            return jsonify({"result": "db_non_exist"}), 200
-        
-        # In case database is empty or the data is not a list 
-        if not isinstance(data, list) or not data:
-            return jsonify({"result": "db_non_exist"}), 200
-
-        # Find the batch by exact title, target batch
-        batch = next((b for b in data if b.get("batch_sim_title") == batch_name), None)
-        if not batch:
-            current_app.logger.info("[return_best_co2_cases] batch not found: %s", batch_name)
-            return jsonify({"result": "batch_not_found"}), 200
-        
-        # Find  all iteration within the batch 
-        iters = batch.get("batch_sim_res_collection", []) or []
-
-        # Helper function to parse float 
-        def to_float(x, default=0.0):
-            try:
-                if x is None:
-                    return default
-                return float(x)
-            except Exception:
-                return default
-
-        # Helper to convert to int
-        def to_int(x, default=0):
-            try:
-                return int(x)
-            except Exception:
-                try:
-                    return int(float(x))
-                except Exception:
-                    return default
-
-        # Filter: capable of meeting peak demand AND diesel-only (meth_count == 0)
-        filtered = []
-
-        # Filter Process Begine
-        for it in iters:
-            # KW to W conversion for consistancy 
-            max_pwr_potential_kw = to_float(it.get("max_pwr_potential"), 0.0)   
-            peak_power_demand_w  = to_float(it.get("peak_power_demand"), 0.0)   
-            max_potential_w      = max_pwr_potential_kw * 1000.0               
-
-            meth_count = to_int(it.get("meth_count", it.get("Meth_Count", 0)), 0)
-            
-            # Filter thouse who can not meet the demand and use a methanol gen
-            if max_potential_w >= peak_power_demand_w and meth_count == 0:
-                filtered.append({
-                    "iteration_id": to_int(it.get("iteration_id"), -1),
-                    "sim_name": it.get("sim_name", ""),
-                    "diesel_gen_name": it.get("diesel_gen_name", ""),
-                    "diesel_count": to_int(it.get("diesel_count", it.get("die_count", 0)), 0),
-                    "meth_gen_name": it.get("meth_gen_name", ""),
-                    "meth_count": meth_count,
-                    "bat_name": it.get("bat_name", ""),
-                    "bat_count": to_int(it.get("bat_count", 0), 0),
-                    "diesel_usage" : to_float(it.get("diesel_usage (Ton)"), 0.0),
-                    "meth_usage"  : to_float(it.get("meth_usage (Ton)"), 0.0),
-                    "cost" : to_float(it.get("captital_cost(£)"), 0.0),  
-                    "CO2_emission": to_float(it.get("CO2_emission (Ton)"), float("inf")),
-                    "penalty": to_float(it.get("penalty (EUR)"), 0.0),
-                    "peak_power_demand": peak_power_demand_w,
-                    "max_pwr_potential_w": max_potential_w,
-                    "time" : it.get("time (h)", [1,2,3]),
-                    "power_demand" : it.get("power_demand (KW)", [1,2,3]),
-                    "gen_1_power" : it.get("gen_1_power (KW)",[1,2,3]),
-                    "gen_2_power" : it.get("gen_2_power (KW)",[1,2,3]),
-                    "gen_3_power" : it.get("gen_3_power (KW)",[1,2,3]),
-                    "alt_gen_1_power" : it.get("alt_gen_1_power (KW)", [1,2,3]),
-                    "alt_gen_2_power" : it.get("alt_gen_2_power (KW)", [1,2,3]),
-                    "alt_gen_3_power" : it.get("alt_gen_3_power (KW)", [1,2,3]),
-                    "bat_power" : it.get("battery_discharge (W)",[1,2,3]),
-                    "node_tracker":it.get("node_tracker", [1,2,3])
-                })
-
-        # Sort ascending by penalty and take up to 3
-        filtered.sort(key=lambda x: x["penalty"])
-        top = filtered[:3]
-
-        return jsonify({"result": top}), 200
-
+        # Sort ascending by penalty (unknown last) and take up to 3
+        return _best_cases(request.args.get("batch_name", type=str),
+                           ["penalty_eur"], "return_best_penalty_cases")
     except Exception as e:
-        current_app.logger.exception("[return_best_co2_cases] unexpected error: %s", e)
+        current_app.logger.exception("[return_best_penalty_cases] unexpected error: %s", e)
         # Ensure we *always* return something
         return jsonify({"result": "internal_error", "detail": str(e)}), 500
     
@@ -788,20 +517,18 @@ def simulate_batch_cancel():
 
 @bp.route("/get_class_names", methods=["POST"])
 def get_class_names():
-    omc = OMCConnection()
-    omc.request(
-        f"loadFile(\"{current_app.instance_path}/{request.json['model_name']}.mo\")"
-    )
-    names = omc.request("getClassNames()")
+    model_path = f"{current_app.instance_path}/{request.json['model_name']}.mo"
+    with get_omc_pool().session(model_path) as omc:
+        omc.load_file(model_path)
+        names = omc.request("getClassNames()")
     return json.dumps([n for n in names[1:-2].split(",")])
 
 @bp.route("/get_parameter_names", methods=["POST"])
 def get_parameter_names():
-    omc = OMCConnection()
-    omc.request(
-        f"loadFile(\"{current_app.instance_path}/{request.json['model_name']}.mo\")"
-    )
-    params = omc.request(f"getParameterNames({request.json['class']})")
+    model_path = f"{current_app.instance_path}/{request.json['model_name']}.mo"
+    with get_omc_pool().session(model_path) as omc:
+        omc.load_file(model_path)
+        params = omc.request(f"getParameterNames({request.json['class']})")
 
     return json.dumps([n for n in params[1:-2].split(",")])
 
@@ -838,9 +565,8 @@ def set_duty_cycle():
                     else:
                         new_lines.append(line)
 
-                with open(model_path, "w") as f:
-                    f.writelines(new_lines)
-                    print(f"Replaced duty cycle path in {model_path} with {duty_cycle_path}")
+                replace_file_atomic(model_path, "".join(new_lines).encode("utf-8"))
+                print(f"Replaced duty cycle path in {model_path} with {duty_cycle_path}")
             else:
                 print(f"Model path does not exist: {model_path}")
     except OSError:
@@ -856,46 +582,13 @@ def set_duty_cycle():
 
 
 ### Helper Functions ### 
-def get_db_path() -> Path:
-    # instance_path is the right place to write app data
-    p = Path(current_app.instance_path) / "res_db.json"
-    p.parent.mkdir(parents=True, exist_ok=True)
-    return p
-def read_db(db_path: Path):
-    try:
-        text = db_path.read_text(encoding="utf-8")
-        data = json.loads(text)
-        if not isinstance(data, list):
-            current_app.logger.warning("res_db.json not a list; reinitializing")
-            return []
-        return data
-    except FileNotFoundError:
-        return []
-    except Exception as e:
-        current_app.logger.exception("Failed to read res_db.json; reinitializing")
-        return []
-def write_db_atomic(db_path: Path, data):
-    tmp = db_path.with_suffix(".json.tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    tmp.replace(db_path)  
 def append_batch_result(batch_record: dict):
-    db_path = get_db_path()
-    data = read_db(db_path)
-    data.append(batch_record)
-    write_db_atomic(db_path, data)
+    # Catalog row per batch and iteration, series go to the batch's .npz
+    return get_result_store().append_batch(batch_record)
 
 def get_available_batches():
-    db_path = Path(current_app.instance_path) / "res_db.json"
-    if not db_path.exists():
-        return []
-
     try:
-        with open(db_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        # Extract batch names if present
-        batch_names = [batch.get("batch_sim_title", "Unnamed Batch") for batch in data]
-        return batch_names
+        return [batch["title"] for batch in get_result_store().list_batches()]
     except Exception as e:
         print(f"[get_available_batches] ERROR: {e}")
         return []
@@ -904,36 +597,40 @@ def single_simulation(model_name: str,
                       stop_time: float,
                       index: int,
                       override_configuration: dict,
-                      instance_path: str) -> dict:
+                      instance_path: str,
+                      result_filter: str = None,
+                      result_format: str = "csv") -> dict:
     """
     Runs one simulation in its own process, writes result under a unique folder,
-    reads CSV, processes, and RETURNS a JSON-serializable dict.
+    reads the result file, processes, and RETURNS a JSON-serializable dict.
     """
     # Unique output dir per job (prevents accessing the same file)
     job_dir = Path(instance_path) / "runs" / f"{model_name}_job_{index}"
     job_dir.mkdir(parents=True, exist_ok=True)
 
-    # Connect OMC *inside* the process
-    omc = OMCConnection()
-    # Use the instance_path passed in
-    omc.request(f'loadFile("{instance_path}/{model_name}.mo")')
-
     overrides_list = override_configuration.get("changed_parameters", [])
     ov = " -override " + ",".join(f"{o['param']}={o['value']}" for o in overrides_list) if overrides_list else ""
     simflags = f'-outputPath {job_dir}{ov}'
+    filter_option = f'variableFilter={modelica_string(result_filter)}, ' if result_filter else ""
+
+    # Borrow this worker process's warm OMC session (a pool cannot cross processes)
+    model_path = f"{instance_path}/{model_name}.mo"
+    with get_worker_pool().session(model_path) as omc:
+        omc.load_file(model_path)
+
+        # Run simulate
+        omc.request(
+            f'simulate({model_name}, '
+            f'outputFormat="{result_format}", '
+            f'startTime={start_time}, '
+            f'stopTime={stop_time}, '
+            f'{filter_option}'
+            f'simflags="{simflags}")'
+        )
 
-    # Run simulate
-    omc.request(
-        f'simulate({model_name}, '
-        f'outputFormat="csv", '
-        f'startTime={start_time}, '
-        f'stopTime={stop_time}, '
-        f'simflags="{simflags}")'
-    )
-
-    # Read the CSV from *this* job’s folder
-    csv_path = job_dir / f"{model_name}_res.csv"
-    # process CSV → result dict (must be JSON-serializable)
+    # Read the result from *this* job’s folder
+    result_path = result_file_path(job_dir, model_name, result_format)
+    # process result → result dict (must be JSON-serializable)
     inst = override_configuration.get("instance", {})
     d_name = inst.get("Diesel_Engine", {}).get("engine_name", "")
     m_name = inst.get("Meth_Engine", {}).get("engine_name", "")
@@ -954,7 +651,7 @@ def single_simulation(model_name: str,
         methGenCount=m_cnt,
         batName=b_name,
         batCount=b_cnt,
-        csv_path=str(csv_path),
+        result_path=str(result_path),
     )
     # Remove the modelica Simulation output file after the content of which is read 
     try:
@@ -963,32 +660,37 @@ def single_simulation(model_name: str,
     except Exception as e:
         print(f"[simulate_batch] cleanup failed for {job_dir}: {e}")
     return res
+# How process_simulation_result_safe turns a result file into a result (output key, column, reducer)
+MP_RESULT_PLAN = ResultExtractionPlan([
+    ("time (s)", "time"),
+    ("power_demand (W)", "gain1.y"),
+    *[(f"gen_{n}_power (W)", f"generator{n}.P_out") for n in (1, 2, 3)],
+    *[(f"gen_{n}_fuel_mass_flow (g/s)", f"generator{n}.m_flow_fuel") for n in (1, 2, 3)],
+    *[(f"gen_{n}_fuel_volume_flow (m^3/s)", f"generator{n}.V_flow_fuel") for n in (1, 2, 3)],
+    *[(f"alt_gen_{n}_power (W)", f"generator_af_{n}.P_out") for n in (1, 2, 3)],
+    *[(f"alt_gen_{n}_fuel_mass_flow (g/s)", f"generator_af_{n}.m_flow_fuel") for n in (1, 2, 3)],
+    *[(f"alt_gen_{n}_fuel_volume_flow (m^3/s)", f"generator_af_{n}.V_flow_fuel") for n in (1, 2, 3)],
+    ("battery_soc (%)", "battery1.SOC"),
+    ("battery_discharge (W)", "battery1.P_discharge"),
+    ("diesel_usage (KG)", "realValueFuelMass.showNumber", LAST),
+    ("methanol_usage (KG)", "realValueAltFuelMass.showNumber", LAST),
+])
+MP_RESULT_COLUMNS = MP_RESULT_PLAN.columns
 def process_simulation_result_safe(index, simName, dieselGenName, dieselGenCount,
                                    methGenName, methGenCount, batName, batCount,
-                                   csv_path):
-  
-    def last_non_null(df, col, default=0):
-        if col not in df.columns: return default
-        s = df[col].dropna()
-        if s.empty: return default
-        v = s.iloc[-1]
-        if isinstance(v, np.generic): return v.item()
-        return float(v) if isinstance(v, (int, float, np.number)) else v
-
+                                   result_path):
+    # Missing columns give empty series and 0 instead of failing the job
     try:
-        df = pd.read_csv(csv_path)
+        extracted = MP_RESULT_PLAN.extract(result_path, strict=False)
     except Exception:
-        df = pd.DataFrame()
-
-    def col_or_empty(name):
-        return df[name].tolist() if name in df.columns else []
+        extracted = MP_RESULT_PLAN.apply({}, strict=False)
 
     # Calculate the EU certified Emission before returning the result 
     total_emission = 0 
     penalty  = 0
     try :
-        temp_emission_res = calculate_eu_fuel_compliance(last_non_null(df, "realValueFuelMass.showNumber", 0),
-                                                         last_non_null(df, "realValueAltFuelMass.showNumber", 0))
+        temp_emission_res = calculate_eu_fuel_compliance(extracted["diesel_usage (KG)"],
+                                                         extracted["methanol_usage (KG)"])
         total_emission = temp_emission_res.get("emission").get("total_co2")
         penalty = temp_emission_res.get("emission").get("penalty")
     except Exception as e :
@@ -1004,33 +706,10 @@ def process_simulation_result_safe(index, simName, dieselGenName, dieselGenCount
         "meth_count": int(methGenCount),
         "bat_count": int(batCount),
         "iteration_id": int(index),
-        "time (s)": col_or_empty("time"),
-        "power_demand (W)": col_or_empty("gain1.y"),
-        "gen_1_power (W)": col_or_empty("generator1.P_out"),
-        "gen_2_power (W)" : col_or_empty("generator2.P_out"),
-        "gen_3_power (W)" : col_or_empty("generator3.P_out"),
-        "gen_1_fuel_mass_flow (g/s)" : col_or_empty("generator1.m_flow_fuel"),
-        "gen_2_fuel_mass_flow (g/s)" : col_or_empty("generator2.m_flow_fuel"),
-        "gen_3_fuel_mass_flow (g/s)" : col_or_empty("generator3.m_flow_fuel"),
-        "gen_1_fuel_volume_flow (m^3/s)" : col_or_empty("generator1.V_flow_fuel"),
-        "gen_2_fuel_volume_flow (m^3/s)" : col_or_empty("generator2.V_flow_fuel"),
-        "gen_3_fuel_volume_flow (m^3/s)" : col_or_empty("generator3.V_flow_fuel"),
-        "alt_gen_1_power (W)":col_or_empty("generator_af_1.P_out"),
-        "alt_gen_2_power (W)":col_or_empty("generator_af_2.P_out"),
-        "alt_gen_3_power (W)":col_or_empty("generator_af_3.P_out"),
-        "alt_gen_1_fuel_mass_flow (g/s)" : col_or_empty("generator_af_1.m_flow_fuel"),
-        "alt_gen_2_fuel_mass_flow (g/s)" : col_or_empty("generator_af_2.m_flow_fuel"),
-        "alt_gen_3_fuel_mass_flow (g/s)" : col_or_empty("generator_af_3.m_flow_fuel"),
-        "alt_gen_1_fuel_volume_flow (m^3/s)" :col_or_empty("generator_af_1.V_flow_fuel"),
-        "alt_gen_2_fuel_volume_flow (m^3/s)" :col_or_empty("generator_af_2.V_flow_fuel"),
-        "alt_gen_3_fuel_volume_flow (m^3/s)" :col_or_empty("generator_af_3.V_flow_fuel"),
-        "battery_soc (%)": col_or_empty("battery1.SOC"),
-        "battery_discharge (W)": col_or_empty("battery1.P_discharge"),
-        "diesel_usage (KG)": last_non_null(df, "realValueFuelMass.showNumber", 0),
-        "methanol_usage (KG)": last_non_null(df, "realValueAltFuelMass.showNumber", 0),
-        "CO2_emission": float(total_emission), 
-        "penalty": float(penalty),       
     }
+    out.update(extracted)
+    out["CO2_emission"] = float(total_emission)
+    out["penalty"] = float(penalty)
     return out
 def calculate_eu_fuel_compliance(dieselConsumption, methanolConsumption):
     
@@ -1043,7 +722,7 @@ def calculate_eu_fuel_compliance(dieselConsumption, methanolConsumption):
         fuel_results['Diesel'] = dieselConsumption
     if  methanolConsumption > 0 :
         fuel_results['Methanol'] = methanolConsumption
-    emission_calculator = EUMarineEmissionCalculator()    
+    emission_calculator = get_emission_calculator()
     
     emission_fuel_data = [] # Contains  fuel invoved in CO2 PRoduction On the vessel  
     total_emission_tco2eq = 0
@@ -1134,10 +813,30 @@ def calculate_eu_fuel_compliance(dieselConsumption, methanolConsumption):
             "penalty" : compliance_results.get('penalty_eur', 555)
         }
     }
-def process_simmultion_result (index, simName, dieselGenName, dieselGenCount, methGenName, methGenCount, batName, batCount, total_cost, max_powertrain_gen):
+# How process_simmultion_result turns a result file into a result (output key, column, reducer, unit divisor)
+BATCH_RESULT_PLAN = ResultExtractionPlan([
+    ("time (h)", "time", SERIES, 3600),
+    ("power_demand (KW)", "gain1.y", SERIES, 1000),
+    *[(f"gen_{n}_power (KW)", f"generator{n}.P_out", SERIES, 1000) for n in (1, 2, 3)],
+    *[(f"gen_{n}_fuel_mass_flow (g/s)", f"generator{n}.m_flow_fuel") for n in (1, 2, 3)],
+    *[(f"gen_{n}_fuel_volume_flow (m^3/s)", f"generator{n}.V_flow_fuel") for n in (1, 2, 3)],
+    *[(f"alt_gen_{n}_power (KW)", f"generator_af_{n}.P_out", SERIES, 1000) for n in (1, 2, 3)],
+    *[(f"alt_gen_{n}_fuel_mass_flow (g/s)", f"generator_af_{n}.m_flow_fuel") for n in (1, 2, 3)],
+    *[(f"alt_gen_{n}_fuel_volume_flow (m^3/s)", f"generator_af_{n}.V_flow_fuel") for n in (1, 2, 3)],
+    ("battery_soc (%)", "battery1.SOC"),
+    ("battery_discharge (W)", "battery1.P_discharge_abs"),
+    ("battery_charge (W)", "battery1.P_charge_abs"),
+    ("diesel_usage (Ton)", "realValueFuelMass.showNumber", LAST, 1000),
+    ("meth_usage (Ton)", "realValueAltFuelMass.showNumber", LAST, 1000),
+    ("node_tracker", "masterControllerSingleBattery.methanolBatteryDieselDebug.nodeTracker"),
+    ("peak_power_demand (KW)", "gain1.y", MAX, 1000),
+])
+BATCH_RESULT_COLUMNS = BATCH_RESULT_PLAN.columns
+def process_simmultion_result (index, simName, dieselGenName, dieselGenCount, methGenName, methGenCount, batName, batCount, total_cost, max_powertrain_gen,
+                                result_path='./instance/AZEAT_FortunaCrane_Valid_res.csv'):
     processed_simulation_result = {}
     try:
-        df = pd.read_csv('./instance/AZEAT_FortunaCrane_Valid_res.csv')
+        extracted = BATCH_RESULT_PLAN.extract(result_path)
         processed_simulation_result ['sim_name'] = simName
         processed_simulation_result ['diesel_gen_name'] = dieselGenName
         processed_simulation_result ['meth_gen_name'] = methGenName
@@ -1146,38 +845,16 @@ def process_simmultion_result (index, simName, dieselGenName, dieselGenCount, me
         processed_simulation_result ['meth_count'] = methGenCount
         processed_simulation_result ['bat_count'] = batCount
         processed_simulation_result ['iteration_id'] = index
-        processed_simulation_result ['time (h)'] = [t / 3600 for t in df['time'].tolist()]
-        processed_simulation_result ['power_demand (KW)'] = [p / 1000 for p in df['gain1.y'].tolist()]
-        processed_simulation_result ['gen_1_power (KW)'] = [p / 1000 for p in df['generator1.P_out'].tolist()]
-        processed_simulation_result ['gen_2_power (KW)'] = [p / 1000 for p in df['generator2.P_out'].tolist()]
-        processed_simulation_result ['gen_3_power (KW)'] = [p / 1000 for p in df['generator3.P_out'].tolist()]
-        processed_simulation_result ['gen_1_fuel_mass_flow (g/s)'] = df['generator1.m_flow_fuel'].tolist()
-        processed_simulation_result ['gen_2_fuel_mass_flow (g/s)'] = df['generator2.m_flow_fuel'].tolist()
-        processed_simulation_result ['gen_3_fuel_mass_flow (g/s)'] = df['generator3.m_flow_fuel'].tolist()
-        processed_simulation_result ['gen_1_fuel_volume_flow (m^3/s)'] = df['generator1.V_flow_fuel'].tolist()
-        processed_simulation_result ['gen_2_fuel_volume_flow (m^3/s)'] = df['generator2.V_flow_fuel'].tolist()
-        processed_simulation_result ['gen_3_fuel_volume_flow (m^3/s)'] = df['generator3.V_flow_fuel'].tolist()
-        processed_simulation_result ['alt_gen_1_power (KW)'] = [p / 1000 for p in df['generator_af_1.P_out'].tolist()]
-        processed_simulation_result ['alt_gen_2_power (KW)'] = [p / 1000 for p in df['generator_af_2.P_out'].tolist()]
-        processed_simulation_result ['alt_gen_3_power (KW)'] = [p / 1000 for p in df['generator_af_3.P_out'].tolist()]
-        processed_simulation_result ['alt_gen_1_fuel_mass_flow (g/s)'] = df['generator_af_1.m_flow_fuel'].tolist()
-        processed_simulation_result ['alt_gen_2_fuel_mass_flow (g/s)'] = df['generator_af_2.m_flow_fuel'].tolist()
-        processed_simulation_result ['alt_gen_3_fuel_mass_flow (g/s)'] = df['generator_af_3.m_flow_fuel'].tolist()
-        processed_simulation_result ['alt_gen_1_fuel_volume_flow (m^3/s)'] = df['generator_af_1.V_flow_fuel'].tolist()
-        processed_simulation_result ['alt_gen_2_fuel_volume_flow (m^3/s)'] = df['generator_af_2.V_flow_fuel'].tolist()
-        processed_simulation_result ['alt_gen_3_fuel_volume_flow (m^3/s)'] = df['generator_af_3.V_flow_fuel'].tolist()
-        processed_simulation_result ['battery_soc (%)'] = df['battery1.SOC'].tolist()
-        processed_simulation_result ['battery_discharge (W)'] = (df['battery1.P_discharge_abs']).tolist()
-        processed_simulation_result ['battery_charge (W)'] = (df['battery1.P_charge_abs']).tolist()
-        processed_simulation_result ['diesel_usage (Ton)'] = float(df['realValueFuelMass.showNumber'].iloc[-1])/1000
-        print(f"Diesel Comsumption: {df['realValueFuelMass.showNumber'].iloc[-1]} KG")
-        processed_simulation_result ['meth_usage (Ton)'] = float(df['realValueAltFuelMass.showNumber'].iloc[-1])/1000
-        print(f"Methanol Comsumption: {df['realValueAltFuelMass.showNumber'].iloc[-1]} KG" )
+        processed_simulation_result.update(extracted)
+        diesel_kg = extracted['diesel_usage (Ton)'] * 1000
+        methanol_kg = extracted['meth_usage (Ton)'] * 1000
+        print(f"Diesel Comsumption: {diesel_kg} KG")
+        print(f"Methanol Comsumption: {methanol_kg} KG" )
         print(f"Cost : {total_cost} £" )
         total_emisstion = 444
         penalty = 444
         try: 
-            temp_emission_res = calculate_eu_fuel_compliance(df['realValueFuelMass.showNumber'].iloc[-1],df['realValueAltFuelMass.showNumber'].iloc[-1])
+            temp_emission_res = calculate_eu_fuel_compliance(diesel_kg, methanol_kg)
             total_emisstion = temp_emission_res.get("emission").get("total_co2")
             penalty = temp_emission_res.get("emission").get("penalty")
             print(f"Total Emission: {total_emisstion} + Total Penalty :{penalty}")
@@ -1186,58 +863,8 @@ def process_simmultion_result (index, simName, dieselGenName, dieselGenCount, me
         processed_simulation_result ['CO2_emission (Ton)'] = total_emisstion
         processed_simulation_result ['penalty (EUR)'] = penalty
         processed_simulation_result ['captital_cost(£)'] = total_cost
-        processed_simulation_result ['node_tracker'] = df['masterControllerSingleBattery.methanolBatteryDieselDebug.nodeTracker'].tolist()
         processed_simulation_result ['max_pwr_potential (KW)'] = max_powertrain_gen
-        processed_simulation_result ['peak_power_demand (KW)'] = (max(df['gain1.y'].tolist())) * (1/1000)
     except Exception as e:
         print(f"[simulate_batch_result_processing] ERROR: {e}")
         return jsonify({"status": "error", "error": str(e)}), 500
-    return processed_simulation_result 
- 
-def _sanitize_sheet_name(name: str) -> str:
-    if not name:
-        name = "Sheet"
-    name = ILLEGAL_SHEET_CHARS.sub("", str(name)).strip()
-    if len(name) > MAX_SHEET_NAME_LEN:
-        name = name[:MAX_SHEET_NAME_LEN]
-    return name or "Sheet"
-def _is_listlike(v):
-    return isinstance(v, list)
-def _split_iteration_fields(iter_obj: dict):
-    """Split a single iteration object into
-       - series: dict of { key: list }
-       - scalars: dict of non-list values
-    """
-    series = {}
-    scalars = {}
-    for k, v in (iter_obj or {}).items():
-        if _is_listlike(v):
-            series[k] = v
-        else:
-            scalars[k] = v
-    return series, scalars
-def _write_key_value_row(ws, row, key, value):
-    ws.cell(row=row, column=1, value=key)
-    ws.cell(row=row, column=2, value=value)
-def _autosize_columns(ws):
-    # Simple autosize by header and first 50 rows to avoid huge loops on large sheets
-    max_col = ws.max_column
-    for col_idx in range(1, max_col + 1):
-        length = 0
-        col_letter = get_column_letter(col_idx)
-        # header + first ~50 rows
-        for r in range(1, min(ws.max_row, 50) + 1):
-            cell = ws.cell(row=r, column=col_idx)
-            if cell.value is not None:
-                length = max(length, len(str(cell.value)))
-        ws.column_dimensions[col_letter].width = min(max(10, length + 2), 50)
-def _series_to_rows(series: dict):
-    """Turn { col1: [...], col2: [...] } into [ [header...], [row1...], ... ]"""
-    keys = list(series.keys())
-    if not keys:
-        return [["no_series_data"]]
-    max_len = max(len(series.get(k, [])) for k in keys)
-    rows = [keys]
-    for i in range(max_len):
-        rows.append([series.get(k, [None] * (i + 1))[i] if i < len(series.get(k, [])) else None for k in keys])
-    return rows
\ No newline at end of file
+    return processed_simulation_result
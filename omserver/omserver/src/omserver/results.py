@@ -0,0 +1,276 @@
+import numpy as np
+from flask import Blueprint, current_app, request, jsonify, send_file
+from flask_cors import CORS
+
+from .ComplianceScenarios import DEFAULT_YEARS, compliance_scenarios
+from .ExportJobs import EXPORT_OVERVIEW, get_export_jobs
+from .ResultStore import DERIVED_KPI_COLUMNS, KPI_COLUMNS, QUERY_COLUMNS, get_result_store
+from .SeriesDownsampler import LTTB, MIN_POINTS, downsample, window_indices
+
+bp = Blueprint("results", __name__, url_prefix="/results")
+CORS(bp)
+
+# Returned when the request names no fields
+DEFAULT_FIELDS = ["position", "sim_name", *KPI_COLUMNS, *DERIVED_KPI_COLUMNS]
+
+DEFAULT_LIMIT = 100
+
+# Series points returned per key unless the request sets "points"
+DEFAULT_POINTS = 1000
+MAX_POINTS = 20000
+
+# Time axis of a stored iteration, the first present wins
+TIME_KEYS = ("time (h)", "time (s)")
+
+
+@bp.route("/query", methods=["POST"])
+def query():
+    """
+    Filter and rank the iterations of one batch on its catalog KPI columns.
+
+    Request body:
+        batch_name / batch_id: The batch to query
+        filters: [{"field": column, "op": "==", "value": 0}, ...] (all must hold)
+        sort: ["co2_t", "-capital_cost", ...]; "-" for descending, unknown values last
+        limit: Maximum number of iterations (default 100)
+        fields: Catalog columns, scalar result keys or series keys to return
+
+    Returns:
+        JSON: {"status": "ok", "batch": ..., "matched": count, "result": [{field: value}, ...]}
+    """
+    data = request.get_json(silent=True) or {}
+    store = get_result_store()
+
+    batch_id = data.get("batch_id")
+    if batch_id is None and data.get("batch_name"):
+        batch_id = store.find_batch(data["batch_name"])
+    batch = store.batch_info(batch_id) if batch_id is not None else None
+    if batch is None:
+        return jsonify({"status": "error", "error": "batch_not_found"}), 404
+
+    try:
+        filters = [(f["field"], f.get("op", "=="), f.get("value")) for f in data.get("filters", [])]
+        sort = data.get("sort", [])
+        if isinstance(sort, str):
+            sort = [sort]
+        limit = int(data.get("limit", DEFAULT_LIMIT))
+        if limit < 0:
+            raise ValueError("limit must not be negative")
+        fields = data.get("fields") or DEFAULT_FIELDS
+        matched, rows = store.query(batch_id, filters=filters, sort=sort, limit=limit)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"status": "error", "error": f"invalid query: {e}"}), 400
+
+    # Only series that were asked for are read, and only for the returned rows
+    series_keys = {f for f in fields if f not in QUERY_COLUMNS and any(f in row["series"] for row in rows)}
+    series = store.series(batch_id, rows, keys=series_keys) if series_keys else [{} for _ in rows]
+
+    result = []
+    for row, row_series in zip(rows, series):
+        item = {}
+        for field in fields:
+            if field in QUERY_COLUMNS:
+                item[field] = row[field]
+            elif field in row_series:
+                item[field] = row_series[field].tolist()
+            else:
+                item[field] = row["scalars"].get(field)
+        result.append(item)
+
+    current_app.logger.info("[results/query] batch %s: %d matched, %d returned", batch["title"], matched, len(result))
+    return jsonify({"status": "ok", "batch": batch["title"], "matched": matched, "result": result})
+
+
+@bp.route("/series", methods=["POST"])
+def series():
+    """
+    Selected series of one iteration, cut to a time window and downsampled
+    to a point budget.
+
+    Request body:
+        batch_name / batch_id: The batch
+        position / iteration_id: The iteration (position as returned by /results/query)
+        keys: Series keys to return
+        start, end: Time window in units of the time axis (optional)
+        points: Point budget per series (default 1000, at least 4)
+        method: "lttb" (default), "minmax" or "none"
+        time_key: Time axis (default "time (h)", else "time (s)")
+
+    Returns:
+        JSON: {"status": "ok", "time_key": ..., "total_points": samples in the window,
+               "series": {key: {"time": [...], "values": [...]}}}
+    """
+    data = request.get_json(silent=True) or {}
+    store = get_result_store()
+
+    batch_id = data.get("batch_id")
+    if batch_id is None and data.get("batch_name"):
+        batch_id = store.find_batch(data["batch_name"])
+    if batch_id is None or store.batch_info(batch_id) is None:
+        return jsonify({"status": "error", "error": "batch_not_found"}), 404
+
+    try:
+        if data.get("position") is not None:
+            rows = store.iterations(batch_id, where="position = ?", params=(int(data["position"]),))
+        elif data.get("iteration_id") is not None:
+            rows = store.iterations(batch_id, where="iteration_id = ?", params=(int(data["iteration_id"]),), limit=1)
+        else:
+            raise ValueError("position or iteration_id is required")
+        keys = data.get("keys") or []
+        if isinstance(keys, str):
+            keys = [keys]
+        points = min(int(data.get("points", DEFAULT_POINTS)), MAX_POINTS)
+        if points < MIN_POINTS:
+            raise ValueError(f"points must be at least {MIN_POINTS}")
+        method = data.get("method", LTTB)
+        start, end = data.get("start"), data.get("end")
+        start = None if start is None else float(start)
+        end = None if end is None else float(end)
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "error": f"invalid request: {e}"}), 400
+    if not rows:
+        return jsonify({"status": "error", "error": "iteration_not_found"}), 404
+
+    row = rows[0]
+    time_key = data.get("time_key") or next((k for k in TIME_KEYS if k in row["series"] or k in row["scalars"]), None)
+    if time_key is None:
+        return jsonify({"status": "error", "error": "iteration has no time series"}), 400
+    missing = [k for k in [time_key, *keys] if k not in row["series"] and not isinstance(row["scalars"].get(k), list)]
+    if missing:
+        return jsonify({"status": "error", "error": f"unknown series: {', '.join(missing)}"}), 400
+
+    # Only the time axis and the requested keys are read from the batch's .npz
+    loaded = store.series(batch_id, [row], keys={time_key, *keys})[0]
+    values = {k: loaded[k] if k in loaded else np.asarray(row["scalars"][k], dtype=np.float64)
+              for k in [time_key, *keys]}
+    time = values[time_key]
+    window = window_indices(time, start, end)
+
+    out = {}
+    try:
+        for key in keys:
+            if len(values[key]) != len(time):
+                raise ValueError(f"{key} has {len(values[key])} points, {time_key} has {len(time)}")
+            t, v = downsample(time[window], values[key][window], points, method)
+            out[key] = {"time": t.tolist(), "values": v.tolist()}
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+
+    return jsonify({
+        "status": "ok",
+        "position": row["position"],
+        "time_key": time_key,
+        "total_points": window.stop - window.start,
+        "series": out,
+    })
+
+
+@bp.route("/compliance", methods=["POST"])
+def compliance():
+    """
+    FuelEU Maritime compliance balance and penalty of a batch's iterations for
+    several target years and scope splits, from the stored fuel consumption.
+
+    Request body:
+        batch_name / batch_id: The batch
+        years: Reporting years (default 2025, 2030, ..., 2050)
+        in_out_shares: Shares of the fuel burnt on voyages in & out of EU/EEA (default [0])
+        filters, sort, limit: Select iterations as in /results/query (default all)
+
+    Returns:
+        JSON: {"status": "ok", "batch": ..., "years": [...], "ghg_intensity_target": [per year],
+               "result": [{"position", "sim_name", "scenarios": [{"in_out_share", "ghg_intensity",
+               "ghg_emission_t", "compliance_balance_tco2eq": [per year], "penalty_eur": [per year]}]}]}
+    """
+    data = request.get_json(silent=True) or {}
+    store = get_result_store()
+
+    batch_id = data.get("batch_id")
+    if batch_id is None and data.get("batch_name"):
+        batch_id = store.find_batch(data["batch_name"])
+    batch = store.batch_info(batch_id) if batch_id is not None else None
+    if batch is None:
+        return jsonify({"status": "error", "error": "batch_not_found"}), 404
+
+    try:
+        filters = [(f["field"], f.get("op", "=="), f.get("value")) for f in data.get("filters", [])]
+        sort = data.get("sort", [])
+        if isinstance(sort, str):
+            sort = [sort]
+        limit = data.get("limit")
+        limit = None if limit is None else int(limit)
+        years = [int(y) for y in data.get("years") or DEFAULT_YEARS]
+        shares = [float(s) for s in data.get("in_out_shares") or [0.0]]
+        matched, rows = store.query(batch_id, filters=filters, sort=sort, limit=limit)
+        scenarios = compliance_scenarios(rows, years, shares)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"status": "error", "error": f"invalid request: {e}"}), 400
+
+    result = []
+    for n, row in enumerate(rows):
+        result.append({
+            "position": row["position"],
+            "sim_name": row["sim_name"],
+            "scenarios": [{
+                "in_out_share": shares[s],
+                "ghg_intensity": float(scenarios["ghg_intensity_actual"][s, n]),
+                "ghg_emission_t": float(scenarios["ghg_emission"][s, n]),
+                "compliance_balance_tco2eq": scenarios["compliance_balance_tco2eq"][s, :, n].tolist(),
+                "penalty_eur": scenarios["penalty"][s, :, n].tolist(),
+            } for s in range(len(shares))],
+        })
+
+    current_app.logger.info("[results/compliance] batch %s: %d iterations, %d years, %d scope splits",
+                            batch["title"], len(rows), len(years), len(shares))
+    return jsonify({
+        "status": "ok",
+        "batch": batch["title"],
+        "matched": matched,
+        "years": years,
+        "ghg_intensity_target": scenarios["ghg_intensity_target"].tolist(),
+        "result": result,
+    })
+
+
+@bp.route("/export", methods=["POST"])
+def export():
+    """
+    Start (or reuse) the Excel export of a batch.
+
+    Request body:
+        batch_name / batch_id: The batch
+        kind: "overview" (default) or "series"
+
+    Returns:
+        JSON: {"status": "ok", "job": {...}}; 200 when the file is already there, 202 while it is written
+    """
+    data = request.get_json(silent=True) or {}
+    store = get_result_store()
+    batch_id = data.get("batch_id")
+    if batch_id is None and data.get("batch_name"):
+        batch_id = store.find_batch(data["batch_name"])
+    if batch_id is None or store.batch_info(batch_id) is None:
+        return jsonify({"status": "error", "error": "batch_not_found"}), 404
+    try:
+        job = get_export_jobs().submit(store, batch_id, data.get("kind", EXPORT_OVERVIEW))
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    return jsonify({"status": "ok", "job": job}), 200 if job["state"] == "done" else 202
+
+
+@bp.route("/export/<job_id>", methods=["GET"])
+def export_status(job_id):
+    job = get_export_jobs().get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": "job_not_found"}), 404
+    return jsonify({"status": "ok", "job": job})
+
+
+@bp.route("/export/<job_id>/file", methods=["GET"])
+def export_file(job_id):
+    job = get_export_jobs().get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "error": "job_not_found"}), 404
+    if job["state"] != "done":
+        return jsonify({"status": "error", "error": f"export is {job['state']}", "job": job}), 409
+    return send_file(job["path"], as_attachment=True, download_name=job["filename"])
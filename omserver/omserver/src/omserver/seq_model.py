@@ -1,7 +1,6 @@
 import base64
-from itertools import product
+from itertools import islice, product
 import json
-import  pandas as pd
 from datetime import datetime
 import shutil
 import os
@@ -10,14 +9,24 @@ from pathlib import Path
 from multiprocessing  import Pool, Process
 from flask_cors import CORS
 from flask import Blueprint, current_app, request, jsonify
-from omserver.EUEmissionCalculator import EUMarineEmissionCalculator
+from omserver.EUEmissionCalculator import get_emission_calculator
 from omserver.ModelicaSequentialParaPaser import ModelicaSequentialParamParser
+from omserver.ModelicaParamTemplate import ModelicaParamTemplate
 from concurrent.futures import ProcessPoolExecutor, as_completed
-from .OMCConnection import OMCConnection
+from .OMCSessionPool import get_omc_pool
+from .OMCModelBuilder import get_model_builder, modelica_string, variable_filter
+from .JobWorkspace import JobWorkspace, replace_file_atomic
+from .ResultReader import RESULT_FORMATS, result_file_path
+from .ResultExtractionPlan import LAST, MAX, SERIES, ResultExtractionPlan
+from .ResultStore import get_result_store
+from .ExportJobs import EXPORT_OVERVIEW, get_export_jobs
+from .ComplianceScenarios import EU_FUEL_TYPES
+from .DutyCycleLibrary import TABLE_FORMATS, get_duty_cycle_library
+from .RepresentativeWindows import extrapolate_window_results, representative_windows
+from .CombinationSpace import CombinationSpace
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 from werkzeug.utils import secure_filename
-from omserver.ExcelGenerator import ExcelGenerator
 bp = Blueprint("seq_model", __name__, url_prefix="/seq_model")
 CORS(bp)
 PROGRESS = {
@@ -34,9 +43,8 @@ def upload():
         model_path = Path(current_app.instance_path) / f"{request.json['model_name']}.mo"
         # Ensure instance directory exists
         model_path.parent.mkdir(parents=True, exist_ok=True)
-        # Write in binary mode to handle Unicode properly
-        with open(model_path, "wb") as model_file:
-            model_file.write(base64.b64decode(request.json['model_data']))
+        # Write in binary mode to handle Unicode properly, atomically so running batches never copy half a file
+        replace_file_atomic(model_path, base64.b64decode(request.json['model_data']))
         print(f"Decoded model to {model_path}")
     except Exception as e:
         print(f"Error writing model file: {e}")
@@ -58,24 +66,54 @@ def simulate_batch():
     model_name  = data["model_name"]
     start_time  = data["start_time"]
     stop_time   = data["stop_time"]
-    combos      = data["list_of_config_combinations"]
     number_of_slots =data["number_of_slots"]
+    # Posted combinations, or enumerated here from a compact search_space
+    try:
+        combos = batch_combinations(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
     vessel_name = data["vesselName"]
     task_name =  data["taskName"]
+    # Pass fuel tables and generator switches at runtime instead of editing the source
+    runtime_tables = bool(data.get("runtime_tables", False))
+    # Build the model once per distinct source and run the executable directly
+    compile_once = bool(data.get("compile_once", False)) or runtime_tables
+    # Only write the columns process_simmultion_result reads; "variable_filter": false keeps all of them
+    result_filter = variable_filter(RESULT_COLUMNS) if data.get("variable_filter", True) else None
+    # Binary results are read straight into arrays; "csv" is the text fallback
+    result_format = data.get("result_format", "mat")
+    if result_format not in RESULT_FORMATS:
+        return jsonify({"status": "error", "error": f"result_format must be one of {', '.join(RESULT_FORMATS)}"}), 400
+
+    # Screening: simulate only the representative windows of the duty cycle and extrapolate the totals
+    windowing = data.get("representative_windows")
+    if windowing:
+        try:
+            windowing = batch_windows(windowing)
+        except KeyError as e:
+            return jsonify({"status": "error", "error": f"Unknown duty cycle: {e}"}), 404
+        except (TypeError, ValueError) as e:
+            return jsonify({"status": "error", "error": str(e)}), 400
+        # Every window is the same build run with other times, so it is built once
+        compile_once = True
+        windows = [(w["start_time"], w["stop_time"]) for w in windowing["windows"]]
+    else:
+        windows = [(start_time, stop_time)]
 
     # Log General Batch Simulation Info
     print(f"[simulate_batch] model={model_name}, combos={len(combos)}, "
-          f"start={start_time}, stop={stop_time}")
+          f"start={start_time}, stop={stop_time}, windows={len(windows)}")
 
-    # Connect OMC 
-    omc = OMCConnection()
-    
+    # Borrow a warm OMC session from the app pool
+    omc_pool = get_omc_pool()
+    # Work on a private copy of the model, so concurrent batches, uploads and duty cycle changes don't interfere
+    try:
+        workspace = JobWorkspace(current_app.instance_path, model_name, prefix="seq_batch")
+    except FileNotFoundError:
+        return jsonify({"status": "error", "error": f"Model not found: {model_name}"}), 404
+    model_path = workspace.model_path.as_posix()
+    omc = omc_pool.acquire(model_path)
     
-    # Check if the result collection db exist, if not , make one
-    # This only Applied to First Time 
-    path_to_db = Path(current_app.instance_path) / "res_db.json"
-    path_to_db.parent.mkdir(parents=True, exist_ok=True)
-
     # Form Current Time
     current_time = datetime.now().strftime("%d/%m/%Y %H:%M")
     
@@ -88,32 +126,27 @@ def simulate_batch():
         "batch_sim_res_collection"  : []
     }
 
+    batch_id = None
     try:
+        # Parse the model once; every combination is rendered from this template
+        if runtime_tables:
+            if not ModelicaSequentialParamParser(model_name, [], [], model_dir=workspace.root).prepare_runtime_model():
+                raise RuntimeError(f"Could not prepare {model_name}.mo for runtime tables")
+        template = ModelicaParamTemplate.from_file(workspace.model_path)
+
         # Looping Start
         for idx, cfg in enumerate(combos):
             # Update the BSFC &&  FCC for this iteration
-            temp_fcc_list = []
-            temp_bsfc_list = []
-            temp_gen_is_on_list = []
-            config = cfg.get("instance", {}).get("config", {})
-            for i in range(1, number_of_slots + 1):
-                slot = config.get(f"slot {i}")
-                if slot is not None and isinstance(slot, dict):
-                    temp_fcc_list.append(slot.get("engine_fcc", ""))
-                    temp_bsfc_list.append(slot.get("engine_bsfc", ""))
-                    temp_gen_is_on_list.append(True)  # Engine exists, should be on
-                else:
-                    temp_fcc_list.append("")
-                    temp_bsfc_list.append("")
-                    temp_gen_is_on_list.append(False)  # No engine, should be off
+            temp_fcc_list, temp_bsfc_list, temp_gen_is_on_list = slot_parameter_lists(cfg, number_of_slots)
             print(f"FCC list: {temp_fcc_list}")
             print(f"BSFC list: {temp_bsfc_list}")
             print(f"Generator ON/OFF: {temp_gen_is_on_list}")
-            modelicaArrayParser = ModelicaSequentialParamParser(model_name, temp_bsfc_list, temp_fcc_list, temp_gen_is_on_list)
-            # Set all generator switch to false
-            # Then set the generator switch for this run, this aviods mismatching caused by left over from  previous simulation 
-            modelicaArrayParser.initilize_generator_switch()
-            modelicaArrayParser.update_modelica_txt_formate()
+            modelicaArrayParser = ModelicaSequentialParamParser(model_name, temp_bsfc_list, temp_fcc_list, temp_gen_is_on_list, model_dir=workspace.root)
+            if runtime_tables:
+                modelicaArrayParser.update_runtime_model(template)
+            else:
+                # All generator switches off except this run's, so nothing is left over from the previous simulation
+                modelicaArrayParser.update_from_template(template)
         
             # Log Simulation Detail
             print(f"\n[{idx+1}/{len(combos)}] Starting simulation...")
@@ -129,141 +162,96 @@ def simulate_batch():
             
         
             
-            # Unpack the parameter list
-            overrides_list = cfg.get("modelica_parameters", [])
-            # print(f"Found {len(overrides_list)} override parameters")  
-            
-            # Build override string 
-            if overrides_list:
-                override_pairs = []
-                for o in overrides_list:
-                    param_name = o.get('param') # Handle both key names
-                    param_value = o.get('value')
-                    if param_name and param_value is not None:
-                        override_pairs.append(f"{param_name}={param_value}")
-                
-                if override_pairs:
-                    ov = " -override " + ",".join(override_pairs)
-                else:
-                    ov = ""
-            else:
-                ov = ""
+            # Build override string from the parameter list
+            override_pairs = user_override_pairs(cfg)
+            if runtime_tables:
+                override_pairs = modelicaArrayParser.runtime_overrides() + override_pairs
+            ov = " -override " + ",".join(override_pairs) if override_pairs else ""
             
             # Convert Windows backslashes to forward slashes (OpenModelica accepts this)
-            output_path = str(current_app.instance_path).replace('\\', '/')
+            output_path = workspace.root.as_posix()
             simflags = f'-outputPath {output_path}{ov}'
             print(f"Simflags: {simflags}") 
             
-            try:
-                # Load the model (use forward slashes for cross-platform compatibility)
-                model_path = str(Path(current_app.instance_path) / f"{model_name}.mo").replace('\\', '/')
-                omc.request(f'loadFile("{model_path}")')
-                
-            
-                # Run simulation (with extended timeout for long simulations)
-                # print(f"Running simulation...") 
-                omc.request(
-                    f'simulate({model_name}, '
-                    f'outputFormat="csv", '
-                    f'startTime={start_time}, '
-                    f'stopTime={stop_time}, '
-                    f'numberOfIntervals=32643, '
-                    f'tolerance=2.6e-6, '
-                    f'simflags="{simflags}")'  
-                )
-                # print(f"Simulation result: {sim_result}")  # Disabled verbose output
-                
-                # Check for simulation errors (only print actual errors)
-                sim_errors = omc.request('getErrorString()')
-                if sim_errors and "Error" in sim_errors:
-                    print(f" Simulation errors: {sim_errors}")
-                
-                # Check if CSV was created
-                csv_path = Path(current_app.instance_path) / f"{model_name}_res.csv"
-                if not csv_path.exists():
-                    print(f" ERROR: CSV file was not created at {csv_path}")
-                    raise FileNotFoundError(f"Simulation did not produce output CSV: {csv_path}")
-
-                # Log if the simulation has finished 
-                print(f"[{idx+1}/{len(combos)}] ✓ Simulation complete")
-                # print(f"[simulate_batch] start processing")  # Disabled
-                
-                # Extract configuration details (safely handle null slots)
-                config = cfg.get("instance", {}).get("config", {})
-                slot1_engine = (config.get("slot 1") or {}).get("engine_name", "None")
-                slot2_engine = (config.get("slot 2") or {}).get("engine_name", "None")
-                slot3_engine = (config.get("slot 3") or {}).get("engine_name", "None")
-                slot1_engine_db_idx = (config.get("slot 1") or {}).get("engine_db_index", "None")
-                slot2_engine_db_idx = (config.get("slot 2") or {}).get("engine_db_index", "None")
-                slot3_engine_db_idx = (config.get("slot 3") or {}).get("engine_db_index", "None")
-                slot1_engine_mass = (config.get("slot 1") or {}).get("engine_mass", "None")
-                slot2_engine_mass = (config.get("slot 2") or {}).get("engine_mass", "None")
-                slot3_engine_mass = (config.get("slot 3") or {}).get("engine_mass", "None")
-                slot1_engine_volume = (config.get("slot 1") or {}).get("engine_volume", "None")
-                slot2_engine_volume = (config.get("slot 2") or {}).get("engine_volume", "None")
-                slot3_engine_volume = (config.get("slot 3") or {}).get("engine_volume", "None")
-                slot1_engine_cost = (config.get("slot 1") or {}).get("engine_cost", "None")
-                slot2_engine_cost = (config.get("slot 2") or {}).get("engine_cost", "None")
-                slot3_engine_cost = (config.get("slot 3") or {}).get("engine_cost", "None")
-                battery_cost = (config.get("battery") or {}).get("battery_cost", "None")
-                battery_cycle_limit = (config.get("battery") or {}).get("battery_cycle_limit", "None")
-                battery_volume =(config.get("battery") or {}).get("battery_volume", "None")
-                battery_mass=(config.get("battery") or {}).get("battery_mass", "None")
-                battery_name = (config.get("battery") or {}).get("battery_name", "None")
-                battery_count = config.get("battery_count", 0)
-                battery_db_idx = (config.get("battery") or {}).get("battery_db_index", "None")
-                battery_abb = (config.get("battery") or {}).get("battery_abbreviation", "None")
-                #store all the current opt zone pairs (for  max three gens)
-                cur_optZonePairs= [config.get("slot 1_lower") or 0, config.get("slot 1_upper") or 0, config.get("slot 2_lower") or 0, config.get("slot 2_upper") or 0, config.get("slot 3_lower") or 0, config.get("slot 3_upper") or 0]
-                # Create descriptive simulation name
-                # Make the abberivation for generators 1, 2 ,3 
+            window_results = []
+            for window_start, window_stop in windows:
+                # Drop the previous combination's result so a failed run can't be read as this one
+                result_path = workspace.result_file(result_format)
+                result_path.unlink(missing_ok=True)
+                try:
+                    if compile_once:
+                        # Reuses the executable when this combination left the .mo unchanged
+                        compiled = get_model_builder().build(
+                            omc, model_path, model_name,
+                            start_time=start_time,
+                            stop_time=stop_time,
+                            number_of_intervals=32643,
+                            tolerance=2.6e-6,
+                        )
+                        # A window is the same build run over part of the mission
+                        window_overrides = [f"startTime={window_start}", f"stopTime={window_stop}"] if windowing else []
+                        compiled.run(workspace.root, override_pairs + window_overrides,
+                                     variable_filter=result_filter, output_format=result_format)
+                    else:
+                        # Load the model (only re-sent to OMC when the parser changed the file)
+                        omc.load_file(model_path)
+                    
                 
-                battery_power =  f"{round((config.get("battery") or {}).get("battery_max_charge_power", 0) * battery_count * (1/1000))}" if config.get("battery_count", 0) >= 1 else 0
-                gen1_power_abb = f"{(config.get("slot 1") or {}).get("engine_p_max", 0)}" if (config.get("slot 1") or {}).get("engine_fuel_type", "None") != "None" else 0
-                gen2_power_abb = f"{(config.get("slot 2") or {}).get("engine_p_max", 0)}" if (config.get("slot 2") or {}).get("engine_fuel_type", "None") != "None" else 0   
-                gen3_power_abb = f"{(config.get("slot 3") or {}).get("engine_p_max", 0)}" if (config.get("slot 3") or {}).get("engine_fuel_type", "None") != "None" else 0
+                        # Run simulation (with extended timeout for long simulations)
+                        # print(f"Running simulation...") 
+                        filter_option = f'variableFilter={modelica_string(result_filter)}, ' if result_filter else ""
+                        # simulate() builds in omc's working directory, keep it inside the workspace
+                        with omc.working_directory(workspace.root):
+                            omc.request(
+                                f'simulate({model_name}, '
+                                f'outputFormat="{result_format}", '
+                                f'startTime={window_start}, '
+                                f'stopTime={window_stop}, '
+                                f'numberOfIntervals=32643, '
+                                f'tolerance=2.6e-6, '
+                                f'{filter_option}'
+                                f'simflags="{simflags}")'  
+                            )
+                        # print(f"Simulation result: {sim_result}")  # Disabled verbose output
+                    
+                        # Check for simulation errors (only print actual errors)
+                        sim_errors = omc.request('getErrorString()')
+                        if sim_errors and "Error" in sim_errors:
+                            print(f" Simulation errors: {sim_errors}")
                 
-                gen1_name_section = f"G1_{slot1_engine_db_idx+"_" + gen1_power_abb if (config.get("slot 1") or {}).get("engine_fuel_type", "None") != "None" else 0}:"
-                gen2_name_section = f"G2_{slot2_engine_db_idx+"_" + gen2_power_abb if (config.get("slot 2") or {}).get("engine_fuel_type", "None") != "None" else 0}:"
-                gen3_name_section = f"G3_{slot3_engine_db_idx+"_" + gen3_power_abb if (config.get("slot 3") or {}).get("engine_fuel_type", "None") != "None" else 0}:"
-                battery_name_section =f"{battery_db_idx+"_"+battery_abb+str(battery_count)+"_"+ str(battery_power)}"
+                    # Check if the result file was created
+                    if not result_path.exists():
+                        print(f" ERROR: Result file was not created at {result_path}")
+                        raise FileNotFoundError(f"Simulation did not produce a result file: {result_path}")
+
+                    # Log if the simulation has finished 
+                    print(f"[{idx+1}/{len(combos)}] ✓ Simulation complete")
+                    # print(f"[simulate_batch] start processing")  # Disabled
                 
-                # Create simulation abbreviation
-                simName = f"{gen1_name_section + gen2_name_section + gen3_name_section + battery_name_section}" 
-                # Create power train sequence description
-                sequence_description = f"Gen1:[{slot1_engine}] → Gen2:[{slot2_engine}] → Gen3:[{slot3_engine}] + Batt:[{battery_count}x{battery_name}]"
-                engine_mass = [slot1_engine_mass, slot2_engine_mass, slot3_engine_mass]
-                engine_volume =[slot1_engine_volume, slot2_engine_volume, slot3_engine_volume]
-                engine_cost =[slot1_engine_cost, slot2_engine_cost, slot3_engine_cost]
-                battery_specs = [battery_power, battery_cost, battery_cycle_limit,  battery_volume, battery_mass]
-                simResult = process_simmultion_result(
-                    int(idx), 
-                    simName,
-                    sequence_description,
-                    "cost_placeholder",
-                    "max_potential_gen_placeholder",
-                    model_name,
-                    cur_optZonePairs,
-                    battery_name,
-                    battery_count,
-                    engine_mass,
-                    engine_volume,
-                    engine_cost,
-                    battery_specs
-                )
-                temp_result_collection["batch_sim_res_collection"].append(simResult)
-
-            except Exception as e:
-                print(f"[simulate_batch] ✗ error at {idx+1}: {e}")
-                raise
+                    simResult = process_simmultion_result(
+                        int(idx),
+                        total_cost="cost_placeholder",
+                        max_powertrain_gen="max_potential_gen_placeholder",
+                        model_name=model_name,
+                        result_path=result_path,
+                        **combination_details(cfg)
+                    )
+                    window_results.append(simResult)
+
+                except Exception as e:
+                    print(f"[simulate_batch] ✗ error at {idx+1}: {e}")
+                    raise
+            if windowing:
+                simResult = extrapolate_windows(window_results, windowing)
+            temp_result_collection["batch_sim_res_collection"].append(simResult)
            
         # Loop ends, Check Status
         status = "cancelled" if PROGRESS["cancelled"] else "completed"
         print(f"[simulate_batch] finished with status={status}, " f"done={PROGRESS['done']}/{PROGRESS['total']}")
         
-        # Load Result into the database JSON 
+        # Load Result into the results store
         try:
-            append_batch_result(temp_result_collection)
+            batch_id = append_batch_result(temp_result_collection)
             current_app.logger.info(
                 "Saved batch: %s (size=%d)", temp_result_collection["batch_sim_title"], len(temp_result_collection["batch_sim_res_collection"])
             )
@@ -274,31 +262,53 @@ def simulate_batch():
         print(f"[simulate_batch] ERROR: {e}")
         return jsonify({"status": "error", "error": str(e)}), 500
     finally:
+        omc_pool.release(omc)
+        workspace.cleanup()
         print("Saving finally done")
         
-        # Export results to Excel
-        try:
-            # excel_filename = export_batch_to_excel(temp_result_collection)
-            excel_generator = ExcelGenerator(temp_result_collection)
-            excel_filename= excel_generator.export_batch_to_excel()
-            print(f" Excel file created: {excel_filename}")
-        except Exception as e:
-            print(f"Excel export failed: {e}")
-        
+        # Export the stored batch to Excel in the background, the response does not wait for it
+        export_job = start_batch_export(batch_id)
+
         avalible_batches = []
         return jsonify({
-            "avalible_batches" : avalible_batches
+            "avalible_batches" : avalible_batches,
+            "export_job": export_job,
         })
 
+@bp.route("/combinations", methods=["POST"])
+def count_combinations():
+    """
+    Size of a search space (same body as simulate_batch with "search_space")
+    before it is submitted: total, feasible and pruned combinations, and the
+    first "preview" (default 0) feasible combinations.
+    """
+    data = request.get_json(force=True)
+    try:
+        space = batch_combinations(data)
+        preview = int(data.get("preview", 0))
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    if not isinstance(space, CombinationSpace):
+        return jsonify({"status": "error", "error": "search_space is missing"}), 400
+    return jsonify({
+        "status": "ok",
+        **space.stats(),
+        "combinations": list(islice(space, preview)),
+    })
+
 @bp.route("/upload_dutyCycle", methods=["POST"])
 def handle_upload_dutycycle():
     """
-    Receives a duty cycle .txt file, saves it to instance/,
-    parses it, and returns:
-      - absolute file path
+    Receives a duty cycle .txt file and adds it to the duty cycle library
+    (instance/dutycycles), where it is parsed once per distinct content.
+    Returns:
+      - table file path for the model (form field "table_format": "mat" (default) or "txt")
       - start time
       - end time
       - max power
+      - library id and statistics
+      - achieved error and point reduction, when simplified (form fields
+        "simplify_tolerance_kw" and/or "simplify_energy_tolerance")
       - saving status
     """
 
@@ -323,119 +333,334 @@ def handle_upload_dutycycle():
             "reason": "Only .txt files are allowed"
         }), 400
 
-    # Prepare save path
-    filename = secure_filename(file.filename)
-    save_path = Path(current_app.instance_path) / filename
+    table_format = request.form.get("table_format", "mat")
+    if table_format not in TABLE_FORMATS:
+        return jsonify({
+            "status": False,
+            "reason": f"table_format must be one of {', '.join(TABLE_FORMATS)}"
+        }), 400
 
     try:
-        # Save file
-        file.save(save_path)
-
-        # ---- Parse duty cycle file (JS logic translated to Python) ----
-        times = []
-        powers = []
-
-        with open(save_path, "r", encoding="utf-8") as f:
-            lines = f.read().strip().splitlines()
+        # Optional simplification: fewer table points, fewer solver events in every run
+        tolerance_kw, energy_tolerance = (
+            float(request.form[field]) if request.form.get(field, "") != "" else None
+            for field in ("simplify_tolerance_kw", "simplify_energy_tolerance"))
+        library = get_duty_cycle_library()
+        entry = library.add(file.read(), secure_filename(file.filename))
+        if tolerance_kw is not None or energy_tolerance is not None:
+            entry = library.simplify(entry["id"], tolerance_kw, energy_tolerance)
+    except (UnicodeDecodeError, ValueError) as e:
+        return jsonify({
+            "status": False,
+            "reason": str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            "status": False,
+            "reason": str(e)
+        }), 500
 
-        # Skip first 2 header lines
-        data_lines = lines[2:]
+    return duty_cycle_response(entry, table_format), 200 if entry["cached"] else 201
 
-        for line in data_lines:
-            parts = line.strip().split()
-            if len(parts) >= 2:
-                try:
-                    t = float(parts[0])
-                    p = float(parts[1])
-                    times.append(t)
-                    powers.append(p)
-                except ValueError:
-                    # Skip malformed lines
-                    continue
-
-        start_time = times[0] if times else None
-        end_time = times[-1] if times else None
-        max_power = max(powers) if powers else None
 
+@bp.route("/dutyCycle/<cycle_id>", methods=["GET"])
+def get_dutycycle(cycle_id):
+    """
+    A duty cycle of the library by id, in the upload response format,
+    so a known profile is reused without uploading it again.
+    """
+    table_format = request.args.get("table_format", "mat")
+    if table_format not in TABLE_FORMATS:
+        return jsonify({
+            "status": False,
+            "reason": f"table_format must be one of {', '.join(TABLE_FORMATS)}"
+        }), 400
+    entry = get_duty_cycle_library().get(cycle_id)
+    if entry is None:
         return jsonify({
-            "status": True,
-            "file_path": str(save_path.resolve()),
-            "startTime": start_time,
-            "endTime": end_time,
-            "maxPower": max_power,
-        }), 201
+            "status": False,
+            "reason": "Unknown duty cycle"
+        }), 404
+    return duty_cycle_response({**entry, "cached": True}, table_format)
 
-    except Exception as e:
-        # Clean up partially saved file
-        if save_path.exists():
-            save_path.unlink()
 
+@bp.route("/dutyCycle/<cycle_id>/windows", methods=["GET"])
+def get_dutycycle_windows(cycle_id):
+    """
+    Representative windows of a duty cycle (query "window_s", default 86400,
+    and "count", default 2), with weights and the extrapolation error.
+    """
+    try:
+        windows = batch_windows({"duty_cycle_id": cycle_id, **request.args.to_dict()})
+    except KeyError:
+        return jsonify({
+            "status": False,
+            "reason": "Unknown duty cycle"
+        }), 404
+    except ValueError as e:
         return jsonify({
             "status": False,
             "reason": str(e)
-        }), 500
+        }), 400
+    return jsonify({
+        "status": True,
+        **windows,
+    })
 
 
+@bp.route("/dutyCycles", methods=["GET"])
+def list_dutycycles():
+    return jsonify({
+        "status": True,
+        "dutyCycles": get_duty_cycle_library().list(),
+    })
+
+
+def duty_cycle_response(entry, table_format):
+    # The table file is written the first time a format is asked for, then reused
+    table_path = get_duty_cycle_library().table_path(entry["id"], table_format)
+    return jsonify({
+        "status": True,
+        "file_path": str(table_path.resolve()),
+        "startTime": entry["start_time"],
+        "endTime": entry["end_time"],
+        "maxPower": entry["max_power"],
+        "dutyCycleId": entry["id"],
+        "tableName": entry["table_name"],
+        "cached": entry["cached"],
+        "sourceDutyCycleId": entry.get("source_id"),
+        "simplification": entry.get("simplification"),
+        "stats": entry,
+    })
+
+
+def batch_combinations(data):
+    """
+    Combinations of a batch request: "list_of_config_combinations" as posted,
+    or a CombinationSpace enumerating "search_space" lazily. A search space
+    with "duty_cycle_id" takes the peak power and the duty cycle table path
+    from the duty cycle library unless it gives them.
+
+    Raises:
+        ValueError: Invalid search space or unknown duty cycle
+    """
+    spec = data.get("search_space")
+    if spec is None:
+        return data["list_of_config_combinations"]
+    spec = dict(spec)
+    cycle_id = spec.get("duty_cycle_id")
+    if cycle_id:
+        library = get_duty_cycle_library()
+        entry = library.get(cycle_id)
+        if entry is None:
+            raise ValueError(f"Unknown duty cycle: {cycle_id}")
+        spec.setdefault("peak_power", entry["max_power"])
+        if not spec.get("duty_cycle_path"):
+            spec["duty_cycle_path"] = str(library.table_path(cycle_id, spec.get("table_format", "mat")).resolve())
+    return CombinationSpace(spec, data["number_of_slots"])
+
+def batch_windows(options):
+    """
+    Representative windows of a library duty cycle for a screening batch.
+
+    Args:
+        options: {"duty_cycle_id", "window_s" (default 86400), "count" (default 2)}
+
+    Returns:
+        dict: See RepresentativeWindows.representative_windows, with "duty_cycle_id"
+
+    Raises:
+        KeyError: Unknown duty cycle
+        ValueError: Invalid window length or count
+    """
+    cycle_id = options["duty_cycle_id"]
+    table = get_duty_cycle_library().load(cycle_id)
+    windows = representative_windows(table, float(options.get("window_s", 86400)), int(options.get("count", 2)))
+    return {"duty_cycle_id": cycle_id, **windows}
+
+def extrapolate_windows(window_results, windowing):
+    """
+    Mission result of one combination from its representative window results:
+    totals weighted by the windows' weights, peaks the largest, CO2 and
+    penalty from the extrapolated fuel, and the error bounds in "window_extrapolation".
+    """
+    weights = [w["weight"] for w in windowing["windows"]]
+    result = extrapolate_window_results(window_results, weights, WINDOW_TOTALS, WINDOW_PEAKS)
+    emission = calculate_eu_fuel_compliance(result['diesel_usage (Ton)'] * 1000, result['meth_usage (Ton)'] * 1000)
+    result['CO2_emission (Ton)'] = emission["emission"]["total_co2"]
+    result['penalty (EUR)'] = emission["emission"]["penalty"]
+    # Bound of a total that scales with the windows' demand energy
+    bound = windowing["energy_bound_rel"]
+    result['window_extrapolation'] = {
+        "duty_cycle_id": windowing["duty_cycle_id"],
+        "window_s": windowing["window_s"],
+        "windows": [[w["start_time"], w["stop_time"], w["weight"]] for w in windowing["windows"]],
+        "speedup": windowing["speedup"],
+        "energy_error_rel": windowing["energy_error_rel"],
+        "energy_bound_rel": bound,
+        "bounds": {key: abs(result[key]) * bound for key in WINDOW_TOTALS + ['CO2_emission (Ton)', 'penalty (EUR)']},
+    }
+    return result
+
+def slot_parameter_lists(cfg, number_of_slots):
+    """Per-slot FCC tables, BSFC curves and generator switches of one combination."""
+    temp_fcc_list = []
+    temp_bsfc_list = []
+    temp_gen_is_on_list = []
+    config = cfg.get("instance", {}).get("config", {})
+    for i in range(1, number_of_slots + 1):
+        slot = config.get(f"slot {i}")
+        if slot is not None and isinstance(slot, dict):
+            temp_fcc_list.append(slot.get("engine_fcc", ""))
+            temp_bsfc_list.append(slot.get("engine_bsfc", ""))
+            temp_gen_is_on_list.append(True)  # Engine exists, should be on
+        else:
+            temp_fcc_list.append("")
+            temp_bsfc_list.append("")
+            temp_gen_is_on_list.append(False)  # No engine, should be off
+    return temp_fcc_list, temp_bsfc_list, temp_gen_is_on_list
+
+def user_override_pairs(cfg):
+    """The combination's modelica_parameters as "name=value" strings."""
+    overrides_list = cfg.get("modelica_parameters", [])
+    override_pairs = []
+    for o in overrides_list:
+        param_name = o.get('param') # Handle both key names
+        param_value = o.get('value')
+        if param_name and param_value is not None:
+            override_pairs.append(f"{param_name}={param_value}")
+    return override_pairs
+
+def combination_details(cfg):
+    """Names, specs and optimal zones of one combination, as keyword arguments for process_simmultion_result."""
+    config = cfg.get("instance", {}).get("config", {})
+    slot1_engine = (config.get("slot 1") or {}).get("engine_name", "None")
+    slot2_engine = (config.get("slot 2") or {}).get("engine_name", "None")
+    slot3_engine = (config.get("slot 3") or {}).get("engine_name", "None")
+    slot1_engine_db_idx = (config.get("slot 1") or {}).get("engine_db_index", "None")
+    slot2_engine_db_idx = (config.get("slot 2") or {}).get("engine_db_index", "None")
+    slot3_engine_db_idx = (config.get("slot 3") or {}).get("engine_db_index", "None")
+    slot1_engine_mass = (config.get("slot 1") or {}).get("engine_mass", "None")
+    slot2_engine_mass = (config.get("slot 2") or {}).get("engine_mass", "None")
+    slot3_engine_mass = (config.get("slot 3") or {}).get("engine_mass", "None")
+    slot1_engine_volume = (config.get("slot 1") or {}).get("engine_volume", "None")
+    slot2_engine_volume = (config.get("slot 2") or {}).get("engine_volume", "None")
+    slot3_engine_volume = (config.get("slot 3") or {}).get("engine_volume", "None")
+    slot1_engine_cost = (config.get("slot 1") or {}).get("engine_cost", "None")
+    slot2_engine_cost = (config.get("slot 2") or {}).get("engine_cost", "None")
+    slot3_engine_cost = (config.get("slot 3") or {}).get("engine_cost", "None")
+    battery_cost = (config.get("battery") or {}).get("battery_cost", "None")
+    battery_cycle_limit = (config.get("battery") or {}).get("battery_cycle_limit", "None")
+    battery_volume =(config.get("battery") or {}).get("battery_volume", "None")
+    battery_mass=(config.get("battery") or {}).get("battery_mass", "None")
+    battery_name = (config.get("battery") or {}).get("battery_name", "None")
+    battery_count = config.get("battery_count", 0)
+    battery_db_idx = (config.get("battery") or {}).get("battery_db_index", "None")
+    battery_abb = (config.get("battery") or {}).get("battery_abbreviation", "None")
+    #store all the current opt zone pairs (for  max three gens)
+    cur_optZonePairs= [config.get("slot 1_lower") or 0, config.get("slot 1_upper") or 0, config.get("slot 2_lower") or 0, config.get("slot 2_upper") or 0, config.get("slot 3_lower") or 0, config.get("slot 3_upper") or 0]
+    # Create descriptive simulation name
+    # Make the abberivation for generators 1, 2 ,3 
+    
+    battery_power =  f"{round((config.get("battery") or {}).get("battery_max_charge_power", 0) * battery_count * (1/1000))}" if config.get("battery_count", 0) >= 1 else 0
+    gen1_power_abb = f"{(config.get("slot 1") or {}).get("engine_p_max", 0)}" if (config.get("slot 1") or {}).get("engine_fuel_type", "None") != "None" else 0
+    gen2_power_abb = f"{(config.get("slot 2") or {}).get("engine_p_max", 0)}" if (config.get("slot 2") or {}).get("engine_fuel_type", "None") != "None" else 0   
+    gen3_power_abb = f"{(config.get("slot 3") or {}).get("engine_p_max", 0)}" if (config.get("slot 3") or {}).get("engine_fuel_type", "None") != "None" else 0
+    
+    gen1_name_section = f"G1_{slot1_engine_db_idx+"_" + gen1_power_abb if (config.get("slot 1") or {}).get("engine_fuel_type", "None") != "None" else 0}:"
+    gen2_name_section = f"G2_{slot2_engine_db_idx+"_" + gen2_power_abb if (config.get("slot 2") or {}).get("engine_fuel_type", "None") != "None" else 0}:"
+    gen3_name_section = f"G3_{slot3_engine_db_idx+"_" + gen3_power_abb if (config.get("slot 3") or {}).get("engine_fuel_type", "None") != "None" else 0}:"
+    battery_name_section =f"{battery_db_idx+"_"+battery_abb+str(battery_count)+"_"+ str(battery_power)}"
+    
+    # Create simulation abbreviation
+    simName = f"{gen1_name_section + gen2_name_section + gen3_name_section + battery_name_section}" 
+    # Create power train sequence description
+    sequence_description = f"Gen1:[{slot1_engine}] → Gen2:[{slot2_engine}] → Gen3:[{slot3_engine}] + Batt:[{battery_count}x{battery_name}]"
+    engine_mass = [slot1_engine_mass, slot2_engine_mass, slot3_engine_mass]
+    engine_volume =[slot1_engine_volume, slot2_engine_volume, slot3_engine_volume]
+    engine_cost =[slot1_engine_cost, slot2_engine_cost, slot3_engine_cost]
+    battery_specs = [battery_power, battery_cost, battery_cycle_limit,  battery_volume, battery_mass]
+    return {
+        "simName": simName,
+        "sequence_description": sequence_description,
+        "optZonePairs": cur_optZonePairs,
+        "batName": battery_name,
+        "batCount": battery_count,
+        "engineMass": engine_mass,
+        "engineVolume": engine_volume,
+        "engineCost": engine_cost,
+        "batteryInfo": battery_specs,
+    }
+
+# How a result file becomes the per-iteration result (output key, column, reducer, unit divisor, digits)
+RESULT_PLAN = ResultExtractionPlan([
+    ("time (h)", "time", SERIES, 3600),
+    ("power_demand (KW)", "gain1.y", SERIES, 1000),
+    ("gen_1_power (KW)", "generator1.P_out", SERIES, 1000),
+    ("gen_2_power (KW)", "generator2.P_out", SERIES, 1000),
+    ("gen_3_power (KW)", "generator3.P_out", SERIES, 1000),
+    ("battery_soc (%)", "battery1.SOC"),
+    ("battery_discharge (KW)", "battery1.P_discharge_abs", SERIES, 1000),
+    ("battery_charge (KW)", "battery1.P_charge_abs", SERIES, 1000),
+    ("Battery Charging Energy(kWh)", "realValue_bat_charging_energy.showNumber"),
+    ("Battery Discharging Energy(kWh)", "realValue_bat_discharging_energy.showNumber"),
+    ("Total Gen1 Energy (kWh)", "realValue_gen_energy1.showNumber", LAST, 1, 2),
+    ("Total Gen2 Energy (kWh)", "realValue_gen_energy2.showNumber", LAST, 1, 2),
+    ("Total Gen3 Energy (kWh)", "realValue_gen_energy3.showNumber", LAST, 1, 2),
+    ("Total Battery Charging Energy (kWh)", "realValue_bat_charging_energy.showNumber", LAST, 1, 2),
+    ("Total Battery Discharging Energy (kWh)", "realValue_bat_discharging_energy.showNumber", LAST, 1, 2),
+    ("Total Energy Deamand (kWh)", "realValueTotalDemand.showNumber", LAST),
+    ("Total Energy Supplied (kWh)", "realValueTotalEnergySuppliedIncludingLoss.showNumber", LAST),
+    ("Total Energy Wasted (kWh)", "realValueTotalWastedEnergy.showNumber", LAST),
+    ("Wasted Power (kW)", "Surplus1.y", SERIES, 1000),
+    ("battery_measured_power (kW)", "battery1.P_out", SERIES, 1000),
+    ("Gen1 Energy (kWh)", "realValue_gen_energy1.showNumber"),
+    ("Gen2 Energy (kWh)", "realValue_gen_energy2.showNumber"),
+    ("Gen3 Energy (kWh)", "realValue_gen_energy3.showNumber"),
+    ("diesel_usage (Ton)", "realTotalDieselUsage.showNumber", LAST, 1000),
+    ("meth_usage (Ton)", "realTotalAltFuelUsage.showNumber", LAST, 1000),
+    ("hydrogen_usage (Ton)", "realTotalHydroUsage.showNumber", LAST, 1000),
+    ("peak_power_demand (KW)", "gain1.y", MAX, 1000),
+])
+
+# Every column process_simmultion_result reads from the result file
+RESULT_COLUMNS = RESULT_PLAN.columns
+
+# Window results: LAST values are totals since the window's start, MAX values peaks
+WINDOW_TOTALS = [f.key for f in RESULT_PLAN.fields if f.reducer == LAST]
+WINDOW_PEAKS = [f.key for f in RESULT_PLAN.fields if f.reducer == MAX]
+# Result columns that count up from the start time, continued across the segments of a segmented run
+CUMULATIVE_COLUMNS = [f.column for f in RESULT_PLAN.fields if f.reducer == LAST]
+
 def process_simmultion_result(index, simName, sequence_description, total_cost, 
                               max_powertrain_gen ,model_name, optZonePairs, batName, batCount,
-                              engineMass, engineVolume, engineCost, batteryInfo):
+                              engineMass, engineVolume, engineCost, batteryInfo, result_path=None, result_data=None):
     processed_simulation_result = {}
     try:
-        # Construct the path to the CSV result file
-        csv_path = Path(current_app.instance_path) / f"{model_name}_res.csv"
-        # print(f"Reading CSV from: {csv_path}")  # Disabled
-        
-        if not csv_path.exists():
-            print(f" ERROR: CSV file not found at {csv_path}")
-            raise FileNotFoundError(f"Result CSV not found: {csv_path}")
-        
-        df = pd.read_csv(csv_path)
+        if result_data is not None:
+            # Columns already read, e.g. stitched from the segments of a segmented run
+            extracted = RESULT_PLAN.apply(result_data)
+        else:
+            # Construct the path to the result file (defaults to the CSV in the instance folder)
+            result_path = Path(result_path) if result_path else result_file_path(current_app.instance_path, model_name)
+            # Only the plan's columns are read (mat is memory mapped, csv falls back to pandas)
+            extracted = RESULT_PLAN.extract(result_path)
+
         processed_simulation_result['sim_name'] = simName
         processed_simulation_result['sequence'] = sequence_description
-
         processed_simulation_result['iteration_id'] = index
-        processed_simulation_result['time (h)'] = [t / 3600 for t in df['time'].tolist()]
-        processed_simulation_result['power_demand (KW)'] = [p / 1000 for p in df['gain1.y'].tolist()]
-        
-        processed_simulation_result['gen_1_power (KW)'] = [p / 1000 for p in df['generator1.P_out'].tolist()]
-        processed_simulation_result['gen_2_power (KW)'] = [p / 1000 for p in df['generator2.P_out'].tolist()]
-        processed_simulation_result['gen_3_power (KW)'] = [p / 1000 for p in df['generator3.P_out'].tolist()]
-        
         processed_simulation_result['battery_name'] = batName
         processed_simulation_result['battery_count'] = batCount
-        processed_simulation_result['battery_soc (%)'] = df['battery1.SOC'].tolist()
-        processed_simulation_result['battery_discharge (KW)'] = [p / 1000 for p in df['battery1.P_discharge_abs'].tolist()]
-        processed_simulation_result['battery_charge (KW)'] = [p / 1000 for p in df['battery1.P_charge_abs'].tolist()]
-        processed_simulation_result['Battery Charging Energy(kWh)'] = [p for p in df['realValue_bat_charging_energy.showNumber'].tolist()]
-        processed_simulation_result['Battery Discharging Energy(kWh)'] = [p for p in df['realValue_bat_discharging_energy.showNumber'].tolist()]
-
-
         processed_simulation_result['optimalZone'] = optZonePairs
-
-        processed_simulation_result['Total Gen1 Energy (kWh)'] = round (float(df['realValue_gen_energy1.showNumber'].iloc[-1]) , 2)
-        processed_simulation_result['Total Gen2 Energy (kWh)'] = round (float(df['realValue_gen_energy2.showNumber'].iloc[-1]) , 2)
-        processed_simulation_result['Total Gen3 Energy (kWh)'] = round (float(df['realValue_gen_energy3.showNumber'].iloc[-1]) , 2)
-        processed_simulation_result['Total Battery Charging Energy (kWh)'] = round (float(df['realValue_bat_charging_energy.showNumber'].iloc[-1]) , 2)
-        processed_simulation_result['Total Battery Discharging Energy (kWh)'] = round (float(df['realValue_bat_discharging_energy.showNumber'].iloc[-1]) , 2)
-        processed_simulation_result['Total Energy Deamand (kWh)'] = float(df['realValueTotalDemand.showNumber'].iloc[-1])
-        processed_simulation_result['Total Energy Supplied (kWh)'] = float(df['realValueTotalEnergySuppliedIncludingLoss.showNumber'].iloc[-1])
-        print(f"[Total Energy Demand] : {float(df['realValueTotalDemand.showNumber'].iloc[-1])}")
-        print(f"[Total Energy Supplied] : {float(df['realValueTotalEnergySuppliedIncludingLoss.showNumber'].iloc[-1])}")
-        processed_simulation_result['Total Energy Wasted (kWh)'] = float(df['realValueTotalWastedEnergy.showNumber'].iloc[-1])
-        print(f"[Total Energy Wasted] : {float(df['realValueTotalWastedEnergy.showNumber'].iloc[-1])}")
-        processed_simulation_result['Wasted Power (kW)'] = [p / 1000 for p in df['Surplus1.y'].tolist()]
-        processed_simulation_result['battery_measured_power (kW)'] = [p / 1000 for p in df['battery1.P_out'].tolist()]
-        processed_simulation_result['Gen1 Energy (kWh)'] = [p for p in df['realValue_gen_energy1.showNumber'].tolist()]
-        processed_simulation_result['Gen2 Energy (kWh)'] = [p for p in df['realValue_gen_energy2.showNumber'].tolist()]
-        processed_simulation_result['Gen3 Energy (kWh)'] = [p for p in df['realValue_gen_energy3.showNumber'].tolist()]
-        # Extract fuel consumption values
-        diesel_kg = float(df['realTotalDieselUsage.showNumber'].iloc[-1])
-        methanol_kg = float(df['realTotalAltFuelUsage.showNumber'].iloc[-1])
-        hydrogen_kg = float(df['realTotalHydroUsage.showNumber'].iloc[-1])
-        
-        processed_simulation_result['diesel_usage (Ton)'] = diesel_kg / 1000
-        processed_simulation_result['meth_usage (Ton)'] = methanol_kg / 1000
-        processed_simulation_result['hydrogen_usage (Ton)'] = hydrogen_kg / 1000
+        processed_simulation_result.update(extracted)
+        print(f"[Total Energy Demand] : {extracted['Total Energy Deamand (kWh)']}")
+        print(f"[Total Energy Supplied] : {extracted['Total Energy Supplied (kWh)']}")
+        print(f"[Total Energy Wasted] : {extracted['Total Energy Wasted (kWh)']}")
+
+        # Fuel consumption in kg
+        diesel_kg = extracted['diesel_usage (Ton)'] * 1000
+        methanol_kg = extracted['meth_usage (Ton)'] * 1000
+        hydrogen_kg = extracted['hydrogen_usage (Ton)'] * 1000
         
         # Display fuel consumption (highlighted)
         print(f"  Diesel: {diesel_kg:.2f} kg | Methanol: {methanol_kg:.2f} kg | Hydrogen: {hydrogen_kg:.2f} kg")
@@ -454,7 +679,6 @@ def process_simmultion_result(index, simName, sequence_description, total_cost,
         processed_simulation_result['penalty (EUR)'] = penalty
         processed_simulation_result['capital_cost (£)'] = total_cost
         processed_simulation_result['max_pwr_potential (KW)'] = max_powertrain_gen
-        processed_simulation_result['peak_power_demand (KW)'] = (max(df['gain1.y'].tolist())) * (1/1000)
         processed_simulation_result['Gen Costs'] = engineCost
         processed_simulation_result['Gen Volumes'] = engineVolume
         processed_simulation_result['Gen Mass'] = engineMass
@@ -465,35 +689,23 @@ def process_simmultion_result(index, simName, sequence_description, total_cost,
         return jsonify({"status": "error", "error": str(e)}), 500
     return processed_simulation_result 
 def append_batch_result(batch_record: dict):
-    db_path = get_db_path()
-    data = read_db(db_path)
-    data.append(batch_record)
-    write_db_atomic(db_path, data) 
-
-def get_db_path() -> Path:
-    # instance_path is the right place to write app data
-    p = Path(current_app.instance_path) / "res_db.json"
-    p.parent.mkdir(parents=True, exist_ok=True)
-    return p
-
-def read_db(db_path: Path):
+    # Catalog row per batch and iteration, series go to the batch's .npz
+    return get_result_store().append_batch(batch_record)
+
+def start_batch_export(batch_id):
+    """
+    Queue the Excel export of a stored batch (see ExportJobs).
+
+    Returns:
+        dict: The export job, or None if the batch was not stored or could not be queued
+    """
+    if batch_id is None:
+        return None
     try:
-        text = db_path.read_text(encoding="utf-8")
-        data = json.loads(text)
-        if not isinstance(data, list):
-            current_app.logger.warning("res_db.json not a list; reinitializing")
-            return []
-        return data
-    except FileNotFoundError:
-        return []
+        return get_export_jobs().submit(get_result_store(), batch_id, EXPORT_OVERVIEW)
     except Exception as e:
-        current_app.logger.exception("Failed to read res_db.json; reinitializing")
-        return []
-
-def write_db_atomic(db_path: Path, data):
-    tmp = db_path.with_suffix(".json.tmp")
-    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
-    tmp.replace(db_path)
+        print(f"Excel export failed: {e}")
+        return None
 
 def calculate_eu_fuel_compliance(dieselConsumption, methanolConsumption):
     """
@@ -506,114 +718,37 @@ def calculate_eu_fuel_compliance(dieselConsumption, methanolConsumption):
     Returns:
         Dictionary with emission data including total CO2 and penalty
     """
-    fuel_type_mapping = {
-        'Diesel': 'MDO MGO (Grades DMX to DMB)',
-        'Methanol': 'e-methanol E10'
-    }
-    
-    fuel_results = {}
-    if dieselConsumption > 0:
-        fuel_results['Diesel'] = dieselConsumption
-    if methanolConsumption > 0:
-        fuel_results['Methanol'] = methanolConsumption
-    
-    emission_calculator = EUMarineEmissionCalculator()
-    
-    emission_fuel_data = []  # Contains fuel involved in CO2 production on the vessel  
-    total_emission_tco2eq = 0
-    emission_breakdown = {}
-
-    for fuel_type, consumption_kg in fuel_results.items():
-        if consumption_kg > 0:
-            # Convert kg to tonnes for emission calculation
-            consumption_tonnes = consumption_kg / 1000
-            
-            emission_fuel_type = fuel_type_mapping.get(fuel_type)
-            if not emission_fuel_type:
-                # print(f"No emission fuel mapping found for {fuel_type}")  # Disabled
-                continue
-            
-            # All fuel consumption is within EU/EEA
-            fuel_data_entry = {
-                'fuel_type': emission_fuel_type,
-                'fuel_consumption_within_eu': consumption_tonnes,
-                'fuel_consumption_in_out_eu': 0.0,  # All within EU
-                'is_biofuel': False,
-                'biofuel_option': 3,
-                'biofuel_percentage': 0,
-                'biofuel_pathway': ''
-            }
-            
-            emission_fuel_data.append(fuel_data_entry)
-            # print(f"{fuel_type} ({emission_fuel_type}): {consumption_tonnes:.3f} tonnes within EU")  
-    
-    # Calculate emissions if all data is presented
-    emission_results = None
-    compliance_results = None
-    
-    if emission_fuel_data:
-        try:
-            # Validate fuel data
-            validation = emission_calculator.validate_fuel_data(emission_fuel_data)
-            if not validation['valid']:
-                # print(f"Invalid fuel data for emission calculation: {validation['error']}")  
-                return {
-                    "emission": {
-                        "total_co2": 0,
-                        "penalty": 0
-                    }
-                }
-            
-            # Run Phase 2 emission calculation (includes both phase 1 and 2)
-            emission_results = emission_calculator.calculate_emissions_phase2(emission_fuel_data, target_year=2025)
-            
-            # Extract emission breakdown per fuel
-            fuel_breakdown = emission_results.get('fuel_breakdown', [])
-            for fuel_calc in fuel_breakdown:
-                original_fuel_type = None
-                emission_fuel_type = fuel_calc.get('fuel_type', '')
-                
-                # Reverse map to original fuel type
-                for orig_type, mapped_type in fuel_type_mapping.items():
-                    if mapped_type == emission_fuel_type:
-                        original_fuel_type = orig_type
-                        break
-                
-                if original_fuel_type:
-                    emission_breakdown[original_fuel_type] = {
-                        'consumption_tonnes': fuel_calc.get('fuel_mass_total', 0),
-                        'ghg_emission_tonnes': fuel_calc.get('ghg_emission', 0)
-                    }
-            
-            # Extract compliance results
-            final_results = emission_results.get('final_results', {})
-            compliance_results = {
-                'ghg_intensity_actual': final_results.get('ghg_intensity_actual', 0),
-                'ghg_intensity_target': final_results.get('ghg_intensity_target_2025_2029', 0),
-                'compliance_balance_tco2eq': final_results.get('compliance_balance_tco2eq', 0),
-                'penalty_eur': final_results.get('penalty', 0),
-                'total_ghg_emission_tonnes': final_results.get('ghg_emission', 0)
-            }
-            
-            total_emission_tco2eq = final_results.get('ghg_emission', 0)
-            
-            # Disabled verbose emission calculation output
-            # print(f"Emission calculation completed:")
-            # print(f"---Total GHG Emission: {total_emission_tco2eq:.3f} tCO2eq")
-            # print(f"---GHG Intensity Actual: {compliance_results['ghg_intensity_actual']:.6f} gCO2eq/MJ")
-            # print(f"---GHG Intensity Target: {compliance_results['ghg_intensity_target']:.6f} gCO2eq/MJ")
-            # print(f"---Compliance Balance: {compliance_results['compliance_balance_tco2eq']:.6f} tCO2eq")
-            # print(f"---Penalty: EUR {compliance_results['penalty_eur']:.2f}")
-            
-        except Exception as e:
-            # print(f"Emission calculation failed: {str(e)}")  # Disabled
-            # Continue with fuel consumption results but no emissions
-            pass  # Silent fail, error will be shown in main output
-            
+    emission = calculate_eu_fuel_compliance_batch([dieselConsumption], [methanolConsumption])
     return {
         "emission": {
-            "total_co2": compliance_results.get('total_ghg_emission_tonnes', 0) if compliance_results else 0,
-            "penalty": compliance_results.get('penalty_eur', 0) if compliance_results else 0
+            "total_co2": float(emission["total_co2"][0]),
+            "penalty": float(emission["penalty"][0])
         }
     }
 
+def calculate_eu_fuel_compliance_batch(dieselConsumption, methanolConsumption):
+    """
+    calculate_eu_fuel_compliance for many iterations in one pass, e.g. to re-score a stored sweep.
+    
+    Args:
+        dieselConsumption: Diesel consumption per iteration in kg
+        methanolConsumption: Methanol consumption per iteration in kg
+        
+    Returns:
+        Dictionary of arrays: total_co2 (tCO2eq), penalty (EUR), ghg_intensity (gCO2eq/MJ),
+        compliance_balance (tCO2eq)
+    """
+    consumption_kg = np.column_stack([
+        np.asarray(dieselConsumption, dtype=np.float64),
+        np.asarray(methanolConsumption, dtype=np.float64),
+    ])
+    # Only fuel that was burnt counts, all of it within EU/EEA
+    consumption_tonnes = np.where(consumption_kg > 0, consumption_kg, 0.0) / 1000
+    results = get_emission_calculator().calculate_compliance_batch(list(EU_FUEL_TYPES.values()), consumption_tonnes)
+    return {
+        "total_co2": results['ghg_emission'],
+        "penalty": results['penalty'],
+        "ghg_intensity": results['ghg_intensity_actual'],
+        "compliance_balance": results['compliance_balance_tco2eq']
+    }
+
@@ -1 +1,630 @@
-from pymongo import M
\ No newline at end of file
+import atexit
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from flask import Blueprint, Flask, current_app, request, jsonify
+from flask_cors import CORS
+
+from omserver.ModelicaSequentialParaPaser import ModelicaSequentialParamParser
+from omserver.ModelicaParamTemplate import ModelicaParamTemplate
+from .DutyCycleLibrary import get_duty_cycle_library
+from .JobWorkspace import JobWorkspace
+from .OMCModelBuilder import OMCModelBuilder, get_model_builder, modelica_string, variable_filter
+from .OMCSessionPool import get_omc_pool, get_worker_pool
+from .ResultReader import RESULT_FORMATS, open_result, result_file_path
+from .SegmentedSimulation import (boundary_values, coarse_soc_starts, parareal_starts, segment_bounds,
+                                  stitch_segments)
+from .seq_model import (CUMULATIVE_COLUMNS, RESULT_COLUMNS, append_batch_result, batch_combinations, batch_windows,
+                        combination_details,
+                        extrapolate_windows, process_simmultion_result, slot_parameter_lists, start_batch_export,
+                        user_override_pairs)
+
+bp = Blueprint("seq_paralle_model", __name__, url_prefix="/seq_paralle_model")
+CORS(bp)
+
+# One process pool for the lifetime of the server; each worker keeps its own warm omc
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+# State handed from one time segment to the next by simulate_segmented
+SOC_PARAMETER = "battery_SOC_start"
+SOC_COLUMN = "battery1.SOC"
+
+# Per worker process, set up by _init_worker()
+_WORKER_APP = None
+_WORKER_BUILDER = None
+
+
+@bp.route("/simulate_batch", methods=["POST"])
+def simulate_batch():
+    """
+    Same request body as /seq_model/simulate_batch, but the combinations are
+    spread over the process pool. Every job works on its own copy of the
+    model in its own folder, results are collected in completion order.
+    """
+    data = request.get_json(force=True)
+
+    model_name  = data["model_name"]
+    start_time  = data["start_time"]
+    stop_time   = data["stop_time"]
+    number_of_slots = data["number_of_slots"]
+    try:
+        combos = batch_combinations(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    vessel_name = data["vesselName"]
+    task_name =  data["taskName"]
+    runtime_tables = bool(data.get("runtime_tables", False))
+    compile_once = bool(data.get("compile_once", False)) or runtime_tables
+    result_filter = variable_filter(RESULT_COLUMNS) if data.get("variable_filter", True) else None
+    result_format = data.get("result_format", "mat")
+    if result_format not in RESULT_FORMATS:
+        return jsonify({"status": "error", "error": f"result_format must be one of {', '.join(RESULT_FORMATS)}"}), 400
+    windowing = data.get("representative_windows")
+    if windowing:
+        try:
+            windowing = batch_windows(windowing)
+        except KeyError as e:
+            return jsonify({"status": "error", "error": f"Unknown duty cycle: {e}"}), 404
+        except (TypeError, ValueError) as e:
+            return jsonify({"status": "error", "error": str(e)}), 400
+        # Every window is the same build run with other times, so it is built once
+        compile_once = True
+
+    print(f"[seq_paralle_model] model={model_name}, combos={len(combos)}, "
+          f"start={start_time}, stop={stop_time}, windows={len(windowing['windows']) if windowing else 1}")
+
+    # Snapshot the model once; jobs copy the snapshot, never instance/<model>.mo
+    try:
+        workspace = JobWorkspace(current_app.instance_path, model_name, prefix="seq_parallel")
+    except FileNotFoundError:
+        return jsonify({"status": "error", "error": f"Model not found: {model_name}"}), 404
+    if runtime_tables and not ModelicaSequentialParamParser(model_name, [], [], model_dir=workspace.root).prepare_runtime_model():
+        workspace.cleanup()
+        return jsonify({"status": "error", "error": f"Could not prepare {model_name}.mo for runtime tables"}), 500
+
+    current_time = datetime.now().strftime("%d/%m/%Y %H:%M")
+    batch_record = {
+        "batch_sim_title" :  f"{current_time}_{model_name}_{vessel_name}_{task_name}",
+        "batch_sim_time_stamp" : f"{current_time}",
+        "vessel_name" : "fortuna_crane",
+        "batch_size" : int(len(combos)),
+        "batch_sim_res_collection"  : []
+    }
+
+    errors = []
+    workers = {}
+    started = time.perf_counter()
+    try:
+        executor = get_executor()
+        # Combinations are submitted as workers free up, so a lazily enumerated search space is never held in full
+        max_in_flight = 2 * (current_app.config.get("SEQ_PARALLEL_MAX_WORKERS") or os.cpu_count() or 2)
+        pending = {}
+        remaining = enumerate(combos)
+        done = 0
+        while True:
+            for idx, cfg in islice(remaining, max_in_flight - len(pending)):
+                pending[executor.submit(run_sequential_job, {
+                    "index": idx,
+                    "cfg": cfg,
+                    "model_name": model_name,
+                    "source_path": str(workspace.model_path),
+                    "job_dir": str(workspace.root / f"job_{idx}"),
+                    "start_time": start_time,
+                    "stop_time": stop_time,
+                    "number_of_slots": number_of_slots,
+                    "compile_once": compile_once,
+                    "runtime_tables": runtime_tables,
+                    "variable_filter": result_filter,
+                    "result_format": result_format,
+                    "windowing": windowing,
+                })] = idx
+            if not pending:
+                break
+
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                idx = pending.pop(fut)
+                done += 1
+                try:
+                    job = fut.result()
+                except Exception as e:
+                    print(f"[seq_paralle_model] ✗ error at {idx+1}: {e}")
+                    errors.append({"index": idx, "error": str(e)})
+                    continue
+
+                batch_record["batch_sim_res_collection"].append(job["result"])
+                stats = workers.setdefault(str(job["worker"]), {"jobs": 0, "busy_s": 0.0})
+                stats["jobs"] += 1
+                stats["busy_s"] += job["elapsed_s"]
+                print(f"[seq_paralle_model] [{done}/{len(combos)}] ✓ combination {idx+1} "
+                      f"on worker {job['worker']} in {job['elapsed_s']:.1f}s")
+    finally:
+        workspace.cleanup()
+
+    elapsed = time.perf_counter() - started
+    for stats in workers.values():
+        stats["busy_s"] = round(stats["busy_s"], 2)
+        stats["jobs_per_min"] = round(60 * stats["jobs"] / stats["busy_s"], 2) if stats["busy_s"] else 0.0
+
+    batch_id = None
+    try:
+        batch_id = append_batch_result(batch_record)
+        current_app.logger.info(
+            "Saved batch: %s (size=%d)", batch_record["batch_sim_title"], len(batch_record["batch_sim_res_collection"])
+        )
+    except Exception as e:
+        current_app.logger.exception("[seq_paralle_model_end] ERROR: %s", e)
+
+    # Written in the background, the pool can take the next batch meanwhile
+    export_job = start_batch_export(batch_id)
+
+    ok = len(batch_record["batch_sim_res_collection"])
+    return jsonify({
+        "status": "completed" if not errors else "completed_with_errors",
+        "total": len(combos),
+        "ok": ok,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_per_min": round(60 * ok / elapsed, 2) if elapsed else 0.0,
+        "workers": workers,
+        "export_job": export_job,
+    })
+
+
+@bp.route("/simulate_segmented", methods=["POST"])
+def simulate_segmented():
+    """
+    Same request body as /seq_model/simulate_batch, but each combination's
+    mission is split into time segments that run at the same time on the
+    process pool. Segments after the first start from an estimated battery
+    SOC; Parareal corrections re-run the segments whose start SOC is off by
+    more than soc_tolerance until the boundaries agree. The segments'
+    results are stitched into one continuous result per combination.
+    """
+    data = request.get_json(force=True)
+
+    model_name  = data["model_name"]
+    start_time  = data["start_time"]
+    stop_time   = data["stop_time"]
+    number_of_slots = data["number_of_slots"]
+    try:
+        combos = batch_combinations(data)
+    except ValueError as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    vessel_name = data["vesselName"]
+    task_name =  data["taskName"]
+    runtime_tables = bool(data.get("runtime_tables", False))
+    # Every segment run is the same build with other times and SOC, so compile once by default
+    compile_once = bool(data.get("compile_once", True)) or runtime_tables
+    result_filter = variable_filter(RESULT_COLUMNS) if data.get("variable_filter", True) else None
+    result_format = data.get("result_format", "mat")
+    if result_format not in RESULT_FORMATS:
+        return jsonify({"status": "error", "error": f"result_format must be one of {', '.join(RESULT_FORMATS)}"}), 400
+    try:
+        segments = int(data.get("segments") or current_app.config.get("SEQ_PARALLEL_MAX_WORKERS") or os.cpu_count() or 2)
+        bounds = segment_bounds(start_time, stop_time, segments)
+        soc_tolerance = float(data.get("soc_tolerance", 1e-3))
+        # After as many corrections as segments every boundary is exact
+        max_iterations = int(data.get("max_iterations", segments))
+        soc_start = None if data.get("soc_start") is None else float(data["soc_start"])
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "error": str(e)}), 400
+    # Duty cycle the first pass estimates the segments' start SOC from (default: the library table the model reads)
+    duty_cycle_id = data.get("duty_cycle_id")
+    if duty_cycle_id is not None and get_duty_cycle_library().get(duty_cycle_id) is None:
+        return jsonify({"status": "error", "error": f"Unknown duty cycle: {duty_cycle_id}"}), 404
+
+    print(f"[seq_paralle_model] segmented model={model_name}, combos={len(combos)}, "
+          f"start={start_time}, stop={stop_time}, segments={segments}")
+
+    try:
+        workspace = JobWorkspace(current_app.instance_path, model_name, prefix="seq_segmented")
+    except FileNotFoundError:
+        return jsonify({"status": "error", "error": f"Model not found: {model_name}"}), 404
+    if runtime_tables and not ModelicaSequentialParamParser(model_name, [], [], model_dir=workspace.root).prepare_runtime_model():
+        workspace.cleanup()
+        return jsonify({"status": "error", "error": f"Could not prepare {model_name}.mo for runtime tables"}), 500
+    if soc_start is None:
+        soc_start = _parameter_default(workspace.model_path, SOC_PARAMETER)
+
+    current_time = datetime.now().strftime("%d/%m/%Y %H:%M")
+    batch_record = {
+        "batch_sim_title" :  f"{current_time}_{model_name}_{vessel_name}_{task_name}",
+        "batch_sim_time_stamp" : f"{current_time}",
+        "vessel_name" : "fortuna_crane",
+        "batch_size" : int(len(combos)),
+        "batch_sim_res_collection"  : []
+    }
+
+    errors = []
+    runs = []
+    started = time.perf_counter()
+    try:
+        executor = get_executor()
+        for idx, cfg in enumerate(combos):
+            combination_started = time.perf_counter()
+            combination_job = {
+                "cfg": cfg,
+                "model_name": model_name,
+                "source_path": str(workspace.model_path),
+                "start_time": start_time,
+                "stop_time": stop_time,
+                "number_of_slots": number_of_slots,
+                "compile_once": compile_once,
+                "runtime_tables": runtime_tables,
+                "variable_filter": result_filter,
+                "result_format": result_format,
+            }
+            segment_data = [None] * segments
+            overrides = coarse_segment_overrides(cfg, bounds, _duty_cycle_table(cfg, duty_cycle_id), soc_start,
+                                                 number_of_slots)
+            seeded = any(overrides)
+            pending = list(range(segments))
+            iterations = segment_runs = 0
+            busy = 0.0
+            try:
+                if compile_once:
+                    # Build here first, so the segments find it in the cache instead of all building it
+                    prebuild_job(dict(combination_job, job_dir=str(workspace.root / f"prebuild_{idx}")))
+                while True:
+                    iterations += 1
+                    futures = {
+                        executor.submit(run_segment_job, dict(
+                            combination_job,
+                            index=k,
+                            job_dir=str(workspace.root / f"job_{idx}_{k}_{iterations}"),
+                            segment=bounds[k],
+                            overrides=overrides[k],
+                        )): k
+                        for k in pending
+                    }
+                    for fut in as_completed(futures):
+                        job = fut.result()
+                        segment_data[job["index"]] = job["data"]
+                        busy += job["elapsed_s"]
+                    segment_runs += len(futures)
+
+                    # SOC each segment was simulated from and ended at
+                    if any(SOC_COLUMN not in d for d in segment_data):
+                        raise ValueError(f"{SOC_COLUMN} is not in the results, segments cannot hand over the SOC")
+                    starts, ends = np.array([boundary_values(d[SOC_COLUMN]) for d in segment_data]).T
+                    corrected = parareal_starts(starts, ends)
+                    pending = [k for k in range(1, segments) if abs(corrected[k] - starts[k]) > soc_tolerance]
+                    print(f"[seq_paralle_model] combination {idx+1} iteration {iterations}: "
+                          f"{len(pending)} segment(s) to correct")
+                    if not pending or iterations >= max_iterations:
+                        break
+                    for k in pending:
+                        overrides[k] = {SOC_PARAMETER: repr(float(corrected[k]))}
+
+                stitched = stitch_segments(segment_data, CUMULATIVE_COLUMNS)
+                result = process_simmultion_result(
+                    idx,
+                    total_cost="cost_placeholder",
+                    max_powertrain_gen="max_potential_gen_placeholder",
+                    model_name=model_name,
+                    result_data=stitched,
+                    **combination_details(cfg)
+                )
+                if not isinstance(result, dict):
+                    raise RuntimeError(result[0].get_json().get("error", "result processing failed"))
+            except Exception as e:
+                print(f"[seq_paralle_model] ✗ error at {idx+1}: {e}")
+                errors.append({"index": idx, "error": str(e)})
+                continue
+
+            run = {
+                "index": idx,
+                "segments": segments,
+                "iterations": iterations,
+                "segment_runs": segment_runs,
+                "converged": not pending,
+                "coarse_soc_seed": seeded,
+                # SOC step left at the worst segment boundary
+                "max_boundary_soc_error": float(np.max(np.abs(ends[:-1] - starts[1:]))) if segments > 1 else 0.0,
+                "elapsed_s": round(time.perf_counter() - combination_started, 2),
+                "busy_s": round(busy, 2),
+            }
+            result["segmented_run"] = run
+            batch_record["batch_sim_res_collection"].append(result)
+            runs.append(run)
+    finally:
+        workspace.cleanup()
+
+    batch_id = None
+    try:
+        batch_id = append_batch_result(batch_record)
+        current_app.logger.info(
+            "Saved batch: %s (size=%d)", batch_record["batch_sim_title"], len(batch_record["batch_sim_res_collection"])
+        )
+    except Exception as e:
+        current_app.logger.exception("[seq_paralle_model_segmented_end] ERROR: %s", e)
+
+    export_job = start_batch_export(batch_id)
+
+    return jsonify({
+        "status": "completed" if not errors else "completed_with_errors",
+        "total": len(combos),
+        "ok": len(runs),
+        "errors": errors,
+        "runs": runs,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "export_job": export_job,
+    })
+
+
+def coarse_segment_overrides(cfg, bounds, table, soc_start, number_of_slots):
+    """
+    First-pass overrides of a combination's segments: every segment after the
+    first starts from the SOC estimated from the duty cycle energy
+    (coarse_soc_starts) instead of the model's initial SOC.
+
+    Args:
+        cfg: The combination; battery_Capacity, battery_P_max, generator_P_rat_i
+             and geni_is_on are read from its modelica_parameters
+        bounds: (start, stop) of every segment
+        table: (N, 2) duty cycle rows the model reads, or None
+        soc_start: Initial SOC of the model (the combination's own battery_SOC_start wins), or None
+        number_of_slots: Number of generator slots
+
+    Returns:
+        list: {parameter: value} per segment; all empty without a battery, duty cycle or initial SOC
+    """
+    empty = [{} for _ in bounds]
+    parameters = {p.get("param"): p.get("value") for p in cfg.get("modelica_parameters", [])}
+    try:
+        soc_start = float(parameters.get(SOC_PARAMETER, soc_start))
+        capacity = float(parameters["battery_Capacity"])
+        battery_power = float(parameters["battery_P_max"])
+        generator_power = sum(float(parameters.get(f"generator_P_rat_{i}", 0))
+                              for i in range(1, number_of_slots + 1)
+                              if str(parameters.get(f"gen{i}_is_on")).lower() == "true")
+    except (KeyError, TypeError, ValueError):
+        return empty
+    # Without a battery the client still sets battery_P_max to 0.1 W
+    if table is None or capacity <= 0 or battery_power <= 1:
+        return empty
+    starts = coarse_soc_starts(table, bounds, soc_start, capacity, battery_power, generator_power)
+    return [{}] + [{SOC_PARAMETER: repr(float(soc))} for soc in starts[1:]]
+
+
+def _duty_cycle_table(cfg, duty_cycle_id=None):
+    """Rows of the library duty cycle with the given id, or of the library table file the combination's model reads."""
+    if duty_cycle_id is None:
+        file_name = next((p.get("value") for p in cfg.get("modelica_parameters", [])
+                          if p.get("param") == "combiTable1Ds.fileName"), None)
+        if not file_name:
+            return None
+        # Library table files are named by the duty cycle id
+        duty_cycle_id = Path(str(file_name)).stem
+    try:
+        return get_duty_cycle_library().load(duty_cycle_id)
+    except KeyError:
+        return None
+
+
+def _parameter_default(model_path, name):
+    """Literal default of a top-level Real parameter in the model source, or None."""
+    text = Path(model_path).read_text(encoding="utf-8")
+    m = re.search(rf"\bparameter\s+Real\s+{re.escape(name)}\s*=\s*([-+0-9.eE]+)\s*;", text)
+    try:
+        return float(m.group(1)) if m else None
+    except ValueError:
+        return None
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """The shared process pool, created on first use (or again after a worker crash broke it)."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None or getattr(_EXECUTOR, "_broken", False):
+            max_workers = current_app.config.get("SEQ_PARALLEL_MAX_WORKERS") or os.cpu_count() or 2
+            if os.name == "nt":
+                max_workers = min(max_workers, 61)  # ProcessPoolExecutor limit on Windows
+            cache = current_app.extensions["model_builder"].cache
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(current_app.instance_path, str(cache.root), cache.max_bytes),
+            )
+            print(f"[seq_paralle_model] started process pool with {max_workers} workers")
+        return _EXECUTOR
+
+
+@atexit.register
+def _shutdown_executor():
+    # Registered once; shuts down whichever pool is current at exit
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_worker(instance_path, cache_root, cache_max_bytes):
+    global _WORKER_APP, _WORKER_BUILDER
+    # A bare app so helpers that read current_app.instance_path work in the worker
+    _WORKER_APP = Flask("omserver", instance_path=instance_path)
+    _WORKER_BUILDER = OMCModelBuilder(cache_root, cache_max_bytes)
+
+
+def run_sequential_job(job: dict) -> dict:
+    """
+    Run one combination inside a pool worker.
+
+    Args:
+        job: index, cfg, model_name, source_path, job_dir, start/stop time,
+             number_of_slots, compile_once, runtime_tables, variable_filter,
+             result_format and windowing (representative windows, or None
+             for the whole mission)
+
+    Returns:
+        dict: index, processed result, worker pid and elapsed seconds
+    """
+    started = time.perf_counter()
+    idx = job["index"]
+    cfg = job["cfg"]
+    model_name = job["model_name"]
+    job_dir, model_path, override_pairs = _prepare_job(job)
+
+    windowing = job.get("windowing")
+    if windowing:
+        windows = [(w["start_time"], w["stop_time"]) for w in windowing["windows"]]
+    else:
+        windows = [(job["start_time"], job["stop_time"])]
+
+    try:
+        window_results = []
+        for window_start, window_stop in windows:
+            result_path = _simulate_job(job, job_dir, model_path, override_pairs, window_start, window_stop)
+            with _WORKER_APP.app_context():
+                result = process_simmultion_result(
+                    idx,
+                    total_cost="cost_placeholder",
+                    max_powertrain_gen="max_potential_gen_placeholder",
+                    model_name=model_name,
+                    result_path=result_path,
+                    **combination_details(cfg)
+                )
+                if not isinstance(result, dict):
+                    # process_simmultion_result answers errors with a (response, status) tuple
+                    raise RuntimeError(result[0].get_json().get("error", "result processing failed"))
+            # The next window must not read this window's result
+            result_path.unlink(missing_ok=True)
+            window_results.append(result)
+        if windowing:
+            result = extrapolate_windows(window_results, windowing)
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+    return {
+        "index": idx,
+        "result": result,
+        "worker": os.getpid(),
+        "elapsed_s": time.perf_counter() - started,
+    }
+
+
+def run_segment_job(job: dict) -> dict:
+    """
+    Run one time segment of a combination inside a pool worker.
+
+    Args:
+        job: As for run_sequential_job, plus segment ((start, stop) of the
+             segment) and overrides ({parameter: value} replacing the
+             combination's own, e.g. the segment's initial SOC)
+
+    Returns:
+        dict: index, the segment's result columns ({column: np.ndarray}), worker pid and elapsed seconds
+    """
+    started = time.perf_counter()
+    job_dir, model_path, override_pairs = _prepare_job(job)
+    try:
+        result_path = _simulate_job(job, job_dir, model_path, override_pairs, *job["segment"])
+        with open_result(result_path) as reader:
+            # Copied out of the memory map, the folder is removed below
+            data = {column: np.array(values, dtype=np.float64) for column, values in reader.read(RESULT_COLUMNS).items()}
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+    return {
+        "index": job["index"],
+        "data": data,
+        "worker": os.getpid(),
+        "elapsed_s": time.perf_counter() - started,
+    }
+
+
+def prebuild_job(job: dict):
+    """
+    Build a job's model in the server process with the compile_once build
+    options, so the pool workers that run it find the build in the cache.
+
+    Args:
+        job: As for run_sequential_job
+    """
+    job_dir, model_path, _ = _prepare_job(job)
+    try:
+        with get_omc_pool().session(model_path) as omc:
+            get_model_builder().build(
+                omc, model_path, job["model_name"],
+                start_time=job["start_time"],
+                stop_time=job["stop_time"],
+                number_of_intervals=32643,
+                tolerance=2.6e-6,
+            )
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
+
+
+def _prepare_job(job):
+    """The job's own folder and model copy with the combination applied, and its override pairs."""
+    cfg = job["cfg"]
+    model_name = job["model_name"]
+
+    # Own folder and model copy, so parser edits and result files never collide
+    job_dir = Path(job["job_dir"])
+    job_dir.mkdir(parents=True, exist_ok=True)
+    model_path = job_dir / f"{model_name}.mo"
+    shutil.copyfile(job["source_path"], model_path)
+
+    fcc_list, bsfc_list, gen_is_on_list = slot_parameter_lists(cfg, job["number_of_slots"])
+    parser = ModelicaSequentialParamParser(model_name, bsfc_list, fcc_list, gen_is_on_list, model_dir=job_dir)
+    override_pairs = user_override_pairs(cfg)
+    template = ModelicaParamTemplate.from_file(model_path)
+    if job["runtime_tables"]:
+        parser.update_runtime_model(template)
+        override_pairs = parser.runtime_overrides() + override_pairs
+    else:
+        parser.update_from_template(template)
+
+    overrides = job.get("overrides") or {}
+    if overrides:
+        override_pairs = [pair for pair in override_pairs if pair.split("=", 1)[0] not in overrides]
+        override_pairs += [f"{name}={value}" for name, value in overrides.items()]
+    return job_dir, model_path, override_pairs
+
+
+def _simulate_job(job, job_dir, model_path, override_pairs, start_time, stop_time):
+    """Simulate the job's model from start_time to stop_time; returns the result file."""
+    model_name = job["model_name"]
+    with get_worker_pool().session(model_path) as omc:
+        if job["compile_once"]:
+            compiled = _WORKER_BUILDER.build(
+                omc, model_path, model_name,
+                start_time=job["start_time"],
+                stop_time=job["stop_time"],
+                number_of_intervals=32643,
+                tolerance=2.6e-6,
+            )
+            # A window or segment is the same build run over part of the mission
+            if (start_time, stop_time) != (job["start_time"], job["stop_time"]):
+                override_pairs = override_pairs + [f"startTime={start_time}", f"stopTime={stop_time}"]
+            return compiled.run(job_dir, override_pairs, variable_filter=job["variable_filter"],
+                                output_format=job["result_format"])
+
+        omc.load_file(model_path)
+        ov = " -override " + ",".join(override_pairs) if override_pairs else ""
+        filter_option = f'variableFilter={modelica_string(job["variable_filter"])}, ' if job["variable_filter"] else ""
+        # simulate() builds in omc's working directory; keep that inside the job folder
+        with omc.working_directory(job_dir):
+            omc.request(
+                f'simulate({model_name}, '
+                f'outputFormat="{job["result_format"]}", '
+                f'startTime={start_time}, '
+                f'stopTime={stop_time}, '
+                f'numberOfIntervals=32643, '
+                f'tolerance=2.6e-6, '
+                f'{filter_option}'
+                f'simflags="-outputPath {job_dir.as_posix()}{ov}")'
+            )
+        result_path = result_file_path(job_dir, model_name, job["result_format"])
+        if not result_path.exists():
+            raise FileNotFoundError(f"Simulation did not produce a result file: {omc.request('getErrorString()')}")
+        return result_path
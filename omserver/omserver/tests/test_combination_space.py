@@ -0,0 +1,78 @@
+from itertools import islice, product
+
+import pytest
+
+from omserver.CombinationSpace import CombinationSpace, modelica_parameters
+
+
+def _engine(i, p_max, mass, volume, fuel="Diesel"):
+    return {"engine_name": f"E{i}", "engine_p_max": p_max, "engine_p_min": p_max / 10, "engine_mass": mass,
+            "engine_volume": volume, "engine_bsfc": "{{0.5, 200}}", "engine_fcc": "{{0, 0}}",
+            "engine_fuel_type": fuel, "engine_db_index": f"ENG{i}"}
+
+
+ENGINES = [_engine(0, 500, 3000, 20), _engine(1, 900, 8000, 40, "Methanol"), _engine(2, 300.5, 2000, 15)]
+BATTERIES = [{"battery_name": "B0", "battery_capcity": 100, "battery_max_charge_power": 50000.0,
+              "battery_db_index": "BAT0"}]
+SPEC = {"engines": ENGINES, "batteries": BATTERIES, "battery_counts": [0, 2], "opt_lower": [0.05, 0.1],
+        "opt_upper": [0.001], "volume_limit": 75, "mass_limit": 15000, "peak_power": 850,
+        "duty_cycle_path": "C:\\cycles\\a.mat"}
+
+
+def _client_combinations(spec, slots):
+    # buildCombinations -> markUnrealisticCombos -> filterIncapbleSystem, as in SimulateSectionUtil.jsx
+    options = [(e, lo, hi) for e in spec["engines"] for lo in spec["opt_lower"] for hi in spec["opt_upper"]]
+    combos = []
+    for k in range(1, slots + 1):
+        for sequence in product(options, repeat=k):
+            engines = [e for e, _, _ in sequence]
+            if (sum(e["engine_volume"] for e in engines) > spec["volume_limit"]
+                    or sum(e["engine_mass"] for e in engines) > spec["mass_limit"]
+                    or not sum(e["engine_p_max"] for e in engines) > spec["peak_power"]):
+                continue
+            for battery, count in product(spec["batteries"], spec["battery_counts"]):
+                config = {}
+                for i in range(slots):
+                    engine, lo, hi = sequence[i] if i < k else (None, None, None)
+                    config[f"slot {i+1}"], config[f"slot {i+1}_upper"], config[f"slot {i+1}_lower"] = engine, hi, lo
+                combos.append({**config, "battery": battery, "battery_count": count, "check": True})
+    return combos
+
+
+def test_enumeration_matches_the_client():
+    space = CombinationSpace(SPEC, 3, chunk_size=7)
+    combos = list(space)
+    expected = _client_combinations(SPEC, 3)
+    assert [c["instance"]["config"] for c in combos] == expected
+    stats = space.stats()
+    assert len(space) == stats["feasible"] == len(expected)
+    assert stats["total"] == (6 + 6 ** 2 + 6 ** 3) * 2 and stats["pruned"] == stats["total"] - len(expected)
+
+
+def test_modelica_parameters():
+    config = {"slot 1": ENGINES[2], "slot 1_upper": 0.001, "slot 1_lower": 0.05, "slot 2": None,
+              "battery": BATTERIES[0], "battery_count": 2}
+    parameters = {p["param"]: p["value"] for p in modelica_parameters(config, 2, "C:\\cycles\\a.mat")}
+    assert parameters["gen1_is_on"] == "true" and parameters["gen2_is_on"] == "false"
+    assert parameters["generator_P_rat_1"] == "300500" and parameters["generator_P_idle_1"] == "30050"
+    assert parameters["generator_FLHV_1"] == "45.9e6" and parameters["generator_FcarbonContent_1"] == "0.86"
+    assert parameters["mCtrl_user_defined_BSFC_percentage_1"] == "0.001"
+    assert parameters["mCtrl_user_defined_BSFC_percentage_1_lower"] == "0.05"
+    assert parameters["combiTable1Ds.fileName"] == "C:/cycles/a.mat"
+    assert parameters["battery_P_max"] == "100000" and parameters["battery_Capacity"] == "720000000"
+
+
+def test_large_space_is_counted_without_building_combinations():
+    engines = [_engine(i, 200 + 50 * i, 1000 + 200 * i, 10 + i) for i in range(40)]
+    space = CombinationSpace({**SPEC, "engines": engines, "opt_lower": [0.05], "battery_counts": [0, 1, 5, 10]}, 3)
+    stats = space.stats()
+    assert stats["total"] == (40 + 40 ** 2 + 40 ** 3) * 4 and 0 < stats["feasible"] < stats["total"]
+    first = next(iter(space))["instance"]["config"]
+    assert first["slot 1"]["engine_p_max"] + (first["slot 2"] or {}).get("engine_p_max", 0) > 850
+    assert len(list(islice(space, 10))) == 10
+
+
+def test_unknown_ids():
+    assert [e["engine_db_index"] for e in CombinationSpace({**SPEC, "engine_ids": ["ENG2"]}, 1).options[0][:1]] == ["ENG2"]
+    with pytest.raises(ValueError):
+        CombinationSpace({**SPEC, "battery_ids": ["nope"]}, 1)
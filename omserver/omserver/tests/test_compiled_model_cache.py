@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+from omserver.OMCModelBuilder import CompiledModelCache
+
+
+def _build(cache, digest, size=1000, model_name="Vessel"):
+    staging = cache.staging_dir(digest)
+    executable = staging / model_name
+    executable.write_bytes(b"\0" * size)
+    return staging, executable
+
+
+def _commit(cache, digest, size=1000, mtime=None):
+    staging, executable = _build(cache, digest, size)
+    compiled = cache.commit(digest, staging, "Vessel", executable)
+    if mtime is not None:
+        os.utime(cache.root / digest / cache.META_FILE, (mtime, mtime))
+    return compiled
+
+
+def test_evicts_least_recently_used_within_max_bytes(tmp_path):
+    cache = CompiledModelCache(tmp_path)
+    _commit(cache, "a", mtime=100)
+    _commit(cache, "b", mtime=200)
+    _commit(cache, "c", mtime=300)
+
+    # Room for two entries (plus their meta files): the oldest goes, the kept one stays although it is older
+    cache.max_bytes = 2 * 1000 + 1000
+    cache.evict(keep="a")
+    assert cache.get("a") is not None and cache.get("b") is None and cache.get("c") is not None
+    assert not (tmp_path / "b").exists()
+
+    cache.max_bytes = None
+    _commit(cache, "d")
+    assert all(cache.get(d) is not None for d in ("a", "c", "d"))
+
+
+def test_commit_losing_the_race_returns_the_existing_entry(tmp_path):
+    cache = CompiledModelCache(tmp_path)
+    first = _commit(cache, "same", size=10)
+
+    staging, executable = _build(cache, "same", size=20)
+    second = cache.commit("same", staging, "Vessel", executable)
+    assert second.build_dir == first.build_dir and second.executable.stat().st_size == 10
+    assert not staging.exists()
+
+
+def test_half_written_builds_are_never_returned(tmp_path):
+    cache = CompiledModelCache(tmp_path)
+    staging, _ = _build(cache, "pending")
+    (staging / cache.META_FILE).write_text('{"model_name": "Vessel", "executable": "Vessel"}', encoding="utf-8")
+    assert cache.get("pending") is None
+
+    # An entry without its meta file, or whose executable is missing, is not a build either
+    (tmp_path / "no_meta").mkdir()
+    (tmp_path / "no_meta" / "Vessel").write_bytes(b"\0")
+    assert cache.get("no_meta") is None
+    compiled = _commit(cache, "gone")
+    compiled.executable.unlink()
+    assert cache.get("gone") is None
+
+    # Staging folders of a crashed build are cleared once they are old enough
+    cache.clear_staging(older_than_s=3600)
+    assert staging.exists()
+    os.utime(staging, (0, 0))
+    cache.clear_staging(older_than_s=3600)
+    assert not staging.exists()
+
+
+def test_build_lock_serializes_builders(tmp_path):
+    # Separate handles conflict like separate processes do, so threads are enough here
+    cache = CompiledModelCache(tmp_path)
+    events = []
+
+    def builder(name):
+        with cache.build_lock("digest"):
+            events.append(f"{name} start")
+            time.sleep(0.05)
+            events.append(f"{name} end")
+
+    threads = [threading.Thread(target=builder, args=(name,)) for name in "ab"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [e.split()[1] for e in events] == ["start", "end", "start", "end"]
+    assert events[0].split()[0] == events[1].split()[0]
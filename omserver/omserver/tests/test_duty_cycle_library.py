@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from omserver.DutyCycleLibrary import DutyCycleLibrary, parse_duty_cycle, simplify_duty_cycle
+
+
+def _profile(n):
+    t = np.arange(n) * 60.0
+    p = np.round(100 + 90 * np.sin(t / 3000), 6)
+    rows = "\n".join(f"{a:g}\t{b!r}" for a, b in zip(t.tolist(), p.tolist()))
+    return f"#1\ndouble dutyCycle({n},2)\n{rows}\n".encode("utf-8"), t, p
+
+
+def test_parse_skips_headers_and_malformed_rows():
+    table, name = parse_duty_cycle("#1\ndouble load(4,2)\n0 1.5\n60 2.5 extra\nbad row\n120\n180 -1\n")
+    assert name == "load"
+    assert table.tolist() == [[0, 1.5], [60, 2.5], [180, -1]]
+
+
+def test_library_parses_once_and_writes_tables(tmp_path):
+    content, t, p = _profile(40000)
+    library = DutyCycleLibrary(tmp_path)
+    entry = library.add(content, "survey.txt")
+    assert not entry["cached"] and entry["points"] == 40000
+    assert entry["start_time"] == 0 and entry["end_time"] == t[-1] and entry["max_power"] == p.max()
+    assert np.isclose(entry["energy_kwh"], np.trapezoid(p, t) / 3600)
+    assert entry["max_ramp_up"] > 0 and entry["max_ramp_down"] > 0
+
+    # Known content, also from a new process, is not parsed again
+    again = DutyCycleLibrary(tmp_path).add(content, "copy.txt")
+    assert again["cached"] and again["id"] == entry["id"] and again["name"] == "survey.txt"
+    assert np.array_equal(DutyCycleLibrary(tmp_path).load(entry["id"]), np.column_stack([t, p]))
+
+    text = library.table_path(entry["id"], "txt")
+    table, name = parse_duty_cycle(text.read_text())
+    assert name == "dutyCycle" and np.array_equal(table, np.column_stack([t, p]))
+    mat = library.table_path(entry["id"], "mat")
+    raw = mat.read_bytes()
+    assert raw[20:30] == b"dutyCycle\0"
+    assert np.array_equal(np.frombuffer(raw[30:], "<f8").reshape(2, -1).T, table)
+    assert library.table_path(entry["id"], "mat").stat().st_mtime_ns == mat.stat().st_mtime_ns
+    assert [e["id"] for e in library.list()] == [entry["id"]]
+    assert library.get("../etc") is None
+
+
+def test_simplify_keeps_error_bounds(tmp_path):
+    content, t, p = _profile(40000)
+    library = DutyCycleLibrary(tmp_path)
+    source = library.add(content, "survey.txt")
+
+    entry = library.simplify(source["id"], tolerance_kw=0.5)
+    report = entry["simplification"]
+    assert not entry["cached"] and entry["source_id"] == source["id"]
+    assert report["points"] == entry["points"] < 40000 * 0.1
+    assert report["max_power_error_kw"] <= 0.5 and report["peak_error_kw"] == 0
+    table = library.load(entry["id"])
+    assert table[0, 0] == t[0] and table[-1, 0] == t[-1] and table[:, 1].max() == p.max()
+    assert np.abs(np.interp(t, table[:, 0], table[:, 1]) - p).max() == report["max_power_error_kw"]
+    assert library.simplify(source["id"], 0.5)["cached"]
+
+    tight = library.simplify(source["id"], tolerance_kw=20, energy_tolerance=1e-5)["simplification"]
+    assert tight["energy_error_rel"] <= 1e-5 and tight["applied_tolerance_kw"] < 20
+
+
+def test_simplify_keeps_steps_and_drops_straight_lines():
+    table = np.array([[0, 10], [10, 20], [20, 30], [20, 50], [30, 50], [40, 50], [50, 0]], dtype=float)
+    simplified, report = simplify_duty_cycle(table, tolerance_kw=0)
+    assert simplified.tolist() == [[0, 10], [20, 30], [20, 50], [40, 50], [50, 0]]
+    assert report["max_power_error_kw"] == 0 and report["energy_error_kwh"] == 0
+    with pytest.raises(ValueError):
+        simplify_duty_cycle(table)
@@ -0,0 +1,74 @@
+import numpy as np
+
+from omserver.EUEmissionCalculator import get_emission_calculator
+
+FUELS = ['MDO MGO (Grades DMX to DMB)', 'e-methanol E10', 'LNG / LNG Otto (Dual Fuel Medium Speed)']
+FINAL_KEYS = ['energy_use_in_scope', 'wtt_ghg_intensity_aggregate', 'ttw_ghg_intensity_aggregate',
+              'ghg_intensity_actual', 'compliance_balance_gco2eq', 'compliance_balance_tco2eq',
+              'penalty', 'ghg_emission']
+
+
+def test_batch_matches_phase2_exactly():
+    calculator = get_emission_calculator()
+    rng = np.random.default_rng(3)
+    within = rng.uniform(0, 40, (50, len(FUELS)))
+    in_out = rng.uniform(0, 10, (50, len(FUELS)))
+    # Methanol only rows have a surplus (no penalty), diesel only rows a deficit
+    within[:10, [0, 2]] = in_out[:10, [0, 2]] = 0.0
+    within[10:20, 1:] = in_out[10:20, 1:] = 0.0
+    batch = calculator.calculate_compliance_batch(FUELS, within, in_out)
+
+    for n in range(len(within)):
+        fuel_data = [{'fuel_type': fuel, 'fuel_consumption_within_eu': float(within[n, i]),
+                      'fuel_consumption_in_out_eu': float(in_out[n, i])} for i, fuel in enumerate(FUELS)]
+        final = calculator.calculate_emissions_phase2(fuel_data)['final_results']
+        for key in FINAL_KEYS:
+            assert batch[key][n] == final[key], (n, key)
+    assert (batch['penalty'][:10] == 0).all() and (batch['penalty'][10:20] > 0).all()
+
+
+def test_batch_without_fuel_has_no_emission_or_penalty():
+    batch = get_emission_calculator().calculate_compliance_batch(FUELS[:2], np.zeros((3, 2)))
+    assert batch['ghg_emission'].tolist() == [0.0] * 3
+    assert batch['penalty'].tolist() == [0.0] * 3
+
+
+def test_scenarios_cover_years_and_scope_splits():
+    calculator = get_emission_calculator()
+    rng = np.random.default_rng(5)
+    consumption = rng.uniform(0, 30, (40, 2))
+    fuels = FUELS[:2]
+    years = [2025, 2029, 2030, 2050]
+    scenarios = calculator.calculate_compliance_scenarios(fuels, consumption, years, [0.0, 0.5])
+
+    assert scenarios['penalty'].shape == (2, 4, 40)
+    assert scenarios['ghg_intensity_target'].tolist() == [calculator.ghg_intensity_target(y) for y in years]
+    assert scenarios['ghg_intensity_target'][0] == scenarios['ghg_intensity_target'][1]
+    for y, year in enumerate(years):
+        batch = calculator.calculate_compliance_batch(fuels, consumption, target_year=year)
+        assert (scenarios['penalty'][0, y] == batch['penalty']).all()
+        assert (scenarios['compliance_balance_tco2eq'][0, y] == batch['compliance_balance_tco2eq']).all()
+        split = calculator.calculate_compliance_batch(fuels, consumption * 0.5, consumption * 0.5, target_year=year)
+        assert (scenarios['penalty'][1, y] == split['penalty']).all()
+    # Stricter targets never lower a penalty
+    assert (np.diff(scenarios['penalty'], axis=1) >= 0).all()
+
+
+def test_scenarios_from_stored_fuel_consumption(tmp_path):
+    from omserver.ComplianceScenarios import compliance_scenarios
+    from omserver.ResultStore import ResultStore
+
+    from .test_result_store import _batch
+
+    record = _batch("fuel", 3)
+    for i, it in enumerate(record["batch_sim_res_collection"]):
+        it["diesel_usage (Ton)"] = 2.0 * i
+        it["meth_usage (Ton)"] = 1.0
+    store = ResultStore(tmp_path)
+    batch_id = store.append_batch(record)
+    scenarios = compliance_scenarios(store.iterations(batch_id), [2025, 2050])
+
+    batch = get_emission_calculator().calculate_compliance_batch(
+        FUELS[:2], [[0.0, 1.0], [2.0, 1.0], [4.0, 1.0]])
+    assert scenarios['penalty'][0, 0].tolist() == batch['penalty'].tolist()
+    assert scenarios['penalty'][0, 0, 1] == 0 and scenarios['penalty'][0, 1, 1] > 0
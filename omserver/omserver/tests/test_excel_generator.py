@@ -0,0 +1,33 @@
+import numpy as np
+import openpyxl
+from flask import Flask
+
+from omserver.ExcelGenerator import ExcelGenerator
+
+
+def test_export_streams_sheets_with_derived_columns(tmp_path):
+    iterations = [{
+        "sim_name": f"Slot1: Fortuna Crane | {i}",
+        "iteration_id": i,
+        "Total Energy Wasted (kWh)": 20.0,
+        "Battery Specs": [100, 5000, 3000, 0.5, 200],
+        "time (h)": np.arange(4.0),
+        "power_demand (KW)": [10.0, 20.0, 30.0, 40.0],
+        "gen_1_power (KW)": [1.0, 2.0],
+        "Wasted Power (kW)": np.array([0.0, 6.0, -2.0, -8.0]),
+    } for i in range(2)]
+    batch = {"batch_sim_title": "my batch", "batch_size": 2}
+    app = Flask(__name__, instance_path=str(tmp_path))
+    with app.app_context():
+        # Iterations may come from a generator, one pass per call
+        filename = ExcelGenerator(batch, iterations=lambda: iter(iterations)).export_batch_to_excel()
+
+    wb = openpyxl.load_workbook(tmp_path / filename)
+    assert wb.sheetnames == ["Batch_Summary", "Iterations_Overview", "Iter_0_Fortuna", "Iter_1_Fortuna"]
+    assert ["Actual Iterations", 2] in [list(r) for r in wb["Batch_Summary"].iter_rows(values_only=True)]
+    rows = [list(r) for r in wb["Iter_1_Fortuna"].iter_rows(values_only=True)]
+    data = rows[rows.index(["Time Series Data"] + [None] * 18) + 3:]
+    assert [r[0] for r in data] == [0, 1, 2, 3]
+    assert [r[2] for r in data] == [1, 2, None, None]
+    assert [r[-4:] for r in data] == [[0, 0, "True", "False"], [6, 0, "False", "True"],
+                                      [0, -2, "False", "False"], [0, -8, "False", "True"]]
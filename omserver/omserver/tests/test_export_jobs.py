@@ -0,0 +1,38 @@
+import openpyxl
+
+from omserver.ExportJobs import EXPORT_OVERVIEW, EXPORT_SERIES, ExportJobManager
+from omserver.ResultStore import ResultStore
+
+from .test_result_store import _batch
+
+
+def test_exports_run_in_background_and_are_cached(tmp_path):
+    store = ResultStore(tmp_path / "results")
+    batch = _batch("batch", 3)
+    for it in batch["batch_sim_res_collection"]:
+        it["Battery Specs"] = [100, 5000, 3000, 0.5, 200]
+        it["Total Energy Wasted (kWh)"] = 0.0
+    batch_id = store.append_batch(batch)
+    jobs = ExportJobManager(tmp_path / "exports")
+    try:
+        first = jobs.submit(store, batch_id, EXPORT_OVERVIEW)
+        assert not first["cached"]
+        # Joins the running job, or finds its file if it finished already
+        second = jobs.submit(store, batch_id, EXPORT_OVERVIEW)
+        assert second["id"] == first["id"] or second["cached"]
+
+        done = jobs.wait(first["id"], timeout=60)
+        assert done["state"] == "done", done["error"]
+        wb = openpyxl.load_workbook(done["path"])
+        assert wb.sheetnames[:2] == ["Batch_Summary", "Iterations_Overview"] and len(wb.sheetnames) == 5
+
+        again = jobs.submit(store, batch_id, EXPORT_OVERVIEW)
+        assert again["cached"] and again["state"] == "done" and again["path"] == done["path"]
+
+        series = jobs.wait(jobs.submit(store, batch_id, EXPORT_SERIES)["id"], timeout=60)
+        assert series["state"] == "done", series["error"]
+        assert series["path"] != done["path"]
+        sheet = openpyxl.load_workbook(series["path"])["1"]
+        assert next(sheet.iter_rows(values_only=True)) == ("optimalZone", "time (h)", "battery_soc (%)", "Battery Specs")
+    finally:
+        jobs.close()
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from omserver.EUEmissionCalculator import EUMarineEmissionCalculator
+from omserver.FuelRegistry import LOOKUP_TABLES, get_fuel_registry
+from omserver.lookup_tables import fuel_lookup
+
+
+def test_registry_matches_lookup_tables():
+    registry = get_fuel_registry()
+    df = pd.read_csv(LOOKUP_TABLES / "fuel_properties.csv").set_index("pathway_name")
+    assert list(registry.names) == df.index.tolist()
+
+    calculator = EUMarineEmissionCalculator()
+    for name in registry.names:
+        expected = {k: 0.0 if pd.isna(v) else v for k, v in df.loc[name].to_dict().items()}
+        assert registry.properties(name) == expected
+        fuel = registry.pathway(name)
+        assert fuel.ttw_co2 == calculator._calculate_ttw_co2(fuel.cf_co2, fuel.lcv)
+        assert fuel.ttw_ch4 == calculator._calculate_ttw_ch4(fuel.cf_ch4, fuel.lcv)
+        assert fuel.ttw_n2o == calculator._calculate_ttw_n2o(fuel.cf_n2o, fuel.lcv)
+
+    assert registry.biofuel_saving(registry.biofuel_names[0]) == 67.0
+    assert calculator.registry is registry
+
+
+def test_registry_is_shared_and_read_only():
+    registry = get_fuel_registry()
+    assert fuel_lookup.fuel_lookup.registry is registry
+    assert fuel_lookup.get_fuel_property("e-methanol E10", "lcv_mj_per_g") == 0.0199
+    assert fuel_lookup.get_fuel_properties("unknown") is None
+    assert "e-methanol E10" in fuel_lookup.search_fuels("METHANOL")
+
+    # Callers get copies, the registry itself cannot be changed
+    registry.properties("e-methanol E10")["lcv_mj_per_g"] = 1.0
+    assert registry.pathway("e-methanol E10").lcv == 0.0199
+    with pytest.raises(AttributeError):
+        registry.pathway("e-methanol E10").lcv = 1.0
+    with pytest.raises(TypeError):
+        registry._properties["e-methanol E10"]["lcv_mj_per_g"] = 1.0
@@ -0,0 +1,45 @@
+from omserver.ModelicaParamTemplate import ModelicaParamTemplate
+from omserver.ModelicaSequentialParaPaser import ModelicaSequentialParamParser
+
+MODEL = """model M
+  parameter Boolean gen1_is_on = true;
+  parameter Boolean gen2_is_on = true;
+  parameter Boolean gen3_is_on = false;
+  parameter Real BSFC_Curve_1[:, 2] = [80, 197.91; 160, 189.97];
+  parameter Real BSFC_Curve_2[:, 2] = [80, 180.80; 160, 172.11];
+  parameter Real BSFC_Curve_3[:, 2] = [33, 727.27; 83, 521.21];
+  parameter Real Engine_Fuel_Consumption_Look_Up_Table_Diesle_1[:, 2] = [0, 0.00; 100, 264.26];
+  parameter Real Engine_Fuel_Consumption_Look_Up_Table_Diesle_2[:, 2] =[0, 0.00; 100,366.80];
+  parameter Real Engine_Fuel_Consumption_Look_Up_Table_Diesle_3[:, 2] = [0, 0.00; 100, 438.38];
+end M;
+"""
+
+
+def test_template_matches_regex_rewrite(tmp_path):
+    legacy_dir = tmp_path / "legacy"
+    template_dir = tmp_path / "template"
+    legacy_dir.mkdir()
+    template_dir.mkdir()
+    (legacy_dir / "M.mo").write_text(MODEL, encoding="utf-8")
+    (template_dir / "M.mo").write_text(MODEL, encoding="utf-8")
+    template = ModelicaParamTemplate.from_file(template_dir / "M.mo")
+
+    args = (["[1, 2; 3, 4]", "", "5, 6; 7, 8"], ["[0, 1; 100, 2]", "", "[0, 3; 100, 4]"], [True, False, True])
+    legacy = ModelicaSequentialParamParser("M", *args, model_dir=legacy_dir)
+    legacy.initilize_generator_switch()
+    legacy.update_modelica_txt_formate()
+    ModelicaSequentialParamParser("M", *args, model_dir=template_dir).update_from_template(template)
+
+    assert (template_dir / "M.mo").read_text(encoding="utf-8") == (legacy_dir / "M.mo").read_text(encoding="utf-8")
+
+
+def test_template_write_skips_unchanged(tmp_path):
+    path = tmp_path / "M.mo"
+    path.write_text(MODEL, encoding="utf-8")
+    template = ModelicaParamTemplate.from_file(path)
+
+    assert template.numbers("gen_is_on") == [1, 2, 3]
+    assert template.write(path, {}) is False
+    assert template.write(path, {("gen_is_on", 3): "true"}) is True
+    assert template.write(path, {("gen_is_on", 3): "true"}) is False
+    assert "gen3_is_on = true" in path.read_text(encoding="utf-8")
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from omserver.RepresentativeWindows import extrapolate_window_results, representative_windows, window_profiles
+
+DAY = 86400.0
+
+
+def _mission(days, extra_s=0.0):
+    # Transit days (steady high load) and survey days (low load with a daily peak), a little noise
+    t = np.arange(0, days * DAY + extra_s + 1, 600.0)
+    survey = (t // DAY).astype(int) % 4 == 3
+    hour = (t % DAY) / 3600
+    p = np.where(survey, 300 + 400 * np.exp(-((hour - 12) / 2) ** 2), 900.0)
+    p = p + np.random.default_rng(1).normal(0, 5, len(t))
+    return np.column_stack([t, p])
+
+
+def test_windows_cover_the_mission():
+    table = _mission(28)
+    starts, durations, energies, profiles = window_profiles(table, DAY)
+    assert len(starts) == 28 and np.all(durations == DAY) and profiles.shape == (28, 96)
+    t, p = table[:, 0], table[:, 1]
+    assert np.isclose(energies.sum(), np.trapezoid(p, t) / 3600)
+
+
+def test_representative_days_extrapolate_the_energy():
+    result = representative_windows(_mission(28, extra_s=DAY / 2), window_s=DAY, count=2)
+    windows = result["windows"]
+    assert result["count"] == 2 and result["speedup"] == pytest.approx(28.5 / 2)
+    # One transit day and one survey day, weighted by the days they stand for (and the half day)
+    survey = [w for w in windows if w["index"] % 4 == 3]
+    assert len(survey) == 1 and survey[0]["weight"] == 7
+    assert sum(w["weight"] for w in windows) == pytest.approx(28.5)
+    assert sorted(i for w in windows for i in w["members"]) == list(range(29))
+    assert all(w["stop_time"] - w["start_time"] == DAY for w in windows)
+    assert abs(result["energy_error_rel"]) <= result["energy_bound_rel"] < 0.01
+
+    with pytest.raises(ValueError):
+        representative_windows(_mission(28), window_s=40 * DAY)
+
+
+def test_extrapolate_window_results():
+    results = [
+        {"sim_name": "a", "fuel": 2.0, "peak": 5.0, "time": np.array([0.0, 1.0])},
+        {"sim_name": "a", "fuel": 1.0, "peak": 7.0, "time": np.array([5.0, 6.0])},
+    ]
+    combined = extrapolate_window_results(results, [3, 0.5], ["fuel"], ["peak"])
+    assert combined["fuel"] == 6.5 and combined["peak"] == 7.0 and combined["sim_name"] == "a"
+    assert combined["time"].tolist() == [0.0, 1.0, 5.0, 6.0]
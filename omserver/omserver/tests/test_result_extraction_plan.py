@@ -0,0 +1,38 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from omserver.ResultExtractionPlan import LAST, MAX, SERIES, ResultExtractionPlan, json_default
+
+CSV = os.path.join(os.path.dirname(__file__), "ElectricVessel_SA3_res.csv")
+
+PLAN = ResultExtractionPlan([
+    ("time (h)", "time", SERIES, 3600),
+    ("battery_soc (%)", "battery1.SOC"),
+    ("battery_discharge (KW)", "battery1.P_discharge_abs", SERIES, 1000),
+    ("final_soc", "battery1.SOC", LAST, 1, 2),
+    ("peak_discharge (KW)", "battery1.P_discharge_abs", MAX, 1000),
+])
+
+
+def test_plan_matches_list_processing():
+    df = pd.read_csv(CSV)
+    result = PLAN.extract(CSV)
+
+    assert list(result) == [f.key for f in PLAN.fields]
+    assert PLAN.columns == ["time", "battery1.SOC", "battery1.P_discharge_abs"]
+    assert result["time (h)"].tolist() == [t / 3600 for t in df["time"].tolist()]
+    assert result["battery_discharge (KW)"].tolist() == [p / 1000 for p in df["battery1.P_discharge_abs"].tolist()]
+    assert result["final_soc"] == round(float(df["battery1.SOC"].iloc[-1]), 2)
+    assert result["peak_discharge (KW)"] == max(df["battery1.P_discharge_abs"].tolist()) / 1000
+    assert json.loads(json.dumps(result, default=json_default))["battery_soc (%)"] == df["battery1.SOC"].tolist()
+
+
+def test_plan_missing_columns_when_not_strict():
+    result = PLAN.apply({"time": np.array([0.0, 3600.0])}, strict=False)
+
+    assert result["time (h)"].tolist() == [0.0, 1.0]
+    assert len(result["battery_soc (%)"]) == 0
+    assert result["final_soc"] == 0
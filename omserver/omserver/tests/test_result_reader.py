@@ -0,0 +1,73 @@
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from omserver.ResultReader import open_result
+
+CSV = os.path.join(os.path.dirname(__file__), "ElectricVessel_SA3_res.csv")
+
+
+def _matrix(f, name, values, mopt):
+    # MAT v4: header, name, then the values in column-major order
+    name = name.encode("ascii") + b"\0"
+    f.write(struct.pack("<5i", mopt, values.shape[0], values.shape[1], 0, len(name)))
+    f.write(name)
+    f.write(np.asfortranarray(values).tobytes(order="F"))
+
+
+def _strings(strings):
+    width = max(len(s) for s in strings)
+    return np.array([list(s.ljust(width).encode("ascii")) for s in strings], dtype=np.uint8)
+
+
+def _write_mat(path, df, transposed):
+    # Like OpenModelica: the first column after time is a parameter (data_1), the second an alias with negated sign
+    names = list(df.columns)
+    trajectories = [c for c in names if c != names[1]]
+    info = np.zeros((len(names), 4), dtype=np.int32)
+    for i, name in enumerate(names):
+        if i == 0:
+            info[i] = (0, 1, 0, -1)
+        elif i == 1:
+            info[i] = (1, 1, 0, 0)
+        elif i == 2:
+            info[i] = (2, -trajectories.index(name) - 1, 0, -1)
+        else:
+            info[i] = (2, trajectories.index(name) + 1, 0, -1)
+    data_1 = np.array([[df[names[1]].iloc[0]] * 2], dtype=np.float64)
+    data_2 = df[trajectories].to_numpy(dtype=np.float64).T.copy()
+    data_2[1] = -data_2[1]
+
+    def t(m):
+        return m.T if transposed else m
+
+    with open(path, "wb") as f:
+        _matrix(f, "Aclass", _strings(["Atrajectory", "1.1", "", "binTrans" if transposed else "binNormal"]), 51)
+        _matrix(f, "name", t(_strings(names)), 51)
+        _matrix(f, "description", t(_strings(["" for _ in names])), 51)
+        _matrix(f, "dataInfo", t(info), 20)
+        _matrix(f, "data_1", data_1 if transposed else data_1.T, 0)
+        _matrix(f, "data_2", data_2 if transposed else data_2.T, 0)
+
+
+def test_mat_reader_matches_csv(tmp_path):
+    df = pd.read_csv(CSV)
+    df = pd.concat([df[["time"]], pd.DataFrame({"battery_capacity": 42.0}, index=df.index), df.iloc[:, 1:]], axis=1)
+    columns = ["time", df.columns[1], df.columns[2], "battery1.P_out", "not.a.variable"]
+    for transposed in (True, False):
+        mat_path = tmp_path / f"{int(transposed)}_res.mat"
+        _write_mat(mat_path, df, transposed)
+        with open_result(mat_path) as reader:
+            values = reader.read(columns)
+        assert list(values) == columns[:4]
+        for name in columns[:4]:
+            np.testing.assert_allclose(values[name], df[name].to_numpy(dtype=np.float64))
+
+
+def test_unreadable_mat_falls_back_to_csv(tmp_path):
+    (tmp_path / "M_res.mat").write_bytes(b"not a mat file at all")
+    (tmp_path / "M_res.csv").write_text('"time","x"\n0,1\n1,2\n', encoding="utf-8")
+    with open_result(tmp_path / "M_res.mat") as reader:
+        assert reader.read(["x", "y"])["x"].tolist() == [1.0, 2.0]
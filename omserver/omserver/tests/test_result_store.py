@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+
+from omserver.ResultStore import ResultStore
+
+
+def _batch(title, n):
+    return {
+        "batch_sim_title": title,
+        "batch_sim_time_stamp": "01/01/2025 00:00",
+        "vessel_name": "dev_vessel",
+        "batch_size": n,
+        "batch_sim_res_collection": [{
+            "sim_name": f"combo {i}",
+            "iteration_id": i,
+            "meth_count": i % 2,
+            "CO2_emission (Ton)": 10.0 - i,
+            "optimalZone": [0, 1, 0, 1, 0, 1],
+            "time (h)": np.linspace(0, 1, 50),
+            "battery_soc (%)": [0.5] * 50,
+        } for i in range(n)],
+    }
+
+
+def test_store_ranks_without_loading_series(tmp_path):
+    store = ResultStore(tmp_path)
+    store.append_batch(_batch("other", 2))
+    batch_id = store.append_batch(_batch("batch", 6))
+
+    assert [b["title"] for b in store.list_batches()] == ["other", "batch"]
+    assert store.find_batch("batch") == batch_id
+
+    rows = store.iterations(batch_id, where="meth_count = 0", order_by="co2_t", limit=2)
+    assert [r["iteration_id"] for r in rows] == [4, 2]
+    assert rows[0]["scalars"]["optimalZone"] == [0, 1, 0, 1, 0, 1]
+    assert "time (h)" not in rows[0]["scalars"]
+
+    series = store.series(batch_id, rows, keys={"time (h)"})
+    assert list(series[0]) == ["time (h)"]
+    assert series[0]["time (h)"][-1] == 1.0
+
+
+def test_store_round_trip_and_json_import(tmp_path):
+    legacy = tmp_path / "res_db.json"
+    batch = _batch("legacy", 3)
+    legacy.write_text(json.dumps([batch], default=lambda v: v.tolist()), encoding="utf-8")
+
+    store = ResultStore(tmp_path / "results")
+    assert store.import_json(legacy) == 1
+    assert not legacy.exists()
+    assert store.import_json(legacy) == 0
+
+    record = store.get_batch(store.find_batch("legacy"))
+    assert list(record["batch_sim_res_collection"][1]) == list(batch["batch_sim_res_collection"][1])
+    assert record["batch_sim_res_collection"][1]["battery_soc (%)"].tolist() == [0.5] * 50
+
+
+def test_query_filters_and_ranks_on_kpi_columns(tmp_path):
+    batch = _batch("batch", 6)
+    for i, it in enumerate(batch["batch_sim_res_collection"]):
+        it["bat_count"] = 1
+        it["Gen Mass"] = [1000.0 * i, "None", "None"]
+        it["Battery Specs"] = [100, 5000, 3000, 0.5, 200.0]
+        it["peak_power_demand (KW)"] = 500.0
+        it["max_pwr_potential (KW)"] = 400.0 if i == 4 else 600.0
+    batch["batch_sim_res_collection"][2]["CO2_emission (Ton)"] = None
+    store = ResultStore(tmp_path)
+    batch_id = store.append_batch(batch)
+
+    matched, rows = store.query(batch_id, filters=[("meth_count", "==", 0), ("covers_peak", "!=", 0)],
+                                sort=["co2_t"], limit=1)
+    assert matched == 2
+    assert [r["iteration_id"] for r in rows] == [0]
+
+    _, rows = store.query(batch_id, filters=[("total_mass", "<=", 3200)], sort=["-co2_t"])
+    assert [r["iteration_id"] for r in rows] == [0, 1, 3, 2]
+    assert rows[0]["engine_mass_total"] == 0.0 and rows[0]["battery_mass_total"] == 200.0
+
+    for bad in ([("sim_name; DROP TABLE batches", "==", 1)], [("co2_t", "~", 1)], [("co2_t", "in", 1)]):
+        try:
+            store.query(batch_id, filters=bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"{bad} was accepted")
+
+    # A catalog from before a KPI existed gets the column filled in on open
+    with store._connect() as db:
+        db.execute("DROP INDEX iterations_total_mass")
+        db.execute("ALTER TABLE iterations DROP COLUMN total_mass")
+    _, rows = ResultStore(tmp_path).query(batch_id, sort=["-total_mass"], limit=1)
+    assert rows[0]["iteration_id"] == 5 and rows[0]["total_mass"] == 5200.0
+
+
+def test_cache_serves_repeats_and_sees_writes_from_other_stores(tmp_path):
+    store = ResultStore(tmp_path, cache_bytes=1000)
+    batch_id = store.append_batch(_batch("batch", 6))
+    rows = store.iterations(batch_id)
+    assert store.iterations(batch_id) is rows
+    assert [b["title"] for b in store.list_batches()] == ["batch"]
+
+    # Another process appending to the same catalog invalidates the cached lookups
+    ResultStore(tmp_path).append_batch(_batch("later", 1))
+    assert [b["title"] for b in store.list_batches()] == ["batch", "later"]
+
+    # 400-byte series under a 1000-byte cap: only the two most recent stay cached
+    first = store.series(batch_id, rows[:1], keys={"time (h)"})[0]["time (h)"]
+    assert not first.flags.writeable
+    store.series(batch_id, rows[1:3], keys={"time (h)"})
+    assert store.cache.stats()["series_arrays"] == 2
+    hits = store.cache.stats()["hits"]
+    store.series(batch_id, rows[2:3], keys={"time (h)"})
+    assert store.cache.stats()["hits"] > hits
+    assert store.series(batch_id, rows[:1], keys={"time (h)"})[0]["time (h)"] is not first
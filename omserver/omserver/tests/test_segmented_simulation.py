@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from omserver.SegmentedSimulation import (boundary_values, coarse_soc_starts, parareal_starts, segment_bounds,
+                                         stitch_segments)
+
+
+def _battery(soc, start, stop):
+    # Toy battery: charges and discharges with the load, held within 10..90 %
+    t = np.linspace(start, stop, 201)
+    for dt, tt in zip(np.diff(t), t[1:]):
+        soc = min(0.9, max(0.1, soc - 2e-5 * np.sin(tt / 2000) * dt))
+    return soc
+
+
+def test_segment_bounds():
+    assert segment_bounds(0, 100, 4) == [(0, 25), (25, 50), (50, 75), (75, 100)]
+    with pytest.raises(ValueError):
+        segment_bounds(0, 100, 0)
+
+
+def test_parareal_matches_the_serial_run():
+    bounds = segment_bounds(0, 80000, 8)
+    serial = [0.6]
+    for start, stop in bounds:
+        serial.append(_battery(serial[-1], start, stop))
+
+    # First pass: every segment starts from the initial SOC
+    starts = np.full(len(bounds), 0.6)
+    ends = np.array([_battery(s, *b) for s, b in zip(starts, bounds)])
+    for iteration in range(1, len(bounds) + 1):
+        corrected = parareal_starts(starts, ends, 0.1, 0.9)
+        pending = [k for k in range(len(bounds)) if abs(corrected[k] - starts[k]) > 1e-9]
+        if not pending:
+            break
+        for k in pending:
+            starts[k] = corrected[k]
+            ends[k] = _battery(starts[k], *bounds[k])
+    assert iteration < len(bounds)
+    assert np.allclose(starts, serial[:-1]) and np.allclose(ends, serial[1:])
+
+
+def test_coarse_soc_follows_the_duty_cycle_energy():
+    # 1 h at 300 kW on a 200 kW generator, then 1 h at 100 kW; 1000 kWh battery, 150 kW limit
+    table = np.array([[0.0, 300.0], [3600.0, 300.0], [3600.0, 100.0], [7200.0, 100.0]])
+    bounds = segment_bounds(0, 7200, 4)
+    starts = coarse_soc_starts(table, bounds, 0.8, 1000 * 3.6e6, 150e3, 200e3)
+    assert np.allclose(starts, [0.8, 0.75, 0.7, 0.75])
+
+    # The battery power limit and the SOC range cap the estimate
+    assert np.allclose(coarse_soc_starts(table, bounds, 0.8, 1000 * 3.6e6, 50e3, 200e3), [0.8, 0.775, 0.75, 0.775])
+    assert np.allclose(coarse_soc_starts(table, bounds, 0.1, 100 * 3.6e6, 150e3, 200e3), [0.1, 0.0, 0.0, 0.5])
+
+
+def test_stitch_continues_totals_and_drops_repeated_samples():
+    first = {"time": np.array([0.0, 1.0, 2.0]), "energy": np.array([0.0, 1.0, 3.0]), "soc": np.array([0.5, 0.4, 0.3])}
+    second = {"time": np.array([2.0, 2.0, 3.0, 4.0]), "energy": np.array([0.0, 0.0, 2.0, np.nan]),
+              "soc": np.array([0.3, 0.3, 0.2, 0.1])}
+    stitched = stitch_segments([first, second], cumulative=["energy"])
+    assert stitched["time"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert stitched["soc"].tolist() == [0.5, 0.4, 0.3, 0.2, 0.1]
+    assert stitched["energy"][:4].tolist() == [0.0, 1.0, 3.0, 5.0]
+    assert boundary_values(stitched["energy"]) == (0.0, 5.0)
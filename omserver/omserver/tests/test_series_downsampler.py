@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from omserver.SeriesDownsampler import LTTB, MIN_POINTS, MINMAX, downsample, window_indices
+
+
+def test_downsampling_keeps_budget_ends_and_peaks():
+    x = np.linspace(0, 9, 32643)
+    y = np.sin(x * 7)
+    y[12345], y[20000] = 5.0, -4.0
+    for method in (LTTB, MINMAX):
+        xs, ys = downsample(x, y, 500, method)
+        assert len(xs) <= 500
+        assert xs[0] == x[0] and xs[-1] == x[-1]
+        assert np.all(np.diff(xs) > 0)
+        assert ys.max() == 5.0 and ys.min() == -4.0
+
+    xs, ys = downsample(x[:10], y[:10], 500, LTTB)
+    assert xs.tolist() == x[:10].tolist()
+
+
+def test_window_indices_are_inclusive():
+    x = np.arange(10.0)
+    assert window_indices(x, 2, 5) == slice(2, 6)
+    assert window_indices(x, None, 1.5) == slice(0, 2)
+    assert window_indices(x, 20, None) == slice(10, 10)
+
+
+def test_budget_below_minimum_is_rejected():
+    x = np.linspace(0, 9, 100)
+    y = np.sin(x)
+    for method in (LTTB, MINMAX):
+        xs, _ = downsample(x, y, MIN_POINTS, method)
+        assert len(xs) <= MIN_POINTS
+        with pytest.raises(ValueError):
+            downsample(x, y, MIN_POINTS - 1, method)